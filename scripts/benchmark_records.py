@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+import argparse
+import gc
+import tracemalloc
+
+from ase_discord_bot.api_util.model.responses import Movie, TVShow
+from ase_discord_bot.catalog.records import MediaRecord
+
+
+def sample_result(media_type, media_id):
+    result = {
+        "adult": False,
+        "backdrop_path": f"/backdrop{media_id}.jpg",
+        "genre_ids": [18, 27, 53],
+        "id": media_id,
+        "original_language": "en",
+        "overview": f"Overview {media_id} " + "x" * 300,
+        "popularity": 12.345,
+        "poster_path": f"/poster{media_id}.jpg",
+        "vote_average": 7.1,
+        "vote_count": 1234,
+    }
+    if media_type == "movie":
+        result.update({"original_title": f"Movie {media_id}", "release_date": "2001-02-03",
+                       "title": f"Movie {media_id}", "video": False})
+    else:
+        result.update({"origin_country": ["US"], "original_name": f"Show {media_id}",
+                       "first_air_date": "2001-02-03", "name": f"Show {media_id}"})
+    return result
+
+
+def bytes_per_title(build, results):
+    """
+    Average number of bytes allocated per title held in a list built from the results.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [build(result) for result in results]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return (after - before) / len(results)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the memory held per cached title by models and records.")
+    parser.add_argument("--count", type=int, default=10000, help="Number of titles per measurement")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for media_type, model in (("movie", Movie), ("tv", TVShow)):
+        # Results are built outside of the measurement, only the held objects are counted
+        results = [sample_result(media_type, i) for i in range(args.count)]
+        model_bytes = bytes_per_title(lambda result: model(**result), results)
+        record_bytes = bytes_per_title(lambda result: MediaRecord.from_result(media_type, result), results)
+        print(f"{model.__name__}: {model_bytes:.0f} bytes per title as model, "
+              f"{record_bytes:.0f} bytes per title as MediaRecord ({record_bytes / model_bytes:.0%})")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from ase_discord_bot.api_util.tmdb_client import close_client, start_client
+from ase_discord_bot.catalog.ingest import ingest_export
+from ase_discord_bot.catalog.snapshot import write_store_snapshots
+from ase_discord_bot.catalog.store import CatalogStore
+from ase_discord_bot.config import Config, check_and_load_env_vars, setup_logger
+from ase_discord_bot.config_registry import set_config
+
+logger = logging.getLogger("Ingest")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Ingest TMDB daily ID exports (movie_ids_*.json.gz, tv_series_ids_*.json.gz) into the catalog file."
+    )
+    parser.add_argument("exports", nargs="+", type=Path, help="Export files, gzip-compressed or plain JSON lines")
+    parser.add_argument("--output", type=Path, help="Catalog file, defaults to CATALOG_FILE")
+    parser.add_argument("--batch-size", type=int, default=100, help="Records per written batch")
+    parser.add_argument("--concurrency", type=int, default=5, help="Maximum number of detail requests in flight")
+    parser.add_argument("--min-popularity", type=float, default=1.0, help="Minimum popularity of ingested titles")
+    return parser.parse_args()
+
+
+async def ingest(args, cfg: Config) -> bool:
+    path = args.output or Path(cfg.CATALOG_FILE)
+    store = CatalogStore(path)
+    client = start_client(cfg)
+    try:
+        for export in args.exports:
+            await ingest_export(export, store, client, args.batch_size, args.concurrency, args.min_popularity)
+        await asyncio.to_thread(write_store_snapshots, store, path)
+        logger.info(f"Wrote the snapshots of {path}")
+    except (RuntimeError, ValueError) as e:
+        logger.error(f"Ingestion stopped, run again to resume: {e}")
+        return False
+    finally:
+        await close_client()
+        store.close()
+    return True
+
+
+if __name__ == "__main__":
+    setup_logger()
+    check_and_load_env_vars()
+    cfg = Config()
+    set_config(cfg)
+
+    if not asyncio.run(ingest(parse_args(), cfg)):
+        sys.exit(1)
@@ -0,0 +1,74 @@
+from openai import AsyncOpenAI
+from ase_discord_bot.config import Config
+
+_client: AsyncOpenAI | None = None
+
+
+def start_llm_client(cfg: Config) -> AsyncOpenAI:
+    """
+    Create the global Open Router client from the configuration, unless it already exists.
+
+    The client keeps its HTTP connections alive and reuses them, so summaries do not
+    each pay for a new TLS handshake.
+
+    Parameters
+    ----------
+    cfg : Config
+        The configuration to build the client from.
+
+    Returns
+    -------
+    AsyncOpenAI
+        The global client.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            base_url=cfg.OPEN_ROUTER_BASE_URL.human_repr(),
+            api_key=cfg.OPEN_ROUTER_API_KEY,
+            timeout=cfg.OPEN_ROUTER_REQUEST_TIMEOUT,
+            max_retries=cfg.OPEN_ROUTER_MAX_RETRIES,
+        )
+    return _client
+
+
+def set_llm_client(client: AsyncOpenAI | None):
+    """
+    Replace the global Open Router client.
+
+    Parameters
+    ----------
+    client : AsyncOpenAI | None
+        The client to set, or None to unset it.
+    """
+    global _client
+    _client = client
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """
+    Retrieve the global Open Router client.
+
+    Returns
+    -------
+    AsyncOpenAI
+        The current global client.
+
+    Raises
+    ------
+    RuntimeError
+        If the client has not been started.
+    """
+    if _client is None:
+        raise RuntimeError("Open Router client has not been started.")
+    return _client
+
+
+async def close_llm_client():
+    """
+    Close and unset the global Open Router client, if it exists.
+    """
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -1,18 +1,42 @@
+import asyncio
+import json
 import logging
 
-from openai import OpenAI
+from collections.abc import AsyncIterator, Sequence
+from openai import OpenAIError
+from pydantic import BaseModel, ValidationError
+from ase_discord_bot.ai.llm_client import get_llm_client
+from ase_discord_bot.ai.summary_cache import get_summary_cache, summary_key
 from ase_discord_bot.api_util.model.responses import Movie, TVShow
 from ase_discord_bot.config_registry import get_config
+from ase_discord_bot.util.single_flight import SingleFlight, StreamFlight
 
 logger = logging.getLogger("Ai")
 
+_summary_requests: SingleFlight[str] = SingleFlight()
+_summary_streams: StreamFlight[str] = StreamFlight()
 
-def summarize(media: Movie | TVShow) -> str:
+
+class BatchSummary(BaseModel):
+    """
+    Model of one item in the JSON array returned for a batch of media items.
+
+    Attributes
+    ----------
+    id : int
+        TMDB ID of the media item.
+    summary : str
+        The generated summary.
+    """
+    id: int
+    summary: str
+
+
+async def summarize(media: Movie | TVShow) -> str:
     """
     Generate a concise summary for a media item.
 
-    The function attempts to create a new summary using an OpenAI model.
-    If the API call fails or returns no content, it falls back to the original overview.
+    Concurrent calls for the same media item share a single API call.
 
     Parameters
     ----------
@@ -24,36 +48,279 @@ def summarize(media: Movie | TVShow) -> str:
     str
         The generated summary or the original media overview.
     """
-    cfg = get_config()
+    key = (type(media).__name__, media.id)
+    return await _summary_requests.do(key, lambda: _summarize(media))
 
-    client = OpenAI(
-        base_url=cfg.OPEN_ROUTER_BASE_URL.human_repr(),
-        api_key=cfg.OPEN_ROUTER_API_KEY,
-    )
 
-    completion = client.chat.completions.create(
-        model="google/gemini-2.0-flash-thinking-exp:free",
-        messages=[{
-            "role": "user",
-            "content": [{
-                "type": "text",
-                "text": _get_text(media)
-            }]
-        }]
-    )
-    content = None
+async def summarize_stream(media: Movie | TVShow) -> AsyncIterator[str]:
+    """
+    Generate a concise summary for a media item, yielding it progressively as the API
+    streams it.
+
+    Every yielded string is the whole summary generated so far. Concurrent calls for the
+    same media item share a single streamed API call, a call joining late starts at the
+    summary generated so far.
+
+    Parameters
+    ----------
+    media : Movie | TVShow
+        The media item (movie or TV show) to summarize.
+
+    Yields
+    ------
+    str
+        The summary so far, or the original media overview.
+    """
+    key = _cache_key(media, get_config().OPEN_ROUTER_MODEL)
+    async for summary in _summary_streams.stream(key, lambda: _summarize_stream(media, key)):
+        yield summary
+
+
+async def _summarize_stream(media: Movie | TVShow, key: str) -> AsyncIterator[str]:
+    """
+    Generate a concise summary for a media item, yielding it progressively as the API
+    streams it.
+
+    A cached summary is yielded at once. If the API call fails or returns no content, the
+    original overview is yielded last, replacing any partial summary. Only complete
+    summaries are cached.
+
+    Parameters
+    ----------
+    media : Movie | TVShow
+        The media item (movie or TV show) to summarize.
+    key : str
+        The summary cache key of the media item.
+
+    Yields
+    ------
+    str
+        The summary so far, or the original media overview.
+    """
+    cfg = get_config()
+    cache = get_summary_cache()
+    if (cached := await cache.get(key)) is not None:
+        yield cached
+        return
+
+    content = ""
     try:
-        content = completion.choices[0].message.content
-    except TypeError:
-        logger.error("Ai has failed, probably a rate-limit by the api.")
-        content = None
+        stream = await get_llm_client().chat.completions.create(
+            model=cfg.OPEN_ROUTER_MODEL,
+            messages=_messages(_get_text(media)),
+            timeout=cfg.OPEN_ROUTER_REQUEST_TIMEOUT,
+            stream=True,
+        )
+        async for chunk in stream:
+            # Rate-limited responses come without choices
+            if chunk.choices and (delta := chunk.choices[0].delta.content):
+                content += delta
+                yield content
+    except OpenAIError as error:
+        logger.error(f"Ai request has failed: {error}")
+        content = ""
+
+    if content:
+        cache.set(key, content)
+    else:
+        yield media.overview
+
+
+async def summarize_batch(media_items: Sequence[Movie] | Sequence[TVShow]) -> list[str]:
+    """
+    Generate concise summaries for several media items, with as few API calls as possible.
+
+    Cached summaries are used as they are. The other items are split into batches of at
+    most SUMMARY_BATCH_SIZE items, each summarized by a single API call that returns a
+    JSON array keyed by TMDB ID, with at most MAX_CONCURRENT_SUMMARIES calls at once.
+    Items missing from the response or malformed in it are summarized individually,
+    falling back to their overview if that fails as well.
+
+    Parameters
+    ----------
+    media_items : Sequence[Movie] | Sequence[TVShow]
+        The media items (movies or TV shows) to summarize.
+
+    Returns
+    -------
+    list[str]
+        The generated summaries or original overviews, in the order of the media items.
+    """
+    cfg = get_config()
+    cache = get_summary_cache()
+    keys = [_cache_key(media, cfg.OPEN_ROUTER_MODEL) for media in media_items]
+    summaries: list[str | None] = list(await asyncio.gather(*(cache.get(key) for key in keys)))
+    semaphore = asyncio.Semaphore(cfg.MAX_CONCURRENT_SUMMARIES)
 
+    async def summarize_one(index: int):
+        media = media_items[index]
+        async with semaphore:
+            try:
+                summaries[index] = await summarize(media)
+            except Exception:
+                # A failed summary must not cancel the other ones
+                logger.exception(f"Summarizing {media.id} failed, using its overview")
+                summaries[index] = media.overview
+
+    async def summarize_chunk(indices: list[int]):
+        if len(indices) > 1:
+            async with semaphore:
+                batch = await _summarize_batch([media_items[index] for index in indices])
+            for index in indices:
+                if (summary := batch.get(media_items[index].id)) is not None:
+                    summaries[index] = summary
+                    cache.set(keys[index], summary)
+        await asyncio.gather(*(summarize_one(index) for index in indices if summaries[index] is None))
+
+    missing = [index for index, summary in enumerate(summaries) if summary is None]
+    size = cfg.SUMMARY_BATCH_SIZE
+    await asyncio.gather(*(summarize_chunk(missing[start:start + size]) for start in range(0, len(missing), size)))
+    return [summary if summary is not None else media.overview for media, summary in zip(media_items, summaries)]
+
+
+async def _summarize(media: Movie | TVShow) -> str:
+    """
+    Generate a concise summary for a media item.
+
+    A summary generated before for the same model and prompt is taken from the summary
+    cache without calling the API. Otherwise the function attempts to create a new summary
+    using the shared Open Router client and caches it. If the API call fails or returns
+    no content, it falls back to the original overview, which is not cached.
+
+    Parameters
+    ----------
+    media : Movie | TVShow
+        The media item (movie or TV show) to summarize.
+
+    Returns
+    -------
+    str
+        The generated summary or the original media overview.
+    """
+    cfg = get_config()
+    key = _cache_key(media, cfg.OPEN_ROUTER_MODEL)
+    cache = get_summary_cache()
+    if (cached := await cache.get(key)) is not None:
+        return cached
+
+    content = await _complete(_get_text(media))
     if content is not None:
+        cache.set(key, content)
         return content
     else:
         return media.overview
 
 
+async def _summarize_batch(media_items: Sequence[Movie] | Sequence[TVShow]) -> dict[int, str]:
+    """
+    Summarize several media items with a single API call.
+
+    Parameters
+    ----------
+    media_items : Sequence[Movie] | Sequence[TVShow]
+        The media items (movies or TV shows) to summarize.
+
+    Returns
+    -------
+    dict[int, str]
+        The summaries by TMDB ID, without the items that are missing or malformed in the response.
+    """
+    content = await _complete(_get_batch_text(media_items))
+    if content is None:
+        return {}
+
+    try:
+        items = json.loads(_strip_code_fence(content))
+    except json.JSONDecodeError:
+        logger.error("Ai has returned a batch response that is not valid JSON.")
+        return {}
+    if not isinstance(items, list):
+        logger.error("Ai has returned a batch response that is not a JSON array.")
+        return {}
+
+    ids = {media.id for media in media_items}
+    summaries = {}
+    for item in items:
+        try:
+            batch_summary = BatchSummary.model_validate(item)
+        except ValidationError:
+            continue
+        if batch_summary.id in ids and batch_summary.summary.strip():
+            summaries[batch_summary.id] = batch_summary.summary.strip()
+
+    if len(summaries) < len(ids):
+        logger.warning(f"Ai has returned {len(summaries)} of {len(ids)} batched summaries.")
+    return summaries
+
+
+async def _complete(text: str) -> str | None:
+    """
+    Send a prompt to the shared Open Router client, waiting at most OPEN_ROUTER_REQUEST_TIMEOUT seconds.
+
+    Parameters
+    ----------
+    text : str
+        The prompt.
+
+    Returns
+    -------
+    str | None
+        The content of the completion, or None if the API call fails or returns no content.
+    """
+    cfg = get_config()
+
+    try:
+        completion = await get_llm_client().chat.completions.create(
+            model=cfg.OPEN_ROUTER_MODEL,
+            messages=_messages(text),
+            timeout=cfg.OPEN_ROUTER_REQUEST_TIMEOUT,
+        )
+    except OpenAIError as error:
+        logger.error(f"Ai request has failed: {error}")
+        return None
+
+    try:
+        return completion.choices[0].message.content
+    except TypeError:
+        logger.error("Ai has failed, probably a rate-limit by the api.")
+        return None
+
+
+def _messages(text: str) -> list[dict]:
+    """
+    Wrap a prompt into the messages of a chat completion request.
+    """
+    return [{
+        "role": "user",
+        "content": [{
+            "type": "text",
+            "text": text
+        }]
+    }]
+
+
+def _cache_key(media: Movie | TVShow, model: str) -> str:
+    """
+    Build the summary cache key of a media item, from its individual prompt.
+
+    Summaries generated in a batch are cached under the same key, since the batch
+    prompt asks for the same summary.
+    """
+    media_type = "movie" if isinstance(media, Movie) else "tv"
+    return summary_key(media_type, media.id, model, _get_text(media))
+
+
+def _strip_code_fence(content: str) -> str:
+    """
+    Remove a Markdown code fence the model may have wrapped its JSON response in.
+    """
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[1] if "\n" in content else ""
+        content = content.rsplit("```", 1)[0]
+    return content
+
+
 def _get_text(media: Movie | TVShow) -> str:
     """
     Build the input text for the summarization API call.
@@ -85,3 +352,40 @@ def _get_text(media: Movie | TVShow) -> str:
         "explanatory text. Do not include any conversational phrases or metadata — only the "
         f"revised summary itself.\nTitle: {title}\nSummary: {media.overview}"
     )
+
+
+def _get_batch_text(media_items: Sequence[Movie] | Sequence[TVShow]) -> str:
+    """
+    Build the input text for summarizing several media items with one API call.
+
+    The text lists the TMDB ID, title and original overview of every item as JSON and
+    asks for a JSON array with one summary per ID.
+
+    Parameters
+    ----------
+    media_items : Sequence[Movie] | Sequence[TVShow]
+        The media items to be summarized.
+
+    Returns
+    -------
+    str
+        The formatted text prompt.
+    """
+    items = "\n".join(
+        json.dumps({
+            "id": media.id,
+            "type": "movie" if isinstance(media, Movie) else "tvshow",
+            "title": media.title if isinstance(media, Movie) else media.name,
+            "summary": media.overview,
+        }, ensure_ascii=False)
+        for media in media_items
+    )
+
+    return (
+        "Given the following movies and tv shows, each with its id, title and an existing summary, "
+        "rewrite every summary into a new, concise version that accurately captures the plot. Each "
+        "summary should be 2 to 3 sentences long and must be standalone, with no introductory or "
+        "explanatory text, conversational phrases or metadata. Respond only with a JSON array "
+        'containing one object {"id": <id>, "summary": "<revised summary>"} per item, with no other '
+        f"text.\n{items}"
+    )
@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import logging
+
+from pathlib import Path
+from ase_discord_bot.api_util.cache import TTLCache
+from ase_discord_bot.api_util.disk_cache import DiskCache
+from ase_discord_bot.config_registry import get_config
+
+logger = logging.getLogger("SummaryCache")
+
+# Bounds of the in-memory tier in front of the database
+MEMORY_ENTRIES = 1000
+MEMORY_BYTES = 1024 * 1024
+
+
+def summary_key(media_type: str, media_id: int, model: str, prompt: str) -> str:
+    """
+    Build the cache key of a summary.
+
+    The prompt holds the overview and the prompt template, so a changed overview or
+    template yields a new key and the outdated summary is never served.
+
+    Parameters
+    ----------
+    media_type : str
+        Either "movie" or "tv".
+    media_id : int
+        TMDB ID of the media item.
+    model : str
+        Name of the model generating the summary.
+    prompt : str
+        The full prompt sent to the model.
+
+    Returns
+    -------
+    str
+        The cache key.
+    """
+    prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()[:32]
+    return f"{media_type}:{media_id}:{model}:{prompt_hash}"
+
+
+class SummaryCache:
+    """
+    Persistent cache of generated summaries.
+
+    Summaries are stored in a DiskCache, which evicts the least recently used ones beyond
+    its byte budget, with a small in-memory tier in front of it. Writes are only applied
+    to memory right away and written to disk by a background task, so storing a summary
+    never waits on disk. Hits and misses are counted across both tiers.
+    """
+
+    def __init__(self, disk: DiskCache, memory: TTLCache):
+        """
+        Parameters
+        ----------
+        disk : DiskCache
+            The database holding all summaries.
+        memory : TTLCache
+            The in-memory tier holding recently used summaries.
+        """
+        self.disk = disk
+        self.memory = memory
+        self.hits = 0
+        self.misses = 0
+        self._pending: dict[str, str] = {}
+        self._write_task: asyncio.Task | None = None
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Share of lookups that were hits, 0 if there were none.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    async def get(self, key: str) -> str | None:
+        """
+        Look up a summary, from memory if possible, otherwise from disk in a worker thread.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, see summary_key.
+
+        Returns
+        -------
+        str | None
+            The summary, or None if it is not cached.
+        """
+        summary = self.memory.get(key)
+        if summary is None:
+            summary = self._pending.get(key)
+        if summary is None and (value := await asyncio.to_thread(self.disk.get, key)) is not None:
+            summary = value.decode()
+            self.memory.set(key, summary, len(value))
+
+        if summary is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return summary
+
+    def set(self, key: str, summary: str):
+        """
+        Store a summary in memory and schedule writing it to disk.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, see summary_key.
+        summary : str
+            The generated summary.
+        """
+        self.memory.set(key, summary, len(summary.encode()))
+        self._pending[key] = summary
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """
+        Write all pending summaries to disk in a worker thread, after the running background write.
+        """
+        task = self._write_task
+        if task is not None and task is not asyncio.current_task() and not task.done():
+            await task
+        while self._pending:
+            pending, self._pending = self._pending, {}
+            await asyncio.to_thread(self._write, pending)
+
+    def _write(self, summaries: dict[str, str]):
+        """
+        Write summaries to disk, logging instead of raising if the database fails.
+        """
+        try:
+            for key, summary in summaries.items():
+                self.disk.set(key, summary.encode())
+        except Exception:
+            logger.exception(f"Writing {len(summaries)} summaries to disk failed")
+
+    async def close(self):
+        """
+        Write all pending summaries to disk and close the database.
+        """
+        await self.flush()
+        self.disk.close()
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        Snapshot of the cache counters.
+
+        Returns
+        -------
+        dict[str, int | float]
+            Entries held in memory, pending writes, hits, misses and hit ratio.
+        """
+        return {
+            "memory_entries": len(self.memory),
+            "pending_writes": len(self._pending),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+        }
+
+
+_summary_cache: SummaryCache | None = None
+
+
+def set_summary_cache(cache: SummaryCache | None):
+    """
+    Replace the global summary cache.
+
+    Parameters
+    ----------
+    cache : SummaryCache | None
+        The cache to set, or None to rebuild it from the configuration on next use.
+    """
+    global _summary_cache
+    _summary_cache = cache
+
+
+def get_summary_cache() -> SummaryCache:
+    """
+    Retrieve the global summary cache, creating it from the configuration on first use.
+
+    Returns
+    -------
+    SummaryCache
+        The summary cache.
+    """
+    global _summary_cache
+    if _summary_cache is None:
+        cfg = get_config()
+        _summary_cache = SummaryCache(
+            DiskCache(Path(cfg.DISK_CACHE_DIR) / "summaries.sqlite3", cfg.SUMMARY_CACHE_TTL,
+                      cfg.SUMMARY_CACHE_MAX_BYTES),
+            TTLCache(cfg.SUMMARY_CACHE_TTL, MEMORY_ENTRIES, MEMORY_BYTES),
+        )
+    return _summary_cache
+
+
+async def close_summary_cache():
+    """
+    Write the pending summaries of the global summary cache and close its database, if it exists.
+    """
+    global _summary_cache
+    if _summary_cache is not None:
+        cache, _summary_cache = _summary_cache, None
+        await cache.close()
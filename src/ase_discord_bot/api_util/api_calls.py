@@ -1,9 +1,32 @@
-import requests
-
+import asyncio
+import logging
+import random
+import time
+
+from collections.abc import Iterable, Sequence
+from ase_discord_bot.api_util.cache import CanonicalFilter, canonical_filter, get_page_cache
+from ase_discord_bot.api_util.circuit_breaker import BreakerState
+from ase_discord_bot.api_util.disk_cache import get_disk_cache
 from ase_discord_bot.api_util.model.filters import MovieFilter, TVShowFilter
-from ase_discord_bot.api_util.model.responses import Movie, MovieResponse, TVShow, TVShowResponse
+from ase_discord_bot.api_util.model.responses import DiscoverPage, LazyResults, MediaT, Movie, TVShow
+from ase_discord_bot.api_util.page_planner import FilterKey, get_page_planner
+from ase_discord_bot.api_util.rate_limit import deadline
+from ase_discord_bot.api_util.tmdb_client import TMDBResponse, get_client
+from ase_discord_bot.catalog.catalog import get_catalog
+from ase_discord_bot.catalog.records import MediaRecord
 from datetime import date
+from ase_discord_bot.config import FetchStrategy
 from ase_discord_bot.config_registry import get_config
+from ase_discord_bot.util.single_flight import SingleFlight
+
+logger = logging.getLogger("Api")
+
+# Canonical filter, MIN_VOTE_COUNT and page number
+PageKey = tuple[CanonicalFilter, int, int]
+
+_page_requests: SingleFlight[TMDBResponse] = SingleFlight()
+_page_refreshes: SingleFlight[TMDBResponse] = SingleFlight()
+_background_tasks: set[asyncio.Task] = set()
 
 
 def get_poster_url(path: str) -> str:
@@ -20,7 +43,7 @@ def get_poster_url(path: str) -> str:
     return (cfg.TMDB_IMAGES_BASE_URL / path).human_repr()
 
 
-def get_recommended_movie(movie_filter: MovieFilter) -> list[Movie] | list[int]:
+async def get_recommended_movie(movie_filter: MovieFilter) -> Sequence[Movie] | list[int]:
     """
     Retrieves recommended movies based on the given filter.
 
@@ -28,28 +51,22 @@ def get_recommended_movie(movie_filter: MovieFilter) -> list[Movie] | list[int]:
         movie_filter (MovieFilter): Filter criteria for movie recommendations.
 
     Returns:
-        list[Movie] | list[int]: A list of Movie objects, or HTTP error codes if all requests fail.
+        Sequence[Movie] | list[int]: A sequence of Movie objects, or HTTP error codes if all requests fail.
     """
-    responses = _request_recommendation(movie_filter)
+    cfg = get_config()
+    if (cataloged := _query_catalog(movie_filter)) is not None:
+        return cataloged
 
-    error_codes: list[int] = []
-    movies_data: list[Movie] = []
+    with deadline(cfg.TMDB_COMMAND_DEADLINE):
+        if cfg.FETCH_STRATEGY == FetchStrategy.SAMPLE:
+            return await _sample_recommendation(movie_filter, Movie)
 
-    for response in responses:
-        if response.status_code != 200:
-            error_codes.append(response.status_code)
-        else:
-            movie_data = MovieResponse(**response.json()).results
-            movies_data.extend(movie_data)
+        responses = await _request_recommendation(movie_filter)
 
-    # If every single request failed
-    if (len(error_codes) == len(responses) != 0):
-        return error_codes
-
-    return movies_data
+    return _collect_results(movie_filter, Movie, responses)
 
 
-def get_recommended_tvshow(tvshow_filter: TVShowFilter) -> list[TVShow] | list[int]:
+async def get_recommended_tvshow(tvshow_filter: TVShowFilter) -> Sequence[TVShow] | list[int]:
     """
     Retrieves recommended TV shows based on the given filter.
 
@@ -57,83 +74,467 @@ def get_recommended_tvshow(tvshow_filter: TVShowFilter) -> list[TVShow] | list[i
         tvshow_filter (TVShowFilter): Filter criteria for TV show recommendations.
 
     Returns:
-        list[TVShow] | list[int]: A list of TVShow objects, or HTTP error codes if all requests fail.
+        Sequence[TVShow] | list[int]: A sequence of TVShow objects, or HTTP error codes if all requests fail.
     """
-    responses = _request_recommendation(tvshow_filter)
+    cfg = get_config()
+    if (cataloged := _query_catalog(tvshow_filter)) is not None:
+        return cataloged
 
-    error_codes: list[int] = []
-    tvshows_data: list[TVShow] = []
+    with deadline(cfg.TMDB_COMMAND_DEADLINE):
+        if cfg.FETCH_STRATEGY == FetchStrategy.SAMPLE:
+            return await _sample_recommendation(tvshow_filter, TVShow)
 
-    for response in responses:
-        if response.status_code != 200:
-            error_codes.append(response.status_code)
-        else:
-            tvshow_data = TVShowResponse(**response.json()).results
-            tvshows_data.extend(tvshow_data)
+        responses = await _request_recommendation(tvshow_filter)
+
+    return _collect_results(tvshow_filter, TVShow, responses)
+
+
+def parse_discover_page(response: TMDBResponse) -> DiscoverPage:
+    """
+    Decodes a discover page, leaving its results unvalidated.
+
+    Args:
+        response (TMDBResponse): A successful discover response.
+
+    Returns:
+        DiscoverPage: The page with its raw results.
+    """
+    return DiscoverPage.model_validate_json(response.body)
+
+
+def _collect_results(
+    media_filter: MovieFilter | TVShowFilter,
+    model: type[MediaT],
+    responses: list[TMDBResponse],
+) -> LazyResults[MediaT] | list[int]:
+    """
+    Combines the results of all successful pages and adds them to the local catalog.
+
+    Each page is decoded once and its results are only validated when they are accessed,
+    so results that are never displayed are never validated.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter the pages were requested with.
+        model (type[MediaT]): Either Movie or TVShow.
+        responses (list[TMDBResponse]): The responses of the planned pages, starting at page 1.
+
+    Returns:
+        LazyResults[MediaT] | list[int]: The results of all pages, or HTTP error codes if all requests fail.
+    """
+    error_codes = [response.status_code for response in responses if response.status_code != 200]
 
     # If every single request failed
-    if (len(error_codes) == len(responses)):
+    if len(error_codes) == len(responses) != 0:
         return error_codes
 
-    return tvshows_data
+    pages = [parse_discover_page(response) for response in responses if response.status_code == 200]
+    _add_to_catalog(media_filter, responses, pages)
+    stale = any(response.stale for response in responses if response.status_code == 200)
+    return LazyResults(model, [result for page in pages for result in page.results], stale=stale)
 
 
-def _request_recommendation(media_filter: MovieFilter | TVShowFilter) -> list[requests.Response]:
+def _query_catalog(media_filter: MovieFilter | TVShowFilter) -> list[Movie] | list[TVShow] | None:
+    """
+    Answers a filter from the local catalog, if it covers the filter.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter criteria for the recommendations.
+
+    Returns:
+        list[Movie] | list[TVShow] | None: The results within the pages the page planner fetches at most,
+        or None if the filter has to be requested from TMDB.
+    """
+    cfg = get_config()
+    limit = get_page_planner().target_pages * cfg.TMDB_PAGE_SIZE
+    return get_catalog().query(media_filter, cfg.MIN_VOTE_COUNT, limit)
+
+
+def add_pages_to_catalog(media_filter: MovieFilter | TVShowFilter, responses: list[TMDBResponse]):
+    """
+    Adds all fetched pages of a filter's discover pool to the local catalog.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter the pages were requested with.
+        responses (list[TMDBResponse]): The responses of the planned pages, starting at page 1.
+    """
+    pages = [parse_discover_page(response) for response in responses if response.status_code == 200]
+    _add_to_catalog(media_filter, responses, pages)
+
+
+def _add_to_catalog(
+    media_filter: MovieFilter | TVShowFilter,
+    responses: list[TMDBResponse],
+    pages: list[DiscoverPage],
+):
+    """
+    Adds the results of a discover pool to the local catalog, unless a page failed or was stale.
+
+    The raw results are converted into catalog records directly, so no result is validated
+    into a model. Results lacking a field are left out.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter the pages were requested with.
+        responses (list[TMDBResponse]): The responses of the planned pages, starting at page 1.
+        pages (list[DiscoverPage]): The decoded successful pages.
+    """
+    catalog = get_catalog()
+    if not catalog.enabled or not responses \
+            or any(response.status_code != 200 or response.stale for response in responses):
+        return
+
+    complete = len(pages) >= pages[0].total_pages
+    catalog.add_pool(media_filter, get_config().MIN_VOTE_COUNT, _catalog_records(media_filter, pages), complete)
+
+
+def _catalog_records(media_filter: MovieFilter | TVShowFilter, pages: list[DiscoverPage]) -> list[MediaRecord]:
+    """
+    Converts the raw results of discover pages into catalog records, leaving malformed results out.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter the pages were requested with.
+        pages (list[DiscoverPage]): The decoded pages.
+
+    Returns:
+        list[MediaRecord]: The records of all well-formed results.
+    """
+    media_type = "movie" if isinstance(media_filter, MovieFilter) else "tv"
+    records = []
+    for page in pages:
+        for result in page.results:
+            try:
+                records.append(MediaRecord.from_result(media_type, result))
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Leaving malformed {media_type} result {result.get('id')} out of the catalog")
+    return records
+
+
+async def _request_recommendation(media_filter: MovieFilter | TVShowFilter) -> list[TMDBResponse]:
     """
     Sends paginated requests to TMDB based on the provided media filter.
 
+    The page planner chooses how many pages to request from the totals on page 1. For a
+    filter it has seen before, the pages it planned last time are requested together with
+    page 1, so the common case takes a single round of concurrent requests.
+
     Args:
         media_filter (MovieFilter | TVShowFilter): Filter for the API request.
 
     Returns:
-        list[requests.Response]: API responses from TMDB.
+        list[TMDBResponse]: API responses from TMDB, starting at page 1.
+    """
+    planner = get_page_planner()
+    key = _filter_key(media_filter)
+
+    responses = await _request_pages(media_filter, range(1, planner.planned_pages(key) + 1))
+    if responses[0].status_code != 200:
+        return responses[:1]
+
+    first_page = parse_discover_page(responses[0])
+    pages_count = planner.plan(key, first_page.total_pages, first_page.total_results)
+    if pages_count > len(responses):
+        responses += await _request_pages(media_filter, range(len(responses) + 1, pages_count + 1))
+
+    return responses[:pages_count]
+
+
+async def _sample_recommendation(
+    media_filter: MovieFilter | TVShowFilter,
+    model: type[MediaT],
+) -> LazyResults[MediaT] | list[int]:
+    """
+    Requests the first page and the pages containing RECOMMENDATION_COUNT random results.
+
+    The first page tells how many results lie within the pages the page planner chooses.
+    Random indices are drawn uniformly from that window and only the pages holding them are
+    requested, at most RECOMMENDATION_COUNT besides the first. All results of the fetched pages
+    form the pool the recommendations are picked from, so rerolls and the seen history have
+    more than the sampled results to choose from.
+
+    The fetched pages are ingested into the local catalog. Unless they are the first pages of
+    the filter, they do not cover it, so the catalog only learns their results.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter for the API request.
+        model (type[MediaT]): Either Movie or TVShow.
+
+    Returns:
+        LazyResults[MediaT] | list[int]: The results of the fetched pages, or the HTTP error code if
+        the first request fails.
     """
     cfg = get_config()
-    query_dict: dict[str, str | int] = {
-        "with_genres": media_filter.genre,
-        "sort_by": "vote_average.desc",
-        "vote_count.gte": cfg.MIN_VOTE_COUNT,
-    }
 
-    if isinstance(media_filter, MovieFilter):
-        media_type = "movie"
-    elif isinstance(media_filter, TVShowFilter):
-        media_type = "tv"
+    first_response = await request_page(media_filter, 1)
+    if first_response.status_code != 200:
+        return [first_response.status_code]
 
-    if media_filter.year:
-        if media_type == "movie":
-            query_dict["primary_release_year"] = media_filter.year
-        elif media_type == "tv":
-            query_dict["first_air_date_year"] = media_filter.year
+    first_page = parse_discover_page(first_response)
+    page_size = max(len(first_page.results), 1)
+    pages_count = get_page_planner().plan(_filter_key(media_filter), first_page.total_pages, first_page.total_results)
+    window_size = min(first_page.total_results, pages_count * page_size)
 
-    if media_filter.min_year:
-        min_year_date = date(media_filter.min_year, 1, 1)
-        if media_type == "movie":
-            query_dict["primary_release_date.gte"] = min_year_date.strftime("%Y-%m-%d")
-        elif media_type == "tv":
-            query_dict["first_air_date.gte"] = min_year_date.strftime("%Y-%m-%d")
+    indices = random.sample(range(window_size), min(cfg.RECOMMENDATION_COUNT, window_size))
+    missing_pages = sorted({index // page_size + 1 for index in indices} - {1})
+    responses = await _request_pages(media_filter, missing_pages)
 
-    if media_filter.max_year:
-        max_year_date = date(media_filter.max_year, 12, 31)
-        if media_type == "movie":
-            query_dict["primary_release_date.lte"] = max_year_date.strftime("%Y-%m-%d")
-        elif media_type == "tv":
-            query_dict["first_air_date.lte"] = max_year_date.strftime("%Y-%m-%d")
+    responses = [first_response, *responses]
+    pages = [first_page] + [parse_discover_page(response) for response in responses[1:] if response.status_code == 200]
 
-    if media_filter.original_language:
-        query_dict["with_original_language"] = media_filter.original_language.iso_code
+    if missing_pages == list(range(2, len(missing_pages) + 2)):
+        _add_to_catalog(media_filter, responses, pages)
+    elif get_catalog().enabled and not any(response.status_code != 200 or response.stale for response in responses):
+        get_catalog().index(media_filter).upsert(_catalog_records(media_filter, pages))
 
-    query_url = (cfg.TMDB_API_BASE_URL / f"discover/{media_type}").human_repr()
+    stale = any(response.stale for response in responses if response.status_code == 200)
+    return LazyResults(model, [result for page in pages for result in page.results], stale=stale)
 
-    responses = []
 
-    first_response = requests.get(url=query_url, params=query_dict, headers=cfg.TMDB_AUTH_HEADERS)
-    responses.append(first_response)
-    max_pages_count = int(responses[0].json()["total_pages"])
+async def _request_pages(media_filter: MovieFilter | TVShowFilter, pages: Iterable[int]) -> list[TMDBResponse]:
+    """
+    Requests the given pages concurrently, with at most MAX_CONCURRENT_API_REQUESTS in flight.
+
+    A failed page is logged and returned like any other response, so it never cancels its siblings.
 
-    for i in range(2, min(max_pages_count, cfg.MAX_API_PAGES_COUNT) + 1):
-        query_dict["page"] = i
-        response = requests.get(url=query_url, params=query_dict, headers=cfg.TMDB_AUTH_HEADERS)
-        responses.append(response)
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter for the API request.
+        pages (Iterable[int]): Page numbers to request.
 
-    return responses
+    Returns:
+        list[TMDBResponse]: API responses from TMDB, in the same order as `pages`.
+    """
+    cfg = get_config()
+    semaphore = asyncio.Semaphore(cfg.MAX_CONCURRENT_API_REQUESTS)
+
+    async def bounded_request_page(page: int) -> TMDBResponse:
+        async with semaphore:
+            response = await request_page(media_filter, page)
+        if response.status_code != 200:
+            logger.warning(f"Page {page} of {media_filter} failed with status code {response.status_code}")
+        return response
+
+    return list(await asyncio.gather(*(bounded_request_page(page) for page in pages)))
+
+
+def is_page_cached(media_filter: MovieFilter | TVShowFilter, page: int) -> bool:
+    """
+    Checks whether the page cache holds a fresh copy of a discover page, without counting a lookup.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter for the API request.
+        page (int): Page number.
+
+    Returns:
+        bool: True if the page is cached and not expired.
+    """
+    return _page_key(media_filter, page) in get_page_cache()
+
+
+async def request_page(media_filter: MovieFilter | TVShowFilter, page: int) -> TMDBResponse:
+    """
+    Requests a single discover page, served from the page cache or the disk cache if
+    either holds a fresh copy.
+
+    Successful responses are stored in both caches under the canonical filter, so
+    equivalent filters share their cached pages. Concurrent requests for the same
+    uncached page share a single lookup and API call.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter for the API request.
+        page (int): Page number to request.
+
+    Returns:
+        TMDBResponse: The API response from TMDB or the cache.
+    """
+    page_cache = get_page_cache()
+    key = _page_key(media_filter, page)
+
+    if (cached := page_cache.get(key)) is not None:
+        return cached
+
+    return await _page_requests.do(key, lambda: _fetch_page(media_filter, key))
+
+
+def _filter_key(media_filter: MovieFilter | TVShowFilter) -> FilterKey:
+    """
+    Builds the page planner key of a filter.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter for the API request.
+
+    Returns:
+        FilterKey: The canonical filter and MIN_VOTE_COUNT.
+    """
+    return canonical_filter(media_filter), get_config().MIN_VOTE_COUNT
+
+
+def _page_key(media_filter: MovieFilter | TVShowFilter, page: int) -> PageKey:
+    """
+    Builds the page cache key of a discover page.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter for the API request.
+        page (int): Page number.
+
+    Returns:
+        PageKey: The canonical filter, MIN_VOTE_COUNT and page number.
+    """
+    return *_filter_key(media_filter), page
+
+
+async def _fetch_page(media_filter: MovieFilter | TVShowFilter, key: PageKey) -> TMDBResponse:
+    """
+    Fetches a page missing from the page cache, from the disk cache or TMDB.
+    Disk access runs in a worker thread.
+
+    While the circuit breaker is not closed, or if TMDB fails, the last known-good copy
+    of the page is served as a stale response if one is cached. Once the breaker
+    half-opens, serving a stale page also refreshes it in the background.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter for the API request.
+        key (PageKey): Page cache key of the page.
+
+    Returns:
+        TMDBResponse: The API response from TMDB or the caches.
+    """
+    page_cache = get_page_cache()
+
+    if (body := await asyncio.to_thread(get_disk_cache().get, repr(key))) is not None:
+        response = TMDBResponse(200, body)
+        page_cache.set(key, response, len(body))
+        return response
+
+    breaker = get_client().breaker
+    if breaker is not None and breaker.state != BreakerState.CLOSED:
+        if (stale_response := await _stale_page(key)) is not None:
+            if breaker.state == BreakerState.HALF_OPEN:
+                _refresh_in_background(media_filter, key)
+            return stale_response
+
+    response = await _download_page(media_filter, key)
+    if response.status_code != 200 and (stale_response := await _stale_page(key)) is not None:
+        logger.warning(f"Serving stale page {key[2]} of {media_filter} after status code {response.status_code}")
+        return stale_response
+
+    return response
+
+
+async def _download_page(media_filter: MovieFilter | TVShowFilter, key: PageKey) -> TMDBResponse:
+    """
+    Requests a page from TMDB and stores it in the page cache and the disk cache if successful.
+    The download time of successful pages is reported to the page planner.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter for the API request.
+        key (PageKey): Page cache key of the page.
+
+    Returns:
+        TMDBResponse: The API response from TMDB.
+    """
+    path, query_dict = _build_query(media_filter)
+    if key[2] > 1:
+        query_dict["page"] = key[2]
+
+    started = time.monotonic()
+    response = await get_client().get(path, query_dict)
+    if response.status_code == 200:
+        get_page_planner().observe_latency(key[:2], time.monotonic() - started)
+        get_page_cache().set(key, response, len(response.body))
+        await asyncio.to_thread(get_disk_cache().set, repr(key), response.body)
+
+    return response
+
+
+async def _stale_page(key: PageKey) -> TMDBResponse | None:
+    """
+    Looks up the last known-good copy of a page, even if it has expired.
+
+    Args:
+        key (PageKey): Page cache key of the page.
+
+    Returns:
+        TMDBResponse | None: The page marked as stale, or None if neither cache holds it.
+    """
+    if (cached := get_page_cache().get(key, allow_stale=True)) is not None:
+        return TMDBResponse(cached.status_code, cached.body, stale=True)
+
+    if (body := await asyncio.to_thread(get_disk_cache().get, repr(key), True)) is not None:
+        return TMDBResponse(200, body, stale=True)
+
+    return None
+
+
+def _refresh_in_background(media_filter: MovieFilter | TVShowFilter, key: PageKey):
+    """
+    Starts downloading a fresh copy of a page without waiting for it.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter for the API request.
+        key (PageKey): Page cache key of the page.
+    """
+    task = asyncio.ensure_future(_page_refreshes.do(key, lambda: _download_page(media_filter, key)))
+    # Keep a reference, the event loop only holds weak references to tasks
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def served_stale(results: Sequence[Movie] | Sequence[TVShow]) -> bool:
+    """
+    Returns whether recommendations were built from stale cached pages, because TMDB failed
+    or the circuit breaker is not closed.
+
+    Args:
+        results (Sequence[Movie] | Sequence[TVShow]): Results returned by get_recommended_movie
+            or get_recommended_tvshow.
+
+    Returns:
+        bool: True if any page the results come from was stale.
+    """
+    return isinstance(results, LazyResults) and results.stale
+
+
+def _build_query(media_filter: MovieFilter | TVShowFilter) -> tuple[str, dict[str, str | int]]:
+    """
+    Builds the discover endpoint path and query parameters for the provided media filter.
+
+    The query is built from the canonical filter, so equivalent filters produce the same query.
+
+    Args:
+        media_filter (MovieFilter | TVShowFilter): Filter for the API request.
+
+    Returns:
+        tuple[str, dict[str, str | int]]: The endpoint path and the query parameters.
+    """
+    cfg = get_config()
+    canonical = canonical_filter(media_filter)
+    media_type = canonical.media_type
+
+    query_dict: dict[str, str | int] = {
+        "with_genres": canonical.genre,
+        "sort_by": "vote_average.desc",
+        "vote_count.gte": cfg.MIN_VOTE_COUNT,
+    }
+
+    if canonical.min_year and canonical.min_year == canonical.max_year:
+        if media_type == "movie":
+            query_dict["primary_release_year"] = canonical.min_year
+        elif media_type == "tv":
+            query_dict["first_air_date_year"] = canonical.min_year
+    else:
+        if canonical.min_year:
+            min_year_date = date(canonical.min_year, 1, 1)
+            if media_type == "movie":
+                query_dict["primary_release_date.gte"] = min_year_date.strftime("%Y-%m-%d")
+            elif media_type == "tv":
+                query_dict["first_air_date.gte"] = min_year_date.strftime("%Y-%m-%d")
+
+        if canonical.max_year:
+            max_year_date = date(canonical.max_year, 12, 31)
+            if media_type == "movie":
+                query_dict["primary_release_date.lte"] = max_year_date.strftime("%Y-%m-%d")
+            elif media_type == "tv":
+                query_dict["first_air_date.lte"] = max_year_date.strftime("%Y-%m-%d")
+
+    if canonical.language:
+        query_dict["with_original_language"] = canonical.language
+
+    return f"discover/{media_type}", query_dict
@@ -0,0 +1,281 @@
+import time
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, Optional
+from ase_discord_bot.api_util.model.filters import MovieFilter, TVShowFilter
+from ase_discord_bot.api_util.model.languages import Language
+from ase_discord_bot.config_registry import get_config
+
+
+@dataclass(frozen=True)
+class CanonicalFilter:
+    """
+    Normalized, hashable form of a MovieFilter or TVShowFilter.
+
+    Filters that yield the same TMDB results map to equal canonical filters:
+    a single year is stored as a range from and to that year, and the language
+    is stored as its ISO code.
+
+    Attributes
+    ----------
+    media_type : str
+        Either "movie" or "tv".
+    genre : int
+        The genre ID.
+    min_year : Optional[int]
+        Minimum release year.
+    max_year : Optional[int]
+        Maximum release year.
+    language : Optional[str]
+        ISO code of the original language.
+    """
+    media_type: str
+    genre: int
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+    language: Optional[str] = None
+
+
+def canonical_filter(media_filter: MovieFilter | TVShowFilter) -> CanonicalFilter:
+    """
+    Build the canonical form of a media filter.
+
+    Parameters
+    ----------
+    media_filter : MovieFilter | TVShowFilter
+        The filter to normalize.
+
+    Returns
+    -------
+    CanonicalFilter
+        The canonical filter.
+    """
+    media_type = "movie" if isinstance(media_filter, MovieFilter) else "tv"
+
+    min_year, max_year = media_filter.min_year, media_filter.max_year
+    if media_filter.year:
+        min_year = max_year = media_filter.year
+
+    language = media_filter.original_language
+    if isinstance(language, str):
+        # Accept a code or name that has not been resolved to a Language yet
+        language = Language.from_fuzzy(language)
+
+    return CanonicalFilter(
+        media_type,
+        int(media_filter.genre),
+        min_year or None,
+        max_year or None,
+        language.iso_code if language else None,
+    )
+
+
+class TTLCache:
+    """
+    In-memory cache with per-entry expiry and least-recently-used eviction.
+
+    The cache is bounded both by its number of entries and by the total size of its values,
+    or only by its number of entries if it has no byte budget.
+    Expired entries are not returned by regular lookups, but are kept as stale copies
+    until they are evicted or replaced. Hits and misses are counted for monitoring.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Parameters
+        ----------
+        ttl : float
+            Seconds after which an entry expires. A ttl of 0 disables the cache.
+        max_entries : int
+            Maximum number of entries held at once.
+        max_bytes : Optional[int]
+            Maximum total size of all values held at once, no byte budget if None.
+        clock : Callable[[], float]
+            Time source in seconds, replaceable for testing.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """
+        Check for a fresh entry without counting a hit or miss or marking it as used.
+        """
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self._clock()
+
+    def expires_in(self, key: Hashable) -> float:
+        """
+        Seconds until an entry expires, without counting a hit or miss or marking it as used.
+
+        Parameters
+        ----------
+        key : Hashable
+            The cache key.
+
+        Returns
+        -------
+        float
+            The remaining seconds, 0 if the entry is missing or expired.
+        """
+        entry = self._entries.get(key)
+        return max(entry[0] - self._clock(), 0.0) if entry is not None else 0.0
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        Total size of all held values.
+        """
+        return self._bytes
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Share of lookups that were hits, 0 if there were none.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Any | None:
+        """
+        Look up a value and mark it as recently used.
+
+        Parameters
+        ----------
+        key : Hashable
+            The cache key.
+        allow_stale : bool
+            Also return expired values. Stale lookups are not counted as hits or misses.
+
+        Returns
+        -------
+        Any | None
+            The cached value, or None if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if allow_stale:
+            return entry[2] if entry is not None else None
+
+        if entry is None or entry[0] <= self._clock():
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def set(self, key: Hashable, value: Any, size: int = 0):
+        """
+        Store a value, evicting the least recently used entries if a budget is exceeded.
+
+        Values larger than the whole byte budget are not stored.
+
+        Parameters
+        ----------
+        key : Hashable
+            The cache key.
+        value : Any
+            The value to store.
+        size : int
+            Size of the value in bytes, counted against the byte budget. Can be left out without one.
+        """
+        if self.ttl <= 0 or self._over_budget(size):
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (self._clock() + self.ttl, size, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._over_budget(self._bytes):
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, key: Hashable):
+        """
+        Remove an entry, if it exists.
+
+        Parameters
+        ----------
+        key : Hashable
+            The cache key.
+        """
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self):
+        """
+        Remove all entries. The hit and miss counters are kept.
+        """
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        Snapshot of the cache counters.
+
+        Returns
+        -------
+        dict[str, int | float]
+            Entries, bytes, hits, misses and hit ratio.
+        """
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+        }
+
+    def _over_budget(self, size: int) -> bool:
+        """
+        Whether a number of bytes exceeds the byte budget, never without one.
+        """
+        return self.max_bytes is not None and size > self.max_bytes
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+_page_cache: TTLCache | None = None
+
+
+def set_page_cache(cache: TTLCache | None):
+    """
+    Replace the global discover page cache.
+
+    Parameters
+    ----------
+    cache : TTLCache | None
+        The cache to set, or None to rebuild it from the configuration on next use.
+    """
+    global _page_cache
+    _page_cache = cache
+
+
+def get_page_cache() -> TTLCache:
+    """
+    Retrieve the global discover page cache, creating it from the configuration on first use.
+
+    Returns
+    -------
+    TTLCache
+        The page cache.
+    """
+    global _page_cache
+    if _page_cache is None:
+        cfg = get_config()
+        _page_cache = TTLCache(cfg.API_CACHE_TTL, cfg.API_CACHE_MAX_ENTRIES, cfg.API_CACHE_MAX_BYTES)
+    return _page_cache
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+
+from collections.abc import Callable
+from ase_discord_bot.api_util import api_calls
+from ase_discord_bot.api_util.cache import canonical_filter
+from ase_discord_bot.api_util.circuit_breaker import BreakerState
+from ase_discord_bot.api_util.model.filters import MovieFilter, TVShowFilter
+from ase_discord_bot.api_util.model.genres import MovieGenre, TVShowGenre
+from ase_discord_bot.api_util.model.languages import Language
+from ase_discord_bot.api_util.page_planner import get_page_planner
+from ase_discord_bot.api_util.rate_limit import TokenBucket
+from ase_discord_bot.api_util.tmdb_client import TMDBResponse, get_client
+from ase_discord_bot.config import Config
+from ase_discord_bot.config_registry import get_config
+
+logger = logging.getLogger("Warmer")
+
+# Number of warmed filters between two progress log messages
+PROGRESS_LOG_INTERVAL = 10
+
+
+def warmup_filters(languages: list[Language]) -> list[MovieFilter | TVShowFilter]:
+    """
+    Build the filters to warm: every movie and TV show genre, without a language
+    and with each of the given languages.
+
+    Parameters
+    ----------
+    languages : list[Language]
+        The languages to combine with every genre.
+
+    Returns
+    -------
+    list[MovieFilter | TVShowFilter]
+        The filters, genres without a language first.
+    """
+    media_filters: list[MovieFilter | TVShowFilter] = []
+    for language in [None, *languages]:
+        media_filters.extend(MovieFilter(genre.id, original_language=language) for genre in MovieGenre)
+        media_filters.extend(TVShowFilter(genre.id, original_language=language) for genre in TVShowGenre)
+    return media_filters
+
+
+class CacheWarmer:
+    """
+    Background task that pre-fetches the discover pages of popular filters into the caches.
+
+    Each run walks all filters and loads every page chosen by the page planner that is
+    not fresh in the page cache, then adds the pool to the local catalog. Pages found in
+    the disk cache cost no request. To stay out of the way of live commands, pages are
+    fetched one at a time, paced by a token bucket of their own, each run stops after
+    `request_budget` TMDB requests, and nothing is fetched while the circuit breaker is not closed.
+    """
+
+    def __init__(self, media_filters: list[MovieFilter | TVShowFilter], interval: float,
+                 request_budget: int, requests_per_second: float):
+        """
+        Parameters
+        ----------
+        media_filters : list[MovieFilter | TVShowFilter]
+            The filters to warm.
+        interval : float
+            Seconds between the start of two runs, a single run if 0.
+        request_budget : int
+            Maximum number of TMDB requests per run.
+        requests_per_second : float
+            Maximum rate of TMDB requests sent by the warmer.
+        """
+        self.media_filters = media_filters
+        self.interval = interval
+        self.request_budget = request_budget
+        self._pacer = TokenBucket(requests_per_second, 1)
+
+    async def run(self):
+        """
+        Warm the caches now and then every `interval` seconds, until cancelled.
+        """
+        while True:
+            try:
+                await self.warm()
+            except Exception:
+                logger.exception("Warm-up run failed")
+
+            if self.interval <= 0:
+                return
+            await asyncio.sleep(self.interval)
+
+    async def warm(self) -> int:
+        """
+        Run a single warm-up over all filters.
+
+        Returns
+        -------
+        int
+            The number of TMDB requests sent.
+        """
+        client = get_client()
+        requests_at_start = client.request_count
+
+        def used() -> int:
+            return client.request_count - requests_at_start
+
+        logger.info(f"Warm-up started for {len(self.media_filters)} filters")
+        warmed = 0
+        for media_filter in self.media_filters:
+            if used() >= self.request_budget:
+                logger.info(f"Warm-up request budget of {self.request_budget} exhausted")
+                break
+            if client.breaker is not None and client.breaker.state != BreakerState.CLOSED:
+                logger.warning("Warm-up paused, TMDB is unavailable")
+                break
+
+            await self._warm_filter(media_filter, lambda: used() < self.request_budget)
+            warmed += 1
+            if warmed % PROGRESS_LOG_INTERVAL == 0:
+                logger.info(f"Warm-up progress: {warmed}/{len(self.media_filters)} filters, {used()} requests")
+
+        logger.info(f"Warm-up finished: {warmed}/{len(self.media_filters)} filters, {used()} requests")
+        return used()
+
+    async def _warm_filter(self, media_filter: MovieFilter | TVShowFilter, within_budget: Callable[[], bool]):
+        """
+        Load all pages of a filter that are not fresh in the page cache and add
+        the complete pool to the catalog.
+        """
+        cfg = get_config()
+
+        first_response = await self._warm_page(media_filter, 1)
+        if first_response.status_code != 200:
+            return
+
+        responses = [first_response]
+        first_page = api_calls.parse_discover_page(first_response)
+        key = (canonical_filter(media_filter), cfg.MIN_VOTE_COUNT)
+        pages_count = get_page_planner().plan(key, first_page.total_pages, first_page.total_results)
+        for page in range(2, pages_count + 1):
+            if not within_budget():
+                return
+            response = await self._warm_page(media_filter, page)
+            if response.status_code != 200:
+                return
+            responses.append(response)
+
+        api_calls.add_pages_to_catalog(media_filter, responses)
+
+    async def _warm_page(self, media_filter: MovieFilter | TVShowFilter, page: int) -> TMDBResponse:
+        """
+        Load a single page, pacing the request unless the page is fresh in the page cache.
+        """
+        if not api_calls.is_page_cached(media_filter, page):
+            await self._pacer.acquire()
+        return await api_calls.request_page(media_filter, page)
+
+
+_warmer_task: asyncio.Task | None = None
+
+
+def start_cache_warmer(cfg: Config):
+    """
+    Start the global cache warmer task from the configuration, unless it is running
+    or disabled by a request budget of 0.
+
+    Parameters
+    ----------
+    cfg : Config
+        The configuration to build the warmer from.
+    """
+    global _warmer_task
+    if _warmer_task is not None or cfg.WARMUP_REQUEST_BUDGET <= 0:
+        return
+
+    languages = []
+    for name in cfg.WARMUP_LANGUAGES:
+        if (language := Language.from_fuzzy(name)) is not None:
+            languages.append(language)
+        else:
+            logger.warning(f"Ignoring unknown warm-up language '{name}'")
+
+    warmer = CacheWarmer(
+        warmup_filters(languages),
+        cfg.WARMUP_INTERVAL,
+        cfg.WARMUP_REQUEST_BUDGET,
+        cfg.WARMUP_REQUESTS_PER_SECOND,
+    )
+    _warmer_task = asyncio.create_task(warmer.run())
+
+
+async def stop_cache_warmer():
+    """
+    Cancel the global cache warmer task, if it is running.
+    """
+    global _warmer_task
+    if _warmer_task is not None:
+        _warmer_task.cancel()
+        try:
+            await _warmer_task
+        except asyncio.CancelledError:
+            pass
+        _warmer_task = None
@@ -0,0 +1,113 @@
+import logging
+import time
+
+from collections.abc import Callable
+from enum import Enum
+from typing import Optional
+
+logger = logging.getLogger("CircuitBreaker")
+
+
+class BreakerState(str, Enum):
+    """
+    Enum of the circuit breaker states.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker guarding an upstream API.
+
+    The breaker opens after `failure_threshold` consecutive failed requests, where a
+    request slower than the latency budget counts as failed. While open, no requests
+    are let through. After `reset_timeout` seconds it half-opens and lets a single probe
+    request through: success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, latency_budget: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Parameters
+        ----------
+        failure_threshold : int
+            Number of consecutive failures that open the breaker.
+        reset_timeout : float
+            Seconds the breaker stays open before letting a probe through.
+        latency_budget : Optional[float]
+            Seconds after which a successful request still counts as failed, no budget if None.
+        clock : Callable[[], float]
+            Monotonic time source in seconds, replaceable for testing.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_budget = latency_budget
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> BreakerState:
+        """
+        The current state, half-open once the reset timeout of an open breaker has passed.
+        """
+        if self._opened_at is None:
+            return BreakerState.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return BreakerState.HALF_OPEN
+        return BreakerState.OPEN
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a request may be sent now. In the half-open state this claims the probe.
+
+        Returns
+        -------
+        bool
+            True if the request may be sent.
+        """
+        state = self.state
+        if state == BreakerState.CLOSED:
+            return True
+        if state == BreakerState.OPEN:
+            return False
+
+        now = self._clock()
+        # A probe that never reported back (e.g. it was cancelled) is replaced after the reset timeout
+        if self._probe_started_at is not None and now - self._probe_started_at < self.reset_timeout:
+            return False
+        self._probe_started_at = now
+        return True
+
+    def record(self, success: bool, latency: float):
+        """
+        Record the outcome of a request that was let through.
+
+        Parameters
+        ----------
+        success : bool
+            Whether the upstream answered successfully.
+        latency : float
+            Duration of the request in seconds.
+        """
+        if success and self.latency_budget is not None and latency > self.latency_budget:
+            logger.warning(f"Request took {latency:.2f}s, exceeding the latency budget of {self.latency_budget}s")
+            success = False
+
+        if success:
+            if self._opened_at is not None:
+                logger.info("Circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started_at = None
+            return
+
+        self._failures += 1
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.warning(f"Circuit opened after {self._failures} consecutive failures")
+            self._opened_at = self._clock()
+            self._probe_started_at = None
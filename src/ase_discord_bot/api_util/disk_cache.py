@@ -0,0 +1,224 @@
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+from collections.abc import Callable
+from pathlib import Path
+from ase_discord_bot.config_registry import get_config
+
+logger = logging.getLogger("DiskCache")
+
+# Share of the TTL after which a read refreshes the access time of an entry
+ACCESS_UPDATE_FRACTION = 0.1
+
+
+class DiskCache:
+    """
+    Persistent key-value cache stored in a SQLite database in WAL mode.
+
+    Values are zlib-compressed bytes. Entries expire after a fixed TTL, but are kept as
+    stale copies until the compressed size exceeds the byte budget. Then expired entries
+    are evicted first, followed by the least recently used ones. Reads only refresh the
+    access time of an entry once it is older than ACCESS_UPDATE_FRACTION of the TTL, so
+    frequent hits do not turn into writes.
+    The database is only opened on first use, so creating the cache costs nothing.
+
+    The methods block on disk I/O and are meant to be run in a worker thread,
+    e.g. with asyncio.to_thread, so a lock serializes access to the shared connection.
+    """
+
+    def __init__(self, path: Path, ttl: float, max_bytes: int, clock: Callable[[], float] = time.time):
+        """
+        Parameters
+        ----------
+        path : Path
+            Path of the SQLite database file, parent directories are created as needed.
+        ttl : float
+            Seconds after which an entry expires.
+        max_bytes : int
+            Maximum total compressed size of all values.
+        clock : Callable[[], float]
+            Time source in seconds, replaceable for testing.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._bytes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+            connection.commit()
+            self._bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            self._connection = connection
+            logger.info(f"Opened disk cache at {self.path} ({self._bytes} bytes)")
+        return self._connection
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        Total compressed size of all held values.
+        """
+        with self._lock:
+            self._connect()
+            return self._bytes
+
+    def get(self, key: str, allow_stale: bool = False) -> bytes | None:
+        """
+        Look up a value and mark it as recently used, unless it was marked recently.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        allow_stale : bool
+            Also return expired values.
+
+        Returns
+        -------
+        bytes | None
+            The decompressed value, or None if it is missing or expired.
+        """
+        if self.ttl <= 0:
+            return None
+
+        with self._lock:
+            connection = self._connect()
+            now = self._clock()
+            row = connection.execute(
+                "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] <= now and not allow_stale):
+                return None
+            if now - row[2] >= self.ttl * ACCESS_UPDATE_FRACTION:
+                connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                connection.commit()
+        return zlib.decompress(row[0])
+
+    def set(self, key: str, value: bytes):
+        """
+        Store a value, evicting expired and least recently used entries if the budget is exceeded.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        value : bytes
+            The value to store.
+        """
+        if self.ttl <= 0:
+            return
+
+        compressed = zlib.compress(value)
+        if len(compressed) > self.max_bytes:
+            return
+
+        with self._lock:
+            connection = self._connect()
+            now = self._clock()
+            self._delete(connection, [key])
+            connection.execute(
+                "INSERT INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, compressed, len(compressed), now + self.ttl, now),
+            )
+            self._bytes += len(compressed)
+            if self._bytes > self.max_bytes:
+                self._evict(connection, now)
+            connection.commit()
+
+    def delete(self, key: str):
+        """
+        Remove an entry, if it exists.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        """
+        with self._lock:
+            connection = self._connect()
+            self._delete(connection, [key])
+            connection.commit()
+
+    def close(self):
+        """
+        Close the database connection. The cache reopens it on next use.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _delete(self, connection: sqlite3.Connection, keys: list[str]):
+        for key in keys:
+            row = connection.execute("DELETE FROM entries WHERE key = ? RETURNING size", (key,)).fetchone()
+            if row is not None:
+                self._bytes -= row[0]
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        expired = connection.execute("SELECT key FROM entries WHERE expires_at <= ?", (now,)).fetchall()
+        self._delete(connection, [key for key, in expired])
+
+        evicted = []
+        excess = self._bytes - self.max_bytes
+        for key, size in connection.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            if excess <= 0:
+                break
+            evicted.append(key)
+            excess -= size
+        self._delete(connection, evicted)
+
+
+_disk_cache: DiskCache | None = None
+
+
+def set_disk_cache(cache: DiskCache | None):
+    """
+    Replace the global disk cache.
+
+    Parameters
+    ----------
+    cache : DiskCache | None
+        The cache to set, or None to rebuild it from the configuration on next use.
+    """
+    global _disk_cache
+    _disk_cache = cache
+
+
+def get_disk_cache() -> DiskCache:
+    """
+    Retrieve the global disk cache, creating it from the configuration on first use.
+
+    Returns
+    -------
+    DiskCache
+        The disk cache.
+    """
+    global _disk_cache
+    if _disk_cache is None:
+        cfg = get_config()
+        _disk_cache = DiskCache(Path(cfg.DISK_CACHE_DIR) / "tmdb_pages.sqlite3",
+                                cfg.DISK_CACHE_TTL, cfg.DISK_CACHE_MAX_BYTES)
+    return _disk_cache
+
+
+def close_disk_cache():
+    """
+    Close the global disk cache, if it exists.
+    """
+    if _disk_cache is not None:
+        _disk_cache.close()
@@ -1,6 +1,12 @@
-from typing import Optional
+import logging
+import numpy as np
+
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from typing import Any, Generic, Optional, TypeVar, overload
 from pydantic import BaseModel
 
+logger = logging.getLogger("Results")
+
 
 class MediaBase(BaseModel):
     """
@@ -123,3 +129,189 @@ class TVShowResponse(BaseModel):
     results: list[TVShow]
     total_pages: int
     total_results: int
+
+
+class DiscoverPage(BaseModel):
+    """
+    Response model for discover queries that leaves the results unvalidated.
+
+    Only the page fields are validated, the results are kept as the decoded JSON
+    objects, so parsing a page costs no more than decoding it.
+
+    Attributes
+    ----------
+    page : int
+        Current page number.
+    results : list[dict[str, Any]]
+        List of raw results.
+    total_pages : int
+        Total number of pages.
+    total_results : int
+        Total number of results.
+    """
+    page: int
+    results: list[dict[str, Any]]
+    total_pages: int
+    total_results: int
+
+
+MediaT = TypeVar("MediaT", Movie, TVShow)
+
+
+class LazyResults(Sequence[MediaT], Generic[MediaT]):
+    """
+    Sequence of raw results that are validated into a model only when accessed.
+
+    Every result is validated at most once, so sampling a few results of a large pool
+    only validates the sampled ones. Validation is as strict as for the models themselves,
+    `get` skips results that fail it instead of raising.
+    Numeric fields of all results can be read as columns without validating any of them.
+    """
+
+    def __init__(self, model: type[MediaT], raw_results: list[Any],
+                 validate: Optional[Callable[[Any], MediaT]] = None,
+                 columns: Optional[Mapping[str, np.ndarray]] = None, stale: bool = False):
+        """
+        Parameters
+        ----------
+        model : type[MediaT]
+            Either Movie or TVShow.
+        raw_results : list[Any]
+            The raw results, e.g. the JSON objects of one or more DiscoverPage.
+        validate : Optional[Callable[[Any], MediaT]]
+            Converts a raw result into the model, `model.model_validate` if None.
+        columns : Optional[Mapping[str, np.ndarray]]
+            Precomputed numeric fields of the raw results by field name, if at hand.
+        stale : bool
+            Whether any of the results come from an expired copy of a page.
+        """
+        self.model = model
+        self.stale = stale
+        self._raw_results = raw_results
+        self._validate = validate or model.model_validate
+        self._columns = columns or {}
+        self._validated: list[Optional[MediaT]] = [None] * len(raw_results)
+        self._invalid: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._raw_results)
+
+    @overload
+    def __getitem__(self, index: int) -> MediaT: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[MediaT]: ...
+
+    def __getitem__(self, index: int | slice) -> MediaT | list[MediaT]:
+        """
+        Validate and return the result at an index, or the results of a slice.
+
+        Raises
+        ------
+        pydantic.ValidationError
+            If an accessed result does not match the model.
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        media = self._validated[index]
+        if media is None:
+            media = self._validated[index] = self._validate(self._raw_results[index])
+        return media
+
+    def __iter__(self) -> Iterator[MediaT]:
+        return (self[i] for i in range(len(self)))
+
+    def get(self, index: int) -> Optional[MediaT]:
+        """
+        Validate and return the result at an index, logging a warning the first time it is invalid.
+
+        Parameters
+        ----------
+        index : int
+            Position of the result.
+
+        Returns
+        -------
+        Optional[MediaT]
+            The result, or None if it does not match the model.
+        """
+        if index in self._invalid:
+            return None
+        try:
+            return self[index]
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Skipping malformed {self.model.__name__} result at position {index}: {e}")
+            self._invalid.add(index)
+            return None
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Read a numeric field of every result, without validating them.
+
+        Parameters
+        ----------
+        name : str
+            The field name, e.g. "vote_average".
+
+        Returns
+        -------
+        np.ndarray
+            The field values as floats, 0 where a raw result lacks a numeric value.
+        """
+        if (column := self.precomputed(name)) is not None:
+            return column
+        return np.fromiter((_to_number(value) for value in self.raw_values(name)), dtype=np.float64,
+                           count=len(self._raw_results))
+
+    def precomputed(self, name: str) -> Optional[np.ndarray]:
+        """
+        The precomputed column of a field, if one was given.
+
+        Parameters
+        ----------
+        name : str
+            The column name.
+
+        Returns
+        -------
+        Optional[np.ndarray]
+            The column, or None.
+        """
+        return self._columns.get(name)
+
+    def raw_values(self, name: str) -> list[Any]:
+        """
+        Read a field of every raw result, without validating them.
+
+        Parameters
+        ----------
+        name : str
+            The field name.
+
+        Returns
+        -------
+        list[Any]
+            The unvalidated values, None where a raw result lacks the field.
+        """
+        return [
+            raw.get(name) if isinstance(raw, dict) else getattr(raw, name, None)
+            for raw in self._raw_results
+        ]
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Compare element-wise with another sequence of results, like lists do. Validates every result.
+        """
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+def _to_number(value: Any) -> float:
+    """
+    A raw numeric value as a float, or 0 if it is not numeric.
+    """
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else 0.0
@@ -0,0 +1,224 @@
+import math
+
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from ase_discord_bot.api_util.cache import CanonicalFilter
+from ase_discord_bot.config_registry import get_config
+
+# Canonical filter and MIN_VOTE_COUNT
+FilterKey = tuple[CanonicalFilter, int]
+
+# Number of filters whose statistics are kept, the least recently planned ones are dropped first
+MAX_TRACKED_FILTERS = 10000
+
+# Weight of the newest latency sample in the moving average
+LATENCY_SMOOTHING = 0.3
+
+
+@dataclass(slots=True)
+class FilterStats:
+    """
+    What the planner has learned about one filter.
+
+    Attributes
+    ----------
+    plans : int
+        Number of times pages were planned for the filter.
+    total_results : int
+        Number of results TMDB reported for the filter the last time.
+    total_pages : int
+        Number of pages TMDB reported for the filter the last time.
+    page_latency : float
+        Moving average of the seconds a page download took, 0 until one was downloaded.
+    planned_pages : int
+        Number of pages planned the last time.
+    """
+    plans: int = 0
+    total_results: int = 0
+    total_pages: int = 0
+    page_latency: float = 0.0
+    planned_pages: int = 0
+
+
+class PagePlanner:
+    """
+    Chooses how many discover pages to fetch for a filter.
+
+    A filter needs enough pages to fill a pool of `target_pool_size` results, but never
+    more than it has or than `max_pages`. If its pages took long to download, the plan
+    is cut to the pages that can be fetched within `latency_budget` at the configured
+    concurrency. Since the totals are remembered per filter, a filter requested before
+    can have all of its planned pages requested at once, without waiting for page 1.
+    """
+
+    def __init__(self, target_pool_size: int, page_size: int, max_pages: int, max_concurrency: int,
+                 latency_budget: float):
+        """
+        Parameters
+        ----------
+        target_pool_size : int
+            Number of results a pool should hold.
+        page_size : int
+            Number of results per page.
+        max_pages : int
+            Maximum number of pages fetched for a filter.
+        max_concurrency : int
+            Number of pages requested concurrently.
+        latency_budget : float
+            Seconds the pages of a filter should take to download.
+        """
+        self.target_pool_size = target_pool_size
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.max_concurrency = max_concurrency
+        self.latency_budget = latency_budget
+        self._stats: OrderedDict[FilterKey, FilterStats] = OrderedDict()
+
+    @property
+    def target_pages(self) -> int:
+        """
+        Number of pages holding a full pool, at most `max_pages`.
+        """
+        return max(1, min(math.ceil(self.target_pool_size / self.page_size), self.max_pages))
+
+    def plan(self, key: FilterKey, total_pages: int, total_results: int) -> int:
+        """
+        Choose how many pages to fetch for a filter, given the totals reported on its first page.
+
+        Parameters
+        ----------
+        key : FilterKey
+            The canonical filter and MIN_VOTE_COUNT.
+        total_pages : int
+            Number of pages TMDB reported.
+        total_results : int
+            Number of results TMDB reported.
+
+        Returns
+        -------
+        int
+            The number of pages, starting at page 1, at least 1.
+        """
+        stats = self._get_or_add(key)
+        stats.plans += 1
+        stats.total_pages = total_pages
+        stats.total_results = total_results
+        stats.planned_pages = self._pages(stats)
+        return stats.planned_pages
+
+    def planned_pages(self, key: FilterKey) -> int:
+        """
+        Number of pages that can be requested before page 1 arrives, from what was learned
+        about the filter before.
+
+        Parameters
+        ----------
+        key : FilterKey
+            The canonical filter and MIN_VOTE_COUNT.
+
+        Returns
+        -------
+        int
+            The number of pages the last totals call for, 1 if the filter is unknown.
+        """
+        stats = self._stats.get(key)
+        return self._pages(stats) if stats is not None and stats.plans else 1
+
+    def observe_latency(self, key: FilterKey, seconds: float):
+        """
+        Record how long downloading a page of a filter took.
+
+        Parameters
+        ----------
+        key : FilterKey
+            The canonical filter and MIN_VOTE_COUNT.
+        seconds : float
+            Duration of the download.
+        """
+        stats = self._get_or_add(key)
+        if stats.page_latency == 0:
+            stats.page_latency = seconds
+        else:
+            stats.page_latency += LATENCY_SMOOTHING * (seconds - stats.page_latency)
+
+    def filter_stats(self, key: FilterKey) -> FilterStats | None:
+        """
+        What was learned about a filter.
+
+        Parameters
+        ----------
+        key : FilterKey
+            The canonical filter and MIN_VOTE_COUNT.
+
+        Returns
+        -------
+        FilterStats | None
+            The statistics, or None if the filter is unknown.
+        """
+        return self._stats.get(key)
+
+    def stats(self) -> dict[FilterKey, dict[str, int | float]]:
+        """
+        Snapshot of the statistics of all tracked filters.
+
+        Returns
+        -------
+        dict[FilterKey, dict[str, int | float]]
+            Plans, totals, page latency and planned pages of every filter.
+        """
+        return {key: asdict(stats) for key, stats in self._stats.items()}
+
+    def _pages(self, stats: FilterStats) -> int:
+        """
+        Number of pages to fetch for a filter with the given statistics.
+        """
+        pages = min(self.target_pages, max(stats.total_pages, 1))
+        if stats.page_latency > 0:
+            affordable_waves = max(1, int(self.latency_budget // stats.page_latency))
+            pages = min(pages, affordable_waves * self.max_concurrency)
+        return pages
+
+    def _get_or_add(self, key: FilterKey) -> FilterStats:
+        """
+        The statistics of a filter, tracking it if it is new.
+        """
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = FilterStats()
+            while len(self._stats) > MAX_TRACKED_FILTERS:
+                self._stats.popitem(last=False)
+        self._stats.move_to_end(key)
+        return stats
+
+
+_planner: PagePlanner | None = None
+
+
+def set_page_planner(planner: PagePlanner | None):
+    """
+    Replace the global page planner.
+
+    Parameters
+    ----------
+    planner : PagePlanner | None
+        The planner to set, or None to rebuild it from the configuration on next use.
+    """
+    global _planner
+    _planner = planner
+
+
+def get_page_planner() -> PagePlanner:
+    """
+    Retrieve the global page planner, creating it from the configuration on first use.
+
+    Returns
+    -------
+    PagePlanner
+        The planner.
+    """
+    global _planner
+    if _planner is None:
+        cfg = get_config()
+        _planner = PagePlanner(cfg.TARGET_POOL_SIZE, cfg.TMDB_PAGE_SIZE, cfg.MAX_API_PAGES_COUNT,
+                               cfg.MAX_CONCURRENT_API_REQUESTS, cfg.PAGE_LATENCY_BUDGET_MS / 1000)
+    return _planner
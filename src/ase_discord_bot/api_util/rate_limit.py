@@ -0,0 +1,191 @@
+import asyncio
+import random
+import time
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Monotonic time by which the current command has to be answered, inherited by the tasks it spawns
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class TokenBucket:
+    """
+    Asynchronous token bucket limiting the rate of outgoing requests.
+
+    The bucket holds up to `capacity` tokens and refills at `rate` tokens per second.
+    Every request takes one token, waiting for the refill if the bucket is empty.
+    Waiters are served in arrival order. The bucket can be paused, e.g. when the
+    API answers with a Retry-After header, which holds back all requests until then.
+    """
+
+    def __init__(self, rate: float, capacity: int, clock: Callable[[], float] = time.monotonic):
+        """
+        Parameters
+        ----------
+        rate : float
+            Tokens added per second.
+        capacity : int
+            Maximum number of tokens, i.e. the largest burst of requests sent at once.
+        clock : Callable[[], float]
+            Monotonic time source in seconds.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Take one token, waiting until one is available and the bucket is not paused.
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+            Maximum number of seconds to wait, no limit if None.
+
+        Returns
+        -------
+        bool
+            Whether a token was taken. False if it would not be available within the timeout,
+            in which case the caller gives up right away instead of waiting for it.
+        """
+        if timeout is None:
+            give_up_at = None
+            await self._lock.acquire()
+        else:
+            give_up_at = self._clock() + timeout
+            if self._paused_until > give_up_at:
+                return False
+            try:
+                await asyncio.wait_for(self._lock.acquire(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                return False
+
+        try:
+            while True:
+                now = self._clock()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return True
+                    wait = (1 - self._tokens) / self.rate
+
+                if give_up_at is not None and now + wait > give_up_at:
+                    return False
+                await asyncio.sleep(wait)
+        finally:
+            self._lock.release()
+
+    def pause(self, seconds: float):
+        """
+        Hold back all requests for the given number of seconds.
+
+        Parameters
+        ----------
+        seconds : float
+            Duration of the pause.
+        """
+        now = self._clock()
+        self._paused_until = max(self._paused_until, now + seconds)
+        # Do not release a burst right after the pause
+        self._tokens = 0
+        self._updated = self._paused_until
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Limit the time spent on retries by all requests made within the block.
+
+    The deadline propagates to tasks created within the block. A nested deadline
+    can only shorten an outer one.
+
+    Parameters
+    ----------
+    seconds : float
+        Time budget of the block.
+    """
+    new_deadline = time.monotonic() + seconds
+    outer_deadline = _deadline.get()
+    if outer_deadline is not None:
+        new_deadline = min(new_deadline, outer_deadline)
+
+    token = _deadline.set(new_deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """
+    Seconds left until the current deadline.
+
+    Returns
+    -------
+    Optional[float]
+        The remaining time, or None if no deadline is set.
+    """
+    current_deadline = _deadline.get()
+    if current_deadline is None:
+        return None
+    return current_deadline - time.monotonic()
+
+
+def backoff_delay(base: float, attempt: int) -> float:
+    """
+    Exponential backoff delay with full jitter.
+
+    Parameters
+    ----------
+    base : float
+        Delay of the first retry in seconds.
+    attempt : int
+        Number of the failed attempt, starting at 0.
+
+    Returns
+    -------
+    float
+        A random delay between 0 and base * 2 ** attempt.
+    """
+    return random.uniform(0, base * 2 ** attempt)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse the value of a Retry-After header.
+
+    Parameters
+    ----------
+    value : Optional[str]
+        Either a number of seconds or an HTTP date.
+
+    Returns
+    -------
+    Optional[float]
+        Seconds to wait, or None if the value is missing or invalid.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
@@ -0,0 +1,283 @@
+import asyncio
+import json
+import logging
+import time
+import aiohttp
+
+from dataclasses import dataclass
+from typing import Any, Optional
+from yarl import URL
+from ase_discord_bot.api_util.circuit_breaker import CircuitBreaker
+from ase_discord_bot.api_util.rate_limit import TokenBucket, backoff_delay, parse_retry_after, remaining_time
+from ase_discord_bot.config import Config
+
+logger = logging.getLogger("TMDB")
+
+# Pseudo status code for requests that never received an HTTP response (connection error, timeout).
+TRANSPORT_ERROR_STATUS = 0
+
+# Status code reported for requests rejected by the open circuit breaker
+CIRCUIT_OPEN_STATUS = 503
+
+# Status code reported for requests the rate limiter could not let through before the deadline
+RATE_LIMITED_STATUS = 429
+
+# Status codes worth retrying: rate limiting, upstream errors and transport errors
+RETRYABLE_STATUSES = {TRANSPORT_ERROR_STATUS, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class TMDBResponse:
+    """
+    Status code and raw body of a completed TMDB request.
+
+    Attributes
+    ----------
+    status_code : int
+        The HTTP status code, or TRANSPORT_ERROR_STATUS if no response was received.
+    body : bytes
+        The raw response body.
+    stale : bool
+        Whether the response is an expired copy served from a cache.
+    """
+    status_code: int
+    body: bytes = b""
+    stale: bool = False
+
+    def json(self) -> Any:
+        """
+        Decode the response body as JSON.
+
+        Returns
+        -------
+        Any
+            The decoded JSON document.
+        """
+        return json.loads(self.body)
+
+
+class TMDBClient:
+    """
+    Asynchronous TMDB API client backed by a single pooled aiohttp session.
+
+    The number of requests sent, including retries, is counted in `request_count`.
+
+    The session is created lazily on first use, so the client can be constructed
+    outside of a running event loop. Connections are kept alive and reused across requests.
+
+    Requests pass an optional circuit breaker and token bucket before they are sent.
+    Failed requests are retried with jittered exponential backoff, or after the delay of
+    a Retry-After header, as long as the deadline of the current command allows it.
+    """
+
+    def __init__(self, base_url: URL, headers: dict[str, str], timeout: float, pool_size: int,
+                 rate_limiter: Optional[TokenBucket] = None, max_retries: int = 0, retry_backoff: float = 0.5,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Parameters
+        ----------
+        base_url : URL
+            Base URL of the TMDB API, request paths are resolved relative to it.
+        headers : dict[str, str]
+            Headers sent with every request, e.g. the authorization header.
+        timeout : float
+            Total timeout of a single request in seconds.
+        pool_size : int
+            Maximum number of simultaneously open connections.
+        rate_limiter : Optional[TokenBucket]
+            Token bucket every request has to pass, no rate limit if None.
+        max_retries : int
+            Maximum number of retries of a failed request.
+        retry_backoff : float
+            Base delay of the exponential backoff in seconds.
+        breaker : Optional[CircuitBreaker]
+            Circuit breaker recording the outcome of every request, none if None.
+        """
+        self._base_url = base_url
+        self._headers = headers
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._pool_size = pool_size
+        self._rate_limiter = rate_limiter
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+        self.breaker = breaker
+        self.request_count = 0
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        The shared aiohttp session, created on first access.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._pool_size, limit_per_host=self._pool_size)
+            self._session = aiohttp.ClientSession(
+                headers=self._headers,
+                timeout=self._timeout,
+                connector=connector,
+            )
+        return self._session
+
+    async def get(self, path: str, params: dict[str, str | int]) -> TMDBResponse:
+        """
+        Send a GET request to the TMDB API, retrying it if it fails with a retryable status.
+
+        Transport errors are logged and reported as TRANSPORT_ERROR_STATUS instead of raised,
+        so callers can treat them like any other failed status code. Requests rejected by the
+        open circuit breaker are reported as CIRCUIT_OPEN_STATUS without contacting TMDB, and
+        requests the rate limiter would hold back past the deadline as RATE_LIMITED_STATUS.
+
+        Parameters
+        ----------
+        path : str
+            Path of the endpoint relative to the base URL, e.g. "discover/movie".
+        params : dict[str, str | int]
+            Query parameters of the request.
+
+        Returns
+        -------
+        TMDBResponse
+            The status code and body of the last response.
+        """
+        attempt = 0
+        while True:
+            if self.breaker is not None and not self.breaker.allow_request():
+                return TMDBResponse(CIRCUIT_OPEN_STATUS)
+
+            if self._rate_limiter is not None and not await self._rate_limiter.acquire(remaining_time()):
+                logger.warning(f"Giving up on {path}, rate limited until past the deadline")
+                return TMDBResponse(RATE_LIMITED_STATUS)
+
+            start = time.monotonic()
+            response, retry_after = await self._send(path, params)
+            if self.breaker is not None:
+                self.breaker.record(response.status_code not in RETRYABLE_STATUSES, time.monotonic() - start)
+
+            if response.status_code not in RETRYABLE_STATUSES or attempt >= self._max_retries:
+                return response
+
+            delay = backoff_delay(self._retry_backoff, attempt)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+                if self._rate_limiter is not None:
+                    self._rate_limiter.pause(retry_after)
+
+            remaining = remaining_time()
+            if remaining is not None and delay >= remaining:
+                logger.warning(f"Giving up on {path} after status code {response.status_code}, deadline reached")
+                return response
+
+            attempt += 1
+            logger.info(f"Retrying {path} in {delay:.2f}s after status code {response.status_code}"
+                        f" (attempt {attempt}/{self._max_retries})")
+            await asyncio.sleep(delay)
+
+    async def _send(self, path: str, params: dict[str, str | int]) -> tuple[TMDBResponse, Optional[float]]:
+        """
+        Send a single GET request.
+
+        Returns
+        -------
+        tuple[TMDBResponse, Optional[float]]
+            The response and the delay requested by its Retry-After header, if any.
+        """
+        self.request_count += 1
+        url = self._base_url / path
+        timeout = self._timeout
+        remaining = remaining_time()
+        if remaining is not None and timeout.total is not None and remaining < timeout.total:
+            timeout = aiohttp.ClientTimeout(total=max(remaining, 0.1))
+
+        try:
+            async with self.session.get(url, params=params, timeout=timeout) as response:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                return TMDBResponse(response.status, await response.read()), retry_after
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Request to {path} failed: {e!r}")
+            return TMDBResponse(TRANSPORT_ERROR_STATUS), None
+
+    async def close(self):
+        """
+        Close the underlying session and release all pooled connections.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_client: TMDBClient | None = None
+
+
+def start_client(cfg: Config) -> TMDBClient:
+    """
+    Create the global TMDB client from the configuration, unless it already exists.
+
+    Parameters
+    ----------
+    cfg : Config
+        The configuration to build the client from.
+
+    Returns
+    -------
+    TMDBClient
+        The global client.
+    """
+    global _client
+    if _client is None:
+        _client = TMDBClient(
+            cfg.TMDB_API_BASE_URL,
+            cfg.TMDB_AUTH_HEADERS,
+            cfg.TMDB_REQUEST_TIMEOUT,
+            cfg.TMDB_CONNECTION_POOL_SIZE,
+            TokenBucket(cfg.TMDB_RATE_LIMIT, cfg.TMDB_RATE_BURST),
+            cfg.TMDB_MAX_RETRIES,
+            cfg.TMDB_RETRY_BACKOFF,
+            CircuitBreaker(
+                cfg.TMDB_BREAKER_FAILURE_THRESHOLD,
+                cfg.TMDB_BREAKER_RESET_TIMEOUT,
+                cfg.TMDB_LATENCY_BUDGET_MS / 1000,
+            ),
+        )
+    return _client
+
+
+def set_client(client: TMDBClient | None):
+    """
+    Replace the global TMDB client.
+
+    Parameters
+    ----------
+    client : TMDBClient | None
+        The client to set, or None to unset it.
+    """
+    global _client
+    _client = client
+
+
+def get_client() -> TMDBClient:
+    """
+    Retrieve the global TMDB client.
+
+    Returns
+    -------
+    TMDBClient
+        The current global client.
+
+    Raises
+    ------
+    RuntimeError
+        If the client has not been started.
+    """
+    if _client is None:
+        raise RuntimeError("TMDB client has not been started.")
+    return _client
+
+
+async def close_client():
+    """
+    Close and unset the global TMDB client, if it exists.
+    """
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
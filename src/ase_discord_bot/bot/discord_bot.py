@@ -1,12 +1,22 @@
 import logging
 
+from collections.abc import Sequence
 from typing import Optional
 from discord import Bot, ApplicationContext, AutocompleteContext, OptionChoice, errors, option
-from ase_discord_bot.api_util.api_calls import get_recommended_movie, get_recommended_tvshow
+from ase_discord_bot.ai.llm_client import close_llm_client, start_llm_client
+from ase_discord_bot.ai.summary_cache import close_summary_cache
+from ase_discord_bot.api_util.api_calls import get_recommended_movie, get_recommended_tvshow, served_stale
+from ase_discord_bot.api_util.cache_warmer import start_cache_warmer, stop_cache_warmer
+from ase_discord_bot.api_util.disk_cache import close_disk_cache
 from ase_discord_bot.api_util.model.filters import MovieFilter, TVShowFilter
 from ase_discord_bot.api_util.model.genres import MovieGenre, TVShowGenre
 from ase_discord_bot.api_util.model.languages import Language
-from ase_discord_bot.bot.msg_format import format_recommendation, help_command
+from ase_discord_bot.api_util.tmdb_client import close_client, start_client
+from ase_discord_bot.bot.history import start_history_writer, stop_history_writer
+from ase_discord_bot.bot.msg_format import help_command
+from ase_discord_bot.bot.views import send_recommendations
+from ase_discord_bot.catalog.catalog import load_catalog_store
+from ase_discord_bot.catalog.changes import start_catalog_refresher, stop_catalog_refresher
 from ase_discord_bot.config_registry import get_config
 from ase_discord_bot.util.path_parser import get_bytes_from_uri
 from ase_discord_bot.util.type_checks import is_list_of_movies, is_list_of_tvshows
@@ -14,6 +24,27 @@ from ase_discord_bot.util.type_checks import is_list_of_movies, is_list_of_tvsho
 logger = logging.getLogger("Dc-Bot")
 
 
+class RecommendationBot(Bot):
+    """
+    Discord bot that releases the shared API clients when it shuts down.
+    """
+
+    async def close(self):
+        """
+        Stop the background tasks, write the recommendation history and the pending summaries
+        and close the shared TMDB and Open Router clients and the disk caches before closing
+        the bot itself.
+        """
+        await stop_cache_warmer()
+        await stop_catalog_refresher()
+        await stop_history_writer()
+        await close_client()
+        await close_llm_client()
+        close_disk_cache()
+        await close_summary_cache()
+        await super().close()
+
+
 def run_bot():
     """
     Run the Discord bot.
@@ -21,7 +52,7 @@ def run_bot():
     This function creates a Discord bot, sets up event handlers and slash commands,
     and starts the bot using the configured token.
     """
-    bot = Bot()
+    bot = RecommendationBot()
     cfg = get_config()
 
     @bot.event
@@ -29,8 +60,17 @@ def run_bot():
         """
         Event handler for when the bot is ready.
 
-        It updates the bot's avatar, banner, and username based on the configuration.
+        It starts the shared TMDB and Open Router clients, loads the catalog file and the
+        recommendation history, starts the background tasks and updates the bot's avatar,
+        banner, and username based on the configuration.
         """
+        start_client(cfg)
+        start_llm_client(cfg)
+        await load_catalog_store(cfg)
+        await start_history_writer(cfg)
+        start_catalog_refresher(cfg)
+        start_cache_warmer(cfg)
+
         avatar_bytes = await get_bytes_from_uri(cfg.DISCORD_AVATAR)
         banner_bytes = await get_bytes_from_uri(cfg.DISCORD_BANNER)
 
@@ -154,23 +194,28 @@ def run_bot():
 
         language = Language.from_fuzzy(original_language)
 
+        # Fetching can take longer than the interaction's response window
+        await context.defer()
+
         movie_filter: MovieFilter = MovieFilter(genre, year, min_year, max_year, language)
-        recommendations = get_recommended_movie(movie_filter)
+        recommendations = await get_recommended_movie(movie_filter)
 
         if len(recommendations) == 0:
             await context.respond("🚫 **No Matches found.**")
             return
 
         # Check what type of list got returned
-        if isinstance(recommendations, list):
-            if isinstance(recommendations[0], int):
+        if isinstance(recommendations, Sequence):
+            # Only error codes come as a plain list of ints, lazy results are not validated here
+            if isinstance(recommendations, list) and isinstance(recommendations[0], int):
                 logger.error(f"All api requests failed. {recommendations}")
                 msg = f"An unexpected error has occured. Status codes: {recommendations}"
                 await context.respond(msg)
             elif is_list_of_movies(recommendations):
-                await context.defer()
-                for msg in format_recommendation(recommendations):
-                    await context.followup.send(msg)
+                if served_stale(recommendations):
+                    await context.followup.send("⚠️ **TMDB is currently unreachable, results may be outdated.**")
+                history_key = (context.guild_id or 0, context.author.id, "movie")
+                await send_recommendations(context, recommendations, history_key)
             else:
                 logger.error("An error occurred. Unexpected list contents.")
                 await context.respond("🚫 **A fatal error has occured**")
@@ -254,23 +299,28 @@ def run_bot():
 
         language = Language.from_fuzzy(original_language)
 
+        # Fetching can take longer than the interaction's response window
+        await context.defer()
+
         tvshow_filter: TVShowFilter = TVShowFilter(genre, year, min_year, max_year, language)
-        recommendations = get_recommended_tvshow(tvshow_filter)
+        recommendations = await get_recommended_tvshow(tvshow_filter)
 
         if len(recommendations) == 0:
             await context.respond("🚫 **No Matches found.**")
             return
 
         # Check what type of list got returned
-        if isinstance(recommendations, list):
-            if isinstance(recommendations[0], int):
+        if isinstance(recommendations, Sequence):
+            # Only error codes come as a plain list of ints, lazy results are not validated here
+            if isinstance(recommendations, list) and isinstance(recommendations[0], int):
                 logger.error(f"All api requests failed. {recommendations}")
                 msg = f"An unexpected error has occured. Status codes: {recommendations}"
                 await context.respond(msg)
             elif is_list_of_tvshows(recommendations):
-                await context.defer()
-                for msg in format_recommendation(recommendations):
-                    await context.followup.send(msg)
+                if served_stale(recommendations):
+                    await context.followup.send("⚠️ **TMDB is currently unreachable, results may be outdated.**")
+                history_key = (context.guild_id or 0, context.author.id, "tv")
+                await send_recommendations(context, recommendations, history_key)
             else:
                 logger.error("An error occurred. Unexpected list contents.")
                 await context.respond("🚫 **A fatal error has occured**")
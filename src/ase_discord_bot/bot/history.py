@@ -0,0 +1,365 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import numpy as np
+
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from ase_discord_bot.config import Config
+from ase_discord_bot.config_registry import get_config
+
+logger = logging.getLogger("History")
+
+# Guild ID (0 in direct messages), user ID and media type ("movie" or "tv")
+HistoryKey = tuple[int, int, str]
+
+
+@dataclass(slots=True)
+class SeenIDs:
+    """
+    Ring buffer of the media IDs recently shown to one user.
+
+    Attributes
+    ----------
+    ids : np.ndarray
+        The shown media IDs, 0 in unused slots.
+    shown_at : np.ndarray
+        Unix time in seconds each ID was shown at.
+    position : int
+        Slot the next ID is written to.
+    """
+    ids: np.ndarray
+    shown_at: np.ndarray
+    position: int = 0
+
+
+class SeenHistory:
+    """
+    Bounded in-memory history of the media IDs shown to every user, per guild and media type.
+
+    Every user holds the last `size` shown IDs in a compact ring buffer, 12 bytes per ID.
+    IDs expire after `ttl` seconds, and beyond `max_users` histories the least recently
+    used one is evicted. Changes are only recorded in memory; `flush` writes them to a
+    HistoryStore in one batch, so recording never waits on disk. The history itself is only
+    accessed on the event loop, worker threads only get copies of it.
+    """
+
+    def __init__(self, size: int, ttl: float, max_users: int, clock: Callable[[], float] = time.time):
+        """
+        Parameters
+        ----------
+        size : int
+            Number of IDs held per user and media type, 0 disables the history.
+        ttl : float
+            Seconds after which a shown ID expires.
+        max_users : int
+            Maximum number of held histories.
+        clock : Callable[[], float]
+            Time source in seconds, replaceable for testing.
+        """
+        self.size = size
+        self.ttl = ttl
+        self.max_users = max_users
+        self._clock = clock
+        self._histories: OrderedDict[HistoryKey, SeenIDs] = OrderedDict()
+        self._dirty: set[HistoryKey] = set()
+        self._deleted: set[HistoryKey] = set()
+        # Keeps the writes of overlapping flushes in order
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._histories)
+
+    def seen(self, key: HistoryKey) -> np.ndarray:
+        """
+        The IDs shown to a user that have not expired.
+
+        Parameters
+        ----------
+        key : HistoryKey
+            The guild, user and media type.
+
+        Returns
+        -------
+        np.ndarray
+            The shown IDs, in no particular order.
+        """
+        history = self._histories.get(key)
+        if history is None:
+            return np.zeros(0, dtype=np.int64)
+        self._histories.move_to_end(key)
+        fresh = (history.ids != 0) & (history.shown_at > self._clock() - self.ttl)
+        return history.ids[fresh]
+
+    def record(self, key: HistoryKey, ids: Iterable[int]):
+        """
+        Record IDs shown to a user, overwriting the oldest ones once the ring buffer is full.
+
+        Parameters
+        ----------
+        key : HistoryKey
+            The guild, user and media type.
+        ids : Iterable[int]
+            The shown IDs.
+        """
+        if self.size <= 0:
+            return
+
+        history = self._histories.get(key)
+        if history is None:
+            history = SeenIDs(np.zeros(self.size, dtype=np.int64), np.zeros(self.size, dtype=np.uint32))
+            self._histories[key] = history
+        self._histories.move_to_end(key)
+
+        now = self._clock()
+        for media_id in ids:
+            history.ids[history.position] = media_id
+            history.shown_at[history.position] = now
+            history.position = (history.position + 1) % self.size
+        self._dirty.add(key)
+        self._deleted.discard(key)
+
+        while len(self._histories) > self.max_users:
+            evicted, _ = self._histories.popitem(last=False)
+            self._dirty.discard(evicted)
+            self._deleted.add(evicted)
+
+    def load(self, store: "HistoryStore"):
+        """
+        Replace the held histories with the unexpired ones of a store. Blocks on disk I/O.
+
+        Parameters
+        ----------
+        store : HistoryStore
+            The store to read.
+        """
+        histories: OrderedDict[HistoryKey, SeenIDs] = OrderedDict()
+        for key, ids, shown_at in store.read(self._clock() - self.ttl, self.max_users):
+            # Histories written with a different size are cut to the most recent IDs
+            order = np.argsort(shown_at, kind="stable")[-self.size:]
+            history = SeenIDs(np.zeros(self.size, dtype=np.int64), np.zeros(self.size, dtype=np.uint32))
+            history.ids[:len(order)] = ids[order]
+            history.shown_at[:len(order)] = shown_at[order]
+            history.position = len(order) % self.size
+            histories[key] = history
+        self._histories = histories
+        self._dirty.clear()
+        self._deleted.clear()
+
+    async def flush(self, store: "HistoryStore") -> int:
+        """
+        Write all changed histories to a store in one transaction and delete the evicted ones.
+
+        The changes are copied on the event loop and only the copies are written in a worker
+        thread, so recording can continue while writing. If writing fails, the changes are
+        kept for the next flush.
+
+        Parameters
+        ----------
+        store : HistoryStore
+            The store to write to.
+
+        Returns
+        -------
+        int
+            Number of written and deleted histories.
+
+        Raises
+        ------
+        sqlite3.Error
+            If writing to the store fails.
+        """
+        dirty, self._dirty = self._dirty, set()
+        deleted, self._deleted = self._deleted, set()
+        rows = [
+            (key, history.ids.copy(), history.shown_at.copy())
+            for key in dirty if (history := self._histories.get(key)) is not None
+        ]
+        if not rows and not deleted:
+            return 0
+
+        async with self._flush_lock:
+            try:
+                await asyncio.to_thread(store.write, rows, deleted)
+            except sqlite3.Error:
+                self._dirty.update(key for key, _, _ in rows if key in self._histories)
+                self._deleted.update(key for key in deleted if key not in self._histories)
+                raise
+        return len(rows) + len(deleted)
+
+
+class HistoryStore:
+    """
+    SQLite database holding the shown media IDs of every user as raw arrays.
+
+    The methods block on disk I/O and are meant to be run in a worker thread,
+    e.g. with asyncio.to_thread, so a lock serializes access to the shared connection.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Parameters
+        ----------
+        path : Path
+            Path of the SQLite database file, parent directories are created as needed.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "guild_id INTEGER NOT NULL, user_id INTEGER NOT NULL, media_type TEXT NOT NULL, "
+            "ids BLOB NOT NULL, shown_at BLOB NOT NULL, last_shown_at INTEGER NOT NULL, "
+            "PRIMARY KEY (guild_id, user_id, media_type)) WITHOUT ROWID"
+        )
+        self._connection.commit()
+
+    def read(self, since: float, limit: int) -> list[tuple[HistoryKey, np.ndarray, np.ndarray]]:
+        """
+        Read the most recently used histories shown anything after `since`.
+
+        Parameters
+        ----------
+        since : float
+            Unix time in seconds, older histories are left out.
+        limit : int
+            Maximum number of histories.
+
+        Returns
+        -------
+        list[tuple[HistoryKey, np.ndarray, np.ndarray]]
+            The key, IDs and show times of every history, least recently used first.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT guild_id, user_id, media_type, ids, shown_at FROM history WHERE last_shown_at > ? "
+                "ORDER BY last_shown_at DESC LIMIT ?", (since, limit)
+            ).fetchall()
+        return [
+            ((guild_id, user_id, media_type), np.frombuffer(ids, dtype="<i8"), np.frombuffer(shown_at, dtype="<u4"))
+            for guild_id, user_id, media_type, ids, shown_at in reversed(rows)
+        ]
+
+    def write(self, rows: list[tuple[HistoryKey, np.ndarray, np.ndarray]], deleted: Iterable[HistoryKey]):
+        """
+        Replace and delete histories in one transaction.
+
+        Parameters
+        ----------
+        rows : list[tuple[HistoryKey, np.ndarray, np.ndarray]]
+            The key, IDs and show times of every history to replace.
+        deleted : Iterable[HistoryKey]
+            Keys of the histories to delete.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO history (guild_id, user_id, media_type, ids, shown_at, last_shown_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(*key, ids.astype("<i8").tobytes(), shown_at.astype("<u4").tobytes(), int(shown_at.max()))
+                 for key, ids, shown_at in rows],
+            )
+            self._connection.executemany(
+                "DELETE FROM history WHERE guild_id = ? AND user_id = ? AND media_type = ?", list(deleted)
+            )
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+_history: SeenHistory | None = None
+
+
+def set_history(history: SeenHistory | None):
+    """
+    Replace the global history.
+
+    Parameters
+    ----------
+    history : SeenHistory | None
+        The history to set, or None to rebuild it from the configuration on next use.
+    """
+    global _history
+    _history = history
+
+
+def get_history() -> SeenHistory:
+    """
+    Retrieve the global history, creating it from the configuration on first use.
+
+    Returns
+    -------
+    SeenHistory
+        The history.
+    """
+    global _history
+    if _history is None:
+        cfg = get_config()
+        _history = SeenHistory(cfg.HISTORY_SIZE, cfg.HISTORY_TTL, cfg.HISTORY_MAX_USERS)
+    return _history
+
+
+async def _flush_periodically(history: SeenHistory, store: HistoryStore, interval: float):
+    """
+    Write the changes of the history to the store every `interval` seconds.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await history.flush(store)
+        except sqlite3.Error:
+            logger.exception("Writing the history failed, retrying on the next flush")
+
+
+_store: HistoryStore | None = None
+_flush_task: asyncio.Task | None = None
+
+
+async def start_history_writer(cfg: Config):
+    """
+    Load the global history from its file and start the task writing it back, unless
+    it is running or the history is disabled by a size of 0.
+
+    Parameters
+    ----------
+    cfg : Config
+        The configuration to build the history and the task from.
+    """
+    global _store, _flush_task
+    if _flush_task is not None or cfg.HISTORY_SIZE <= 0:
+        return
+
+    history = get_history()
+    _store = HistoryStore(Path(cfg.DISK_CACHE_DIR) / "history.sqlite3")
+    await asyncio.to_thread(history.load, _store)
+    logger.info(f"Loaded the history of {len(history)} users")
+    _flush_task = asyncio.create_task(_flush_periodically(history, _store, cfg.HISTORY_FLUSH_INTERVAL))
+
+
+async def stop_history_writer():
+    """
+    Cancel the task writing the global history, write the remaining changes and close its file.
+    """
+    global _store, _flush_task
+    if _flush_task is None or _store is None:
+        return
+
+    _flush_task.cancel()
+    try:
+        await _flush_task
+    except asyncio.CancelledError:
+        pass
+    await get_history().flush(_store)
+    _store.close()
+    _store = None
+    _flush_task = None
@@ -1,39 +1,179 @@
-import random
+import asyncio
+import logging
+import numpy as np
 
+from collections.abc import AsyncIterator, Collection, Sequence
 from datetime import date
-from ase_discord_bot.ai.summary import summarize
+from typing import Optional
+from ase_discord_bot.ai.summary import summarize_batch, summarize_stream
 from ase_discord_bot.api_util import api_calls
 from ase_discord_bot.api_util.model.responses import Movie, TVShow
+from ase_discord_bot.bot.history import HistoryKey, get_history
+from ase_discord_bot.bot.selection import select_recommendations
+from ase_discord_bot.config_registry import get_config
 
+logger = logging.getLogger("Format")
 
-def format_recommendation(results: list[Movie] | list[TVShow]) -> list[str]:
+# Shown in place of a description until the summary arrives
+SUMMARY_PLACEHOLDER = "⏳ *Summarizing…*"
+
+
+def pick_recommendations(results: Sequence[Movie] | Sequence[TVShow], history_key: Optional[HistoryKey] = None,
+                         shown_ids: Collection[int] = ()) -> list[Movie] | list[TVShow]:
+    """
+    Pick the media recommendations to display from a pool of results.
+
+    If there are more than RECOMMENDATION_COUNT items in the results, picks that many by
+    weighted sampling, favoring well-rated and popular items and avoiding the ones recently
+    shown to the requesting user. Otherwise, picks all provided items. The picks are
+    recorded in the user's history.
+
+    Parameters
+    ----------
+    results : Sequence[Movie] | Sequence[TVShow]
+        The movies or TV shows to pick from, only the picked ones are accessed.
+    history_key : Optional[HistoryKey]
+        Guild, user and media type of the requesting user, whose history is consulted and updated.
+    shown_ids : Collection[int]
+        IDs that are never picked, e.g. the ones already shown for the same command.
+
+    Returns
+    -------
+    list[Movie] | list[TVShow]
+        The picked items, fewer than RECOMMENDATION_COUNT if the pool runs out.
+    """
+    history = get_history()
+    seen_ids = history.seen(history_key) if history_key is not None else np.zeros(0, dtype=np.int64)
+    if shown_ids:
+        seen_ids = np.concatenate([seen_ids, np.fromiter(shown_ids, dtype=np.int64, count=len(shown_ids))])
+
+    picks = select_recommendations(results, get_config().RECOMMENDATION_COUNT, seen_ids=seen_ids)
+    # Seen items are only picked once the others run out, shown ones are dropped altogether
+    picks = [media for media in picks if media.id not in shown_ids]
+    if history_key is not None:
+        history.record(history_key, [media.id for media in picks])
+    return picks
+
+
+async def format_picks(picks: Sequence[Movie] | Sequence[TVShow]) -> list[str]:
     """
-    Format a list of media recommendations into displayable strings.
+    Format picked media recommendations into displayable strings.
 
-    If there are at least three items in the results, randomly selects three to format.
-    Otherwise, formats all provided items.
+    The summaries of all items are generated together, see summarize_batch. If that
+    fails, the overviews are shown instead.
 
     Parameters
     ----------
-    results : list[Movie] | list[TVShow]
-        The list of movies or TV shows to format.
+    picks : Sequence[Movie] | Sequence[TVShow]
+        The movies or TV shows to format.
 
     Returns
     -------
     list[str]
-        A list of formatted recommendation strings.
+        A list of formatted recommendation strings, in the order of the picks.
     """
-    formatted_responses: list[str] = []
+    try:
+        summaries = await summarize_batch(picks)
+    except Exception:
+        logger.exception("Summarizing the recommendations failed, showing their overviews")
+        summaries = [media.overview for media in picks]
+    return [_format_recommendation(media, summary) for media, summary in zip(picks, summaries)]
 
-    picked_movies = random.sample(results, 3) if len(results) >= 3 else results
 
-    for movie in picked_movies:
-        formatted_responses.append(_format_recommendation(movie))
+def format_pending_picks(picks: Sequence[Movie] | Sequence[TVShow]) -> list[str]:
+    """
+    Format picked media recommendations without their summaries, so they can be shown
+    before the summaries are generated.
 
-    return formatted_responses
+    Parameters
+    ----------
+    picks : Sequence[Movie] | Sequence[TVShow]
+        The movies or TV shows to format.
+
+    Returns
+    -------
+    list[str]
+        A list of formatted recommendation strings with a placeholder description, in the order of the picks.
+    """
+    return [_format_recommendation(media, SUMMARY_PLACEHOLDER) for media in picks]
+
+
+async def stream_picks(picks: Sequence[Movie] | Sequence[TVShow]) -> AsyncIterator[tuple[int, str]]:
+    """
+    Format picked media recommendations progressively, as their summaries are generated.
+
+    If SUMMARY_EDIT_INTERVAL_MS is above 0, the summaries are streamed, at most
+    MAX_CONCURRENT_SUMMARIES at once, and every streamed part yields the updated
+    recommendation. Otherwise they are generated together, see format_picks, and every
+    recommendation is yielded once.
+
+    Parameters
+    ----------
+    picks : Sequence[Movie] | Sequence[TVShow]
+        The movies or TV shows to format.
+
+    Yields
+    ------
+    tuple[int, str]
+        The position of the recommendation among the picks and its formatted string so far.
+    """
+    cfg = get_config()
+    if cfg.SUMMARY_EDIT_INTERVAL_MS <= 0:
+        for position, formatted in enumerate(await format_picks(picks)):
+            yield position, formatted
+        return
+
+    updates: asyncio.Queue[tuple[int, str] | None] = asyncio.Queue()
+    semaphore = asyncio.Semaphore(cfg.MAX_CONCURRENT_SUMMARIES)
+
+    async def stream_one(position: int, media: Movie | TVShow):
+        async with semaphore:
+            try:
+                async for summary in summarize_stream(media):
+                    updates.put_nowait((position, _format_recommendation(media, summary)))
+            except Exception:
+                # A failed summary must not cancel the other recommendations
+                logger.exception(f"Summarizing {media.id} failed, showing its overview")
+                updates.put_nowait((position, _format_recommendation(media, media.overview)))
+
+    async def stream_all():
+        try:
+            await asyncio.gather(*(stream_one(position, media) for position, media in enumerate(picks)))
+        finally:
+            updates.put_nowait(None)
+
+    task = asyncio.create_task(stream_all())
+    try:
+        while (update := await updates.get()) is not None:
+            yield update
+    finally:
+        # Stop streaming if the caller stops early
+        task.cancel()
+
+
+async def format_recommendation(results: Sequence[Movie] | Sequence[TVShow],
+                                history_key: Optional[HistoryKey] = None) -> list[str]:
+    """
+    Pick media recommendations from a pool of results and format them into displayable strings.
+
+    See pick_recommendations for how the items are picked.
+
+    Parameters
+    ----------
+    results : Sequence[Movie] | Sequence[TVShow]
+        The movies or TV shows to format, only the picked ones are accessed.
+    history_key : Optional[HistoryKey]
+        Guild, user and media type of the requesting user, whose history is consulted and updated.
+
+    Returns
+    -------
+    list[str]
+        A list of formatted recommendation strings.
+    """
+    return await format_picks(pick_recommendations(results, history_key))
 
 
-def _format_recommendation(media: Movie | TVShow) -> str:
+def _format_recommendation(media: Movie | TVShow, summary: str) -> str:
     """
     Format a single media item into a recommendation string.
 
@@ -44,6 +184,8 @@ def _format_recommendation(media: Movie | TVShow) -> str:
     ----------
     media : Movie | TVShow
         The media item (movie or TV show) to format.
+    summary : str
+        The summarized description.
 
     Returns
     -------
@@ -68,8 +210,7 @@ def _format_recommendation(media: Movie | TVShow) -> str:
 
     formatted_response.append(f"🗓️ Released: {date.fromisoformat(release_date).strftime('%d.%m.%Y')}")
 
-    ai_summary = summarize(media)
-    formatted_response.append(f"🎞️ Description: {ai_summary}")
+    formatted_response.append(f"🎞️ Description: {summary}")
 
     if media.poster_path:
         poster_url = api_calls.get_poster_url(media.poster_path[1:])
@@ -105,5 +246,6 @@ def help_command() -> str:
         "       • `min_year` and `max_year` (optional): Define a range for the release year.\n"
         "       • `original_language` (optional): Specify the TV show's original language.\n\n"
         "🔹 **/help**\n"
-        "   - **Description:** Displays this help message."
+        "   - **Description:** Displays this help message.\n\n"
+        "Use 🎲 **Reroll** below the recommendations to replace them, or ➡️ **Next** to get more for the same request."
     )
@@ -0,0 +1,331 @@
+import numpy as np
+
+from collections.abc import Sequence
+from typing import Any, Optional, TypeVar
+from ase_discord_bot.api_util.model.responses import LazyResults, Movie
+from ase_discord_bot.catalog.columns import LANGUAGE_DTYPE, UNKNOWN_YEAR, genre_mask
+from ase_discord_bot.config import SelectionStrategy
+from ase_discord_bot.config_registry import get_config
+
+T = TypeVar("T")
+
+# Highest weight of the similarity penalty, so the random relevance always counts
+MAX_DIVERSITY = 0.99
+
+_rng = np.random.default_rng()
+
+
+def result_column(results: Sequence[Any], name: str) -> np.ndarray:
+    """
+    Read a numeric field of every result of a pool.
+
+    Lazy results are read without validating them.
+
+    Parameters
+    ----------
+    results : Sequence[Any]
+        The pool of results.
+    name : str
+        The field name, e.g. "vote_average".
+
+    Returns
+    -------
+    np.ndarray
+        The field values as floats.
+    """
+    if isinstance(results, LazyResults):
+        return results.column(name)
+    return np.fromiter((getattr(result, name) for result in results), dtype=np.float64, count=len(results))
+
+
+def result_features(results: Sequence[Any]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read the diversity features of every result of a pool: genre bitmask, release year and language.
+
+    Lazy results are read without validating them.
+
+    Parameters
+    ----------
+    results : Sequence[Any]
+        The pool of results.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        The genre bitmasks, the release years (UNKNOWN_YEAR if missing) and the language codes.
+    """
+    count = len(results)
+    if isinstance(results, LazyResults):
+        columns = [results.precomputed(name) for name in ("genres", "year", "language")]
+        if all(column is not None for column in columns):
+            return columns[0], columns[1], columns[2]
+        date_field = "release_date" if results.model is Movie else "first_air_date"
+        genre_ids = results.raw_values("genre_ids")
+        dates = results.raw_values(date_field)
+        languages = results.raw_values("original_language")
+    else:
+        genre_ids = [result.genre_ids for result in results]
+        dates = [getattr(result, "release_date", None) or getattr(result, "first_air_date", None)
+                 for result in results]
+        languages = [result.original_language for result in results]
+
+    return (
+        np.fromiter((genre_mask(ids) if isinstance(ids, list) else 0 for ids in genre_ids), np.uint64, count),
+        np.fromiter((_year(date) for date in dates), np.int16, count),
+        np.array([language.encode() if isinstance(language, str) else b"" for language in languages],
+                 dtype=LANGUAGE_DTYPE),
+    )
+
+
+def _year(iso_date: Any) -> int:
+    """
+    Year of a raw ISO date, UNKNOWN_YEAR if it is missing or invalid.
+    """
+    year = iso_date[:4] if isinstance(iso_date, str) else ""
+    return int(year) if year.isdigit() else UNKNOWN_YEAR
+
+
+def selection_weights(vote_averages: np.ndarray, vote_counts: np.ndarray, popularities: np.ndarray,
+                      vote_average_exponent: int, vote_count_exponent: int, popularity_exponent: int) -> np.ndarray:
+    """
+    Compute the sampling weight of every result of a pool.
+
+    The weight is the product of the vote average scaled to (0, 1], the logarithm of the
+    vote count and the logarithm of the popularity, each raised to its exponent. The
+    logarithms keep a few blockbusters from dominating the pool. Every factor is smoothed
+    to stay positive for a field of 0, e.g. of a new title nobody voted on yet, so only
+    the seen penalty of select_recommendations zeroes a weight. An exponent of 0 ignores
+    its field, so all exponents being 0 samples uniformly.
+
+    Parameters
+    ----------
+    vote_averages : np.ndarray
+        Vote averages between 0 and 10.
+    vote_counts : np.ndarray
+        Vote counts.
+    popularities : np.ndarray
+        Popularity scores.
+    vote_average_exponent : int
+        Exponent of the vote average.
+    vote_count_exponent : int
+        Exponent of the vote count.
+    popularity_exponent : int
+        Exponent of the popularity.
+
+    Returns
+    -------
+    np.ndarray
+        The positive weights.
+    """
+    weights = np.ones(len(vote_averages), dtype=np.float64)
+    if vote_average_exponent:
+        weights *= ((np.clip(vote_averages, 0, 10) + 1) / 11) ** vote_average_exponent
+    if vote_count_exponent:
+        weights *= (1 + np.log1p(np.maximum(vote_counts, 0))) ** vote_count_exponent
+    if popularity_exponent:
+        weights *= (1 + np.log1p(np.maximum(popularities, 0))) ** popularity_exponent
+    return weights
+
+
+def weighted_sample(weights: np.ndarray, count: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Draw positions without replacement, each with a probability proportional to its weight.
+
+    Every position gets the key log(u) / weight for a uniform random u, and the positions
+    with the largest keys are drawn (Efraimidis and Spirakis). Partitioning the keys takes
+    linear time, so the cost does not depend on how many positions are drawn. Positions
+    of weight 0 are only drawn once all others are, uniformly among themselves.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        The non-negative weight of every position.
+    count : int
+        Number of positions to draw.
+    rng : Optional[np.random.Generator]
+        Source of randomness, the module's generator if None.
+
+    Returns
+    -------
+    np.ndarray
+        The drawn positions, in the order they were drawn.
+    """
+    rng = rng or _rng
+    positive = np.flatnonzero(weights > 0)
+    count = min(count, len(weights))
+
+    if len(positive) <= count:
+        rest = np.setdiff1d(np.arange(len(weights)), positive)
+        drawn_rest = rng.choice(rest, count - len(positive), replace=False)
+        return np.concatenate([positive[rng.permutation(len(positive))], drawn_rest]).astype(np.intp)
+
+    keys = np.log(rng.random(len(positive))) / weights[positive]
+    top = np.argpartition(keys, len(keys) - count)[len(keys) - count:]
+    return positive[top[np.argsort(-keys[top], kind="stable")]]
+
+
+def similarity(position: int, genres: np.ndarray, years: np.ndarray, languages: np.ndarray) -> np.ndarray:
+    """
+    Similarity of one result of a pool to every result of the pool.
+
+    The similarity is the mean of the Jaccard similarity of the genres, whether the release
+    decades are equal and whether the languages are equal, so it lies between 0 and 1.
+
+    Parameters
+    ----------
+    position : int
+        Position of the result to compare.
+    genres : np.ndarray
+        Genre bitmasks of the pool.
+    years : np.ndarray
+        Release years of the pool.
+    languages : np.ndarray
+        Language codes of the pool.
+
+    Returns
+    -------
+    np.ndarray
+        The similarity to every result of the pool.
+    """
+    shared = np.bitwise_count(genres & genres[position])
+    combined = np.bitwise_count(genres | genres[position])
+    genre_similarity = np.divide(shared, combined, out=np.zeros(len(genres)), where=combined > 0)
+    same_decade = (years // 10 == years[position] // 10) & (years != UNKNOWN_YEAR)
+    same_language = languages == languages[position]
+    return (genre_similarity + same_decade + same_language) / 3
+
+
+def diverse_sample(weights: np.ndarray, genres: np.ndarray, years: np.ndarray, languages: np.ndarray,
+                   count: int, diversity: float, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Draw positions by maximal marginal relevance, trading relevance against similarity to the drawn ones.
+
+    The relevance of a position is its Efraimidis-Spirakis key u ** (1 / weight), which
+    lies between 0 and 1 and is random, so repeated draws differ. Every step draws the
+    position maximizing (1 - diversity) * relevance - diversity * its largest similarity
+    to the positions drawn before, evaluated for the whole pool at once. A diversity of 0
+    draws like `weighted_sample`. The diversity is capped at MAX_DIVERSITY, so the random
+    relevance still breaks ties between equally similar positions. Positions with a weight
+    of 0 are only drawn once no position with a positive weight is left.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        The non-negative weight of every position.
+    genres : np.ndarray
+        Genre bitmasks of the pool.
+    years : np.ndarray
+        Release years of the pool.
+    languages : np.ndarray
+        Language codes of the pool.
+    count : int
+        Number of positions to draw.
+    diversity : float
+        Weight of the similarity penalty between 0 and 1.
+    rng : Optional[np.random.Generator]
+        Source of randomness, the module's generator if None.
+
+    Returns
+    -------
+    np.ndarray
+        The drawn positions, in the order they were drawn.
+    """
+    rng = rng or _rng
+    diversity = min(diversity, MAX_DIVERSITY)
+    with np.errstate(divide="ignore"):
+        relevance = np.exp(np.log(rng.random(len(weights))) / weights)
+    scores = (1 - diversity) * relevance
+    zero_weight = weights <= 0
+    positive_left = len(weights) - int(np.count_nonzero(zero_weight))
+    max_similarity = np.zeros(len(weights))
+    drawn = []
+    for _ in range(min(count, len(weights))):
+        candidate_scores = scores - diversity * max_similarity
+        candidate_scores[drawn] = -np.inf
+        if positive_left > 0:
+            # A dissimilar seen result must not beat the unseen ones
+            candidate_scores[zero_weight] = -np.inf
+        position = int(np.argmax(candidate_scores))
+        positive_left -= not zero_weight[position]
+        drawn.append(position)
+        max_similarity = np.maximum(max_similarity, similarity(position, genres, years, languages))
+    return np.array(drawn, dtype=np.intp)
+
+
+def select_recommendations(results: Sequence[T], count: int, rng: Optional[np.random.Generator] = None,
+                           seen_ids: Optional[np.ndarray] = None) -> list[T]:
+    """
+    Pick results of a pool by weighted sampling without replacement, diversified if
+    SELECTION_STRATEGY is "diverse".
+
+    The weights are computed from the vote average, vote count and popularity of every
+    result, with the exponents SELECTION_VOTE_AVERAGE_EXPONENT, SELECTION_VOTE_COUNT_EXPONENT
+    and SELECTION_POPULARITY_EXPONENT. Diverse picks penalize shared genres, release decades
+    and languages by SELECTION_DIVERSITY percent. Results already seen get a weight of 0,
+    so they are only picked once the pool holds too few others. Only the picked results
+    are accessed, lazy results that fail validation are left out and replaced by new picks.
+
+    Parameters
+    ----------
+    results : Sequence[T]
+        The pool of results.
+    count : int
+        Number of results to pick.
+    rng : Optional[np.random.Generator]
+        Source of randomness, the module's generator if None.
+    seen_ids : Optional[np.ndarray]
+        IDs of the results recently shown to the user, see SeenHistory.
+
+    Returns
+    -------
+    list[T]
+        The picked results, all valid ones if the pool holds no more than `count`.
+    """
+    if not isinstance(results, LazyResults):
+        if len(results) <= count:
+            return list(results)
+        return [results[int(position)] for position in _sample_positions(results, count, rng, seen_ids)]
+
+    # Malformed results are only found when picked, so the pool is sampled again without them
+    candidates = np.arange(len(results))
+    while True:
+        if len(candidates) <= count:
+            positions = candidates
+        else:
+            positions = candidates[_sample_positions(results, count, rng, seen_ids, candidates)]
+        picks = [results.get(int(position)) for position in positions]
+        if all(pick is not None for pick in picks):
+            return picks
+        candidates = np.setdiff1d(candidates, [p for p, pick in zip(positions, picks) if pick is None])
+
+
+def _sample_positions(results: Sequence[Any], count: int, rng: Optional[np.random.Generator],
+                      seen_ids: Optional[np.ndarray], candidates: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Sample `count` positions of the candidates, see select_recommendations.
+
+    Returns
+    -------
+    np.ndarray
+        Positions into `candidates`, or into the results if no candidates are given.
+    """
+    cfg = get_config()
+    weights = selection_weights(
+        result_column(results, "vote_average"),
+        result_column(results, "vote_count"),
+        result_column(results, "popularity"),
+        cfg.SELECTION_VOTE_AVERAGE_EXPONENT,
+        cfg.SELECTION_VOTE_COUNT_EXPONENT,
+        cfg.SELECTION_POPULARITY_EXPONENT,
+    )
+    if seen_ids is not None and len(seen_ids):
+        weights[np.isin(result_column(results, "id"), seen_ids)] = 0
+    features = result_features(results) if cfg.SELECTION_STRATEGY == SelectionStrategy.DIVERSE else None
+    if candidates is not None:
+        weights = weights[candidates]
+        if features is not None:
+            features = tuple(column[candidates] for column in features)
+
+    if features is not None:
+        return diverse_sample(weights, *features, count, cfg.SELECTION_DIVERSITY / 100, rng)
+    return weighted_sample(weights, count, rng)
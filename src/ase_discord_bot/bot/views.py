@@ -0,0 +1,244 @@
+import asyncio
+import logging
+
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass, field
+from discord import ApplicationContext, ButtonStyle, HTTPException, Interaction, Webhook, WebhookMessage
+from discord.ui import Button, View, button
+from ase_discord_bot.api_util.cache import TTLCache
+from ase_discord_bot.api_util.model.responses import Movie, TVShow
+from ase_discord_bot.bot.history import HistoryKey
+from ase_discord_bot.bot.msg_format import format_pending_picks, pick_recommendations, stream_picks
+from ase_discord_bot.config_registry import get_config
+
+logger = logging.getLogger("Views")
+
+
+@dataclass(slots=True)
+class CandidatePool:
+    """
+    Results fetched for one recommendation command, reused by the buttons of its messages.
+
+    Attributes
+    ----------
+    results : Sequence[Movie] | Sequence[TVShow]
+        The pool of results.
+    history_key : HistoryKey
+        Guild, user and media type of the user who ran the command.
+    shown_ids : set[int]
+        IDs of all results shown for the command so far.
+    messages : list[WebhookMessage]
+        The messages of the most recently shown results, the last one holding the buttons.
+    lock : asyncio.Lock
+        Held while new results are picked and sent, so clicks are handled one at a time.
+    """
+    results: Sequence[Movie] | Sequence[TVShow]
+    history_key: HistoryKey
+    shown_ids: set[int] = field(default_factory=set)
+    messages: list[WebhookMessage] = field(default_factory=list)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+_pool_store: TTLCache | None = None
+
+
+def set_pool_store(store: TTLCache | None):
+    """
+    Replace the global candidate pool store.
+
+    Parameters
+    ----------
+    store : TTLCache | None
+        The store to set, or None to rebuild it from the configuration on next use.
+    """
+    global _pool_store
+    _pool_store = store
+
+
+def get_pool_store() -> TTLCache:
+    """
+    Retrieve the global candidate pool store, keyed by the interaction ID of the command,
+    creating it from the configuration on first use.
+
+    Returns
+    -------
+    TTLCache
+        The store.
+    """
+    global _pool_store
+    if _pool_store is None:
+        cfg = get_config()
+        # Pools have no meaningful size in bytes, so only their number is bounded
+        _pool_store = TTLCache(cfg.CANDIDATE_POOL_TTL, cfg.CANDIDATE_POOL_MAX_ENTRIES)
+    return _pool_store
+
+
+class RecommendationView(View):
+    """
+    Buttons below recommendations that pick new ones from the pool of the same command,
+    without any further TMDB request.
+
+    Reroll replaces the shown recommendations, Next shows more below them. Neither shows
+    a result twice for the same command. Only the user who ran the command can use them.
+    """
+
+    def __init__(self, pool_key: int, user_id: int, timeout: float):
+        """
+        Parameters
+        ----------
+        pool_key : int
+            Key of the candidate pool in the pool store.
+        user_id : int
+            ID of the user who ran the command.
+        timeout : float
+            Seconds after which the buttons are disabled.
+        """
+        super().__init__(timeout=timeout, disable_on_timeout=True)
+        self.pool_key = pool_key
+        self.user_id = user_id
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        """
+        Only let the user who ran the command use the buttons.
+        """
+        if interaction.user is not None and interaction.user.id == self.user_id:
+            return True
+        await interaction.response.send_message("🚫 **Only the user who asked can use these buttons.**",
+                                                ephemeral=True)
+        return False
+
+    @button(label="Reroll", emoji="🎲", style=ButtonStyle.secondary)
+    async def reroll(self, _: Button, interaction: Interaction):
+        """
+        Replace the shown recommendations with new ones.
+        """
+        await self._show_more(interaction, replace=True)
+
+    @button(label="Next", emoji="➡️", style=ButtonStyle.primary)
+    async def show_next(self, _: Button, interaction: Interaction):
+        """
+        Show more recommendations below the shown ones.
+        """
+        await self._show_more(interaction, replace=False)
+
+    async def _show_more(self, interaction: Interaction, replace: bool):
+        """
+        Pick and send new recommendations from the pool, then delete the previously shown
+        ones or remove their buttons.
+        """
+        pool: CandidatePool | None = get_pool_store().get(self.pool_key)
+        if pool is None:
+            await interaction.response.send_message(
+                "⌛ **These recommendations expired, please run the command again.**", ephemeral=True)
+            return
+        if pool.lock.locked():
+            await interaction.response.send_message("⏳ **Still picking the last recommendations.**", ephemeral=True)
+            return
+
+        async with pool.lock:
+            picks = pick_recommendations(pool.results, pool.history_key, pool.shown_ids)
+            if not picks:
+                await interaction.response.send_message("🚫 **No more recommendations for this request.**",
+                                                        ephemeral=True)
+                return
+
+            await interaction.response.defer()
+            previous = pool.messages
+            self.stop()
+            messages = await _send_picks(interaction.followup, pool, self.pool_key, picks)
+
+            try:
+                if replace:
+                    for message in previous:
+                        await message.delete()
+                elif previous:
+                    await previous[-1].edit(view=None)
+            except HTTPException:
+                logger.warning("Couldn't clean up the previously shown recommendations", exc_info=True)
+
+        # The buttons work again while the summaries are filled in
+        await _render_summaries(messages, stream_picks(picks))
+
+
+async def _send_picks(webhook: Webhook, pool: CandidatePool, pool_key: int,
+                      picks: Sequence[Movie] | Sequence[TVShow]) -> list[WebhookMessage]:
+    """
+    Send picked recommendations with a placeholder description, one message each, with the
+    buttons below the last one. The buttons are disabled when the pool expires.
+    """
+    pool.shown_ids.update(media.id for media in picks)
+
+    remaining_ttl = get_pool_store().expires_in(pool_key)
+    formatted = format_pending_picks(picks)
+    messages = []
+    for position, msg in enumerate(formatted):
+        if position == len(formatted) - 1 and remaining_ttl > 0:
+            view = RecommendationView(pool_key, pool.history_key[1], remaining_ttl)
+            messages.append(await webhook.send(msg, view=view))
+        else:
+            messages.append(await webhook.send(msg))
+    pool.messages = messages
+    return messages
+
+
+async def _render_summaries(messages: Sequence[WebhookMessage], updates: AsyncIterator[tuple[int, str]]):
+    """
+    Edit sent recommendations as their summaries arrive.
+
+    Updates are coalesced, so each message is edited at most once per SUMMARY_EDIT_INTERVAL_MS
+    to stay within Discord's rate limits for editing messages. The latest update of every
+    message is applied once the summaries are complete.
+    """
+    interval = get_config().SUMMARY_EDIT_INTERVAL_MS / 1000
+    loop = asyncio.get_running_loop()
+    pending: dict[int, str] = {}
+    next_edit = loop.time() + interval
+
+    async for position, content in updates:
+        pending[position] = content
+        if loop.time() >= next_edit:
+            await _apply_edits(messages, pending)
+            next_edit = loop.time() + interval
+    await _apply_edits(messages, pending)
+
+
+async def _apply_edits(messages: Sequence[WebhookMessage], pending: dict[int, str]):
+    """
+    Apply and clear the pending contents of the messages, logging the edits that fail.
+    """
+    for position, content in pending.items():
+        try:
+            await messages[position].edit(content=content)
+        except HTTPException:
+            logger.warning("Couldn't show the summary of a recommendation", exc_info=True)
+    pending.clear()
+
+
+async def send_recommendations(context: ApplicationContext, results: Sequence[Movie] | Sequence[TVShow],
+                               history_key: HistoryKey):
+    """
+    Pick and send recommendations as followups of a command, with buttons to reroll them
+    or show more from the same pool of results.
+
+    The pool is held in the pool store for CANDIDATE_POOL_TTL seconds, the buttons are
+    disabled after that.
+
+    Parameters
+    ----------
+    context : ApplicationContext
+        The context of the slash command.
+    results : Sequence[Movie] | Sequence[TVShow]
+        The pool of results fetched for the command.
+    history_key : HistoryKey
+        Guild, user and media type of the user who ran the command.
+    """
+    picks = pick_recommendations(results, history_key)
+    if not picks:
+        await context.respond("🚫 **No Matches found.**")
+        return
+
+    pool = CandidatePool(results, history_key)
+    pool_key = context.interaction.id
+    get_pool_store().set(pool_key, pool)
+    messages = await _send_picks(context.followup, pool, pool_key, picks)
+    await _render_summaries(messages, stream_picks(picks))
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import time
+
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Optional
+from ase_discord_bot.api_util.cache import CanonicalFilter, canonical_filter
+from ase_discord_bot.api_util.model.filters import MovieFilter, TVShowFilter
+from ase_discord_bot.api_util.model.genres import MovieGenre, TVShowGenre
+from ase_discord_bot.api_util.model.responses import LazyResults, Movie, TVShow
+from ase_discord_bot.catalog.index import CatalogIndex
+from ase_discord_bot.catalog.records import MediaRecord
+from ase_discord_bot.catalog.snapshot import SnapshotIndex, snapshot_path
+from ase_discord_bot.catalog.store import CatalogStore
+from ase_discord_bot.config import Config
+from ase_discord_bot.config_registry import get_config
+
+logger = logging.getLogger("Catalog")
+
+
+class Catalog:
+    """
+    Local catalog of discover results, with one index per media type.
+
+    Recommendations for covered filters are answered from memory, without any TMDB request.
+    """
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Parameters
+        ----------
+        ttl : float
+            Seconds after which an ingested pool no longer covers its filter. A ttl of 0 disables the catalog.
+        clock : Callable[[], float]
+            Monotonic time source in seconds, replaceable for testing.
+        """
+        self.movies = CatalogIndex(Movie, ttl, clock)
+        self.tvshows = CatalogIndex(TVShow, ttl, clock)
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether the catalog ingests and answers anything, False for a ttl of 0.
+        """
+        return self.movies.ttl > 0
+
+    def index(self, media_filter: MovieFilter | TVShowFilter) -> CatalogIndex:
+        """
+        The index holding the media type of a filter.
+
+        Parameters
+        ----------
+        media_filter : MovieFilter | TVShowFilter
+            The filter.
+
+        Returns
+        -------
+        CatalogIndex
+            The movie or TV show index.
+        """
+        return self.movies if isinstance(media_filter, MovieFilter) else self.tvshows
+
+    def media_type_index(self, media_type: str) -> CatalogIndex:
+        """
+        The index holding a media type.
+
+        Parameters
+        ----------
+        media_type : str
+            Either "movie" or "tv".
+
+        Returns
+        -------
+        CatalogIndex
+            The movie or TV show index.
+        """
+        return self.movies if media_type == "movie" else self.tvshows
+
+    def add_pool(self, media_filter: MovieFilter | TVShowFilter, min_vote_count: int,
+                 results: Iterable[Movie | TVShow | MediaRecord], complete: bool):
+        """
+        Ingest the discover pool of a filter.
+
+        Parameters
+        ----------
+        media_filter : MovieFilter | TVShowFilter
+            The filter the pool was fetched with.
+        min_vote_count : int
+            MIN_VOTE_COUNT the pool was fetched with.
+        results : Iterable[Movie | TVShow | MediaRecord]
+            The results of the pool.
+        complete : bool
+            Whether the pool holds every result of the filter.
+        """
+        self.index(media_filter).add_pool(canonical_filter(media_filter), min_vote_count, results, complete)
+
+    def query(self, media_filter: MovieFilter | TVShowFilter, min_vote_count: int,
+              limit: int) -> Optional[LazyResults[Movie] | LazyResults[TVShow]]:
+        """
+        Answer a filter from the catalog.
+
+        Parameters
+        ----------
+        media_filter : MovieFilter | TVShowFilter
+            The filter to answer.
+        min_vote_count : int
+            Minimum vote count of the results.
+        limit : int
+            Maximum number of results.
+
+        Returns
+        -------
+        Optional[LazyResults[Movie] | LazyResults[TVShow]]
+            The best rated matching results, or None if the filter is not covered.
+        """
+        return self.index(media_filter).query(canonical_filter(media_filter), min_vote_count, limit)
+
+    def load_store(self, store: CatalogStore):
+        """
+        Ingest all titles of a catalog store.
+
+        The store holds the complete export, so every genre counts as completely covered,
+        apart from the titles the ingestion left out for their low popularity.
+
+        Parameters
+        ----------
+        store : CatalogStore
+            The store to read.
+        """
+        for media_type in ("movie", "tv"):
+            index = self.media_type_index(media_type)
+            index.upsert(MediaRecord.from_result(media_type, result) for result in store.iter_results(media_type))
+            if len(index):
+                self.cover_all_genres(media_type)
+
+    def attach_snapshot(self, snapshot: SnapshotIndex):
+        """
+        Use a memory-mapped snapshot of the catalog store as the base of the index of its media type.
+
+        Like a loaded store, the snapshot covers every genre completely.
+
+        Parameters
+        ----------
+        snapshot : SnapshotIndex
+            The snapshot.
+        """
+        self.media_type_index(snapshot.media_type).attach_base(snapshot)
+        if len(snapshot):
+            self.cover_all_genres(snapshot.media_type)
+
+    def cover_all_genres(self, media_type: str):
+        """
+        Mark every genre of a media type as completely covered from now on, for an index
+        holding the whole catalog store.
+
+        Parameters
+        ----------
+        media_type : str
+            Either "movie" or "tv".
+        """
+        genres = MovieGenre if media_type == "movie" else TVShowGenre
+        index = self.media_type_index(media_type)
+        for genre in genres:
+            index.mark_covered(CanonicalFilter(media_type, genre.id), 0, complete=True)
+
+
+_catalog: Catalog | None = None
+
+
+def set_catalog(catalog: Catalog | None):
+    """
+    Replace the global catalog.
+
+    Parameters
+    ----------
+    catalog : Catalog | None
+        The catalog to set, or None to rebuild it from the configuration on next use.
+    """
+    global _catalog
+    _catalog = catalog
+
+
+def get_catalog() -> Catalog:
+    """
+    Retrieve the global catalog, creating it from the configuration on first use.
+
+    Returns
+    -------
+    Catalog
+        The catalog.
+    """
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog(get_config().CATALOG_TTL)
+    return _catalog
+
+
+_store_loaded = False
+
+
+async def load_catalog_store(cfg: Config):
+    """
+    Replace the global catalog with one built from the catalog file, once and only if
+    the catalog is enabled.
+
+    Snapshots of the catalog file are memory-mapped, which is instant. Without
+    snapshots, the catalog file itself is read, if it exists.
+
+    Parameters
+    ----------
+    cfg : Config
+        The configuration naming the catalog file.
+    """
+    global _store_loaded
+    path = Path(cfg.CATALOG_FILE)
+    snapshot_paths = [snapshot_path(path, media_type) for media_type in ("movie", "tv")]
+    if _store_loaded or cfg.CATALOG_TTL <= 0:
+        return
+
+    catalog = Catalog(cfg.CATALOG_TTL)
+    if any(snapshot.exists() for snapshot in snapshot_paths):
+        for snapshot in snapshot_paths:
+            if snapshot.exists():
+                catalog.attach_snapshot(SnapshotIndex(snapshot))
+    elif path.exists():
+        store = CatalogStore(path)
+        try:
+            await asyncio.to_thread(catalog.load_store, store)
+        finally:
+            store.close()
+    else:
+        return
+
+    _store_loaded = True
+    set_catalog(catalog)
+    logger.info(f"Loaded {len(catalog.movies)} movies and {len(catalog.tvshows)} TV shows from {path}")
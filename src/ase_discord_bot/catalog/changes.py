@@ -0,0 +1,216 @@
+import asyncio
+import logging
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional
+from ase_discord_bot.api_util.tmdb_client import TMDBClient, get_client
+from ase_discord_bot.catalog.catalog import Catalog, get_catalog
+from ase_discord_bot.catalog.ingest import fetch_result
+from ase_discord_bot.catalog.records import MediaRecord
+from ase_discord_bot.catalog.snapshot import write_store_snapshots
+from ase_discord_bot.catalog.store import CatalogStore
+from ase_discord_bot.config import Config
+
+logger = logging.getLogger("Changes")
+
+# Longest period TMDB serves changes for in a single request
+CHANGES_WINDOW = timedelta(days=14)
+
+# Media types with a change feed
+MEDIA_TYPES = ("movie", "tv")
+
+
+@dataclass
+class ChangeStats:
+    """
+    Counters of a change feed refresh.
+
+    Attributes
+    ----------
+    changed : int
+        Titles reported as changed by TMDB.
+    patched : int
+        Held titles that were refetched and replaced.
+    removed : int
+        Held titles that were deleted or became adult.
+    """
+    changed: int = 0
+    patched: int = 0
+    removed: int = 0
+
+
+async def fetch_changed_ids(client: TMDBClient, media_type: str, start: date, end: date,
+                            concurrency: int = 5) -> set[int]:
+    """
+    Request the IDs of all titles that changed within a period of at most CHANGES_WINDOW.
+
+    Parameters
+    ----------
+    client : TMDBClient
+        The client sending the requests.
+    media_type : str
+        Either "movie" or "tv".
+    start : date
+        First day of the period.
+    end : date
+        Last day of the period.
+    concurrency : int
+        Maximum number of requests in flight.
+
+    Returns
+    -------
+    set[int]
+        The IDs of the changed titles.
+
+    Raises
+    ------
+    RuntimeError
+        If a page of the change feed cannot be requested.
+    """
+    path = f"{media_type}/changes"
+    params: dict[str, str | int] = {"start_date": start.isoformat(), "end_date": end.isoformat()}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request_page(page: int) -> dict:
+        async with semaphore:
+            response = await client.get(path, {**params, "page": page})
+        if response.status_code != 200:
+            raise RuntimeError(f"Requesting page {page} of {path} failed with status code {response.status_code}")
+        return response.json()
+
+    first_page = await request_page(1)
+    pages = [first_page, *await asyncio.gather(*(request_page(p) for p in range(2, first_page["total_pages"] + 1)))]
+    return {result["id"] for page in pages for result in page["results"]}
+
+
+async def refresh_changes(store: CatalogStore, client: TMDBClient, media_type: str, today: date,
+                          catalog: Optional[Catalog] = None, batch_size: int = 100,
+                          concurrency: int = 5) -> ChangeStats:
+    """
+    Apply the TMDB change feed of a media type since the stored watermark.
+
+    Only titles held in the store are refetched, in batches of `batch_size` with at most
+    `concurrency` requests in flight. Changed titles are replaced and deleted or adult
+    ones removed, both in the store and, if given, in the catalog. The watermark advances
+    after every applied window of at most CHANGES_WINDOW, so a failed refresh resumes there.
+    Without a watermark, the refresh starts on the day before `today`. After a successful
+    refresh, the catalog's coverage of every genre is renewed, since it is up to date again.
+
+    Parameters
+    ----------
+    store : CatalogStore
+        The store to update.
+    client : TMDBClient
+        The client sending the requests.
+    media_type : str
+        Either "movie" or "tv".
+    today : date
+        Last day to apply changes of.
+    catalog : Optional[Catalog]
+        The catalog to patch in place, none if None.
+    batch_size : int
+        Number of titles refetched per batch.
+    concurrency : int
+        Maximum number of requests in flight.
+
+    Returns
+    -------
+    ChangeStats
+        The counters of this refresh.
+
+    Raises
+    ------
+    RuntimeError
+        If a request fails. The windows applied before are kept.
+    """
+    stats = ChangeStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    start = await asyncio.to_thread(store.watermark, media_type) or today - timedelta(days=1)
+
+    async def refetch(title_id: int) -> tuple[int, dict | None]:
+        async with semaphore:
+            return title_id, await fetch_result(client, media_type, title_id)
+
+    while start < today:
+        end = min(start + CHANGES_WINDOW, today)
+        changed_ids = sorted(await fetch_changed_ids(client, media_type, start, end, concurrency))
+        stats.changed += len(changed_ids)
+
+        for i in range(0, len(changed_ids), batch_size):
+            held_ids = await asyncio.to_thread(store.existing_ids, media_type, changed_ids[i:i + batch_size])
+            fetched = await asyncio.gather(*(refetch(title_id) for title_id in held_ids))
+            results = [result for _, result in fetched if result is not None and not result["adult"]]
+            removed_ids = [title_id for title_id, result in fetched if result is None or result["adult"]]
+
+            await asyncio.to_thread(store.apply_changes, media_type, results, removed_ids)
+            if catalog is not None:
+                index = catalog.media_type_index(media_type)
+                index.upsert(MediaRecord.from_result(media_type, result) for result in results)
+                index.remove(removed_ids)
+            stats.patched += len(results)
+            stats.removed += len(removed_ids)
+
+        await asyncio.to_thread(store.set_watermark, media_type, end)
+        start = end
+
+    if catalog is not None and len(catalog.media_type_index(media_type)):
+        catalog.cover_all_genres(media_type)
+    return stats
+
+
+async def _refresh_periodically(path: Path, interval: float):
+    """
+    Apply the change feeds to the catalog file and the global catalog every `interval` seconds,
+    and rewrite the snapshots of the catalog file if anything changed.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        store = CatalogStore(path)
+        try:
+            changed = False
+            for media_type in MEDIA_TYPES:
+                stats = await refresh_changes(store, get_client(), media_type, date.today(), get_catalog())
+                logger.info(f"Applied {media_type} changes: {stats}")
+                changed = changed or stats.patched > 0 or stats.removed > 0
+            if changed:
+                await asyncio.to_thread(write_store_snapshots, store, path)
+        except Exception:
+            logger.exception("Applying the change feed failed, retrying on the next refresh")
+        finally:
+            store.close()
+
+
+_refresh_task: asyncio.Task | None = None
+
+
+def start_catalog_refresher(cfg: Config):
+    """
+    Start the global task applying the change feeds, unless it is running, disabled by
+    an interval of 0 or there is no catalog file.
+
+    Parameters
+    ----------
+    cfg : Config
+        The configuration to build the task from.
+    """
+    global _refresh_task
+    path = Path(cfg.CATALOG_FILE)
+    if _refresh_task is not None or cfg.CATALOG_REFRESH_INTERVAL <= 0 or not path.exists():
+        return
+    _refresh_task = asyncio.create_task(_refresh_periodically(path, cfg.CATALOG_REFRESH_INTERVAL))
+
+
+async def stop_catalog_refresher():
+    """
+    Cancel the global task applying the change feeds, if it is running.
+    """
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
@@ -0,0 +1,97 @@
+import numpy as np
+
+from collections.abc import Iterable
+from ase_discord_bot.api_util.cache import CanonicalFilter
+from ase_discord_bot.api_util.model.genres import MovieGenre, TVShowGenre
+from ase_discord_bot.api_util.model.responses import Movie, TVShow
+
+# Bit of every known genre ID in the genre bitmask column
+GENRE_BITS: dict[int, int] = {
+    genre_id: bit for bit, genre_id in enumerate(sorted(set(MovieGenre.ids()) | set(TVShowGenre.ids())))
+}
+
+# Year stored for results without a release or first air date
+UNKNOWN_YEAR = 0
+
+# Type of the language column, holding ISO 639-1 codes
+LANGUAGE_DTYPE = np.dtype("S3")
+
+
+def genre_mask(genre_ids: Iterable[int]) -> int:
+    """
+    Combine genre IDs into a bitmask, ignoring unknown genres.
+
+    Parameters
+    ----------
+    genre_ids : Iterable[int]
+        The genre IDs.
+
+    Returns
+    -------
+    int
+        The bitmask with the bit of every known genre set.
+    """
+    mask = 0
+    for genre_id in genre_ids:
+        if (bit := GENRE_BITS.get(genre_id)) is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def release_year(media: Movie | TVShow) -> int:
+    """
+    Year of the release or first air date of a result.
+
+    Parameters
+    ----------
+    media : Movie | TVShow
+        The result.
+
+    Returns
+    -------
+    int
+        The year, or UNKNOWN_YEAR if the date is missing or invalid.
+    """
+    date = media.release_date if isinstance(media, Movie) else media.first_air_date
+    year = date[:4]
+    return int(year) if year.isdigit() else UNKNOWN_YEAR
+
+
+def filter_mask(key: CanonicalFilter, min_vote_count: int, genres: np.ndarray, years: np.ndarray,
+                languages: np.ndarray, vote_counts: np.ndarray) -> np.ndarray:
+    """
+    Evaluate a filter over catalog columns of equal length.
+
+    Parameters
+    ----------
+    key : CanonicalFilter
+        The filter to evaluate.
+    min_vote_count : int
+        Minimum vote count of the matching rows.
+    genres : np.ndarray
+        Genre bitmask column.
+    years : np.ndarray
+        Release year column.
+    languages : np.ndarray
+        Language ISO code column.
+    vote_counts : np.ndarray
+        Vote count column.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the matching rows.
+    """
+    bit = GENRE_BITS.get(key.genre)
+    if bit is None:
+        return np.zeros(len(genres), dtype=bool)
+
+    mask = (genres & np.uint64(1 << bit)) != 0
+    mask &= vote_counts >= min_vote_count
+    if key.language is not None:
+        mask &= languages == key.language.encode()
+    if key.min_year is not None:
+        mask &= years >= key.min_year
+    if key.max_year is not None:
+        mask &= (years <= key.max_year) & (years != UNKNOWN_YEAR)
+    return mask
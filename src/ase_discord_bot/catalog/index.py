@@ -0,0 +1,353 @@
+import time
+import numpy as np
+
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Optional
+from ase_discord_bot.api_util.cache import CanonicalFilter
+from ase_discord_bot.api_util.model.responses import LazyResults, Movie, TVShow
+from ase_discord_bot.catalog.columns import LANGUAGE_DTYPE, filter_mask
+from ase_discord_bot.catalog.records import MediaRecord
+from ase_discord_bot.catalog.snapshot import SnapshotIndex
+
+# Initial number of rows allocated per column
+INITIAL_CAPACITY = 1024
+
+# Maximum number of covered filters held, the least recently used are forgotten beyond it
+MAX_COVERAGES = 4096
+
+
+@dataclass
+class Coverage:
+    """
+    Record of a discover pool that was ingested into the catalog.
+
+    Attributes
+    ----------
+    min_vote_count : int
+        MIN_VOTE_COUNT the pool was fetched with.
+    complete : bool
+        Whether the pool holds every result of its filter, not only the first pages.
+    ingested_at : float
+        Monotonic time of the ingestion.
+    ids : Optional[np.ndarray]
+        IDs of the results of an incomplete pool, which are the only ones answering its filter.
+    """
+    min_vote_count: int
+    complete: bool
+    ingested_at: float
+    ids: Optional[np.ndarray] = None
+
+
+class CatalogIndex:
+    """
+    In-memory struct-of-arrays index of the discover results of one media type.
+
+    Each result is a row of NumPy columns holding its genre bitmask, release year,
+    language, vote average, vote count and popularity, so a filter is evaluated as a
+    single vectorized mask over all rows. Results are upserted by their ID and held as
+    compact MediaRecord objects, which are only converted to models when a query result
+    is accessed.
+
+    The index also records which filters it covers: a filter whose discover pool was
+    ingested, or that is narrower than a filter whose complete result set was ingested.
+    Only covered filters are answered, coverage expires after `ttl` seconds. A filter
+    covered only by its own incomplete pool is answered from the results of that pool,
+    so results ingested from other pools cannot displace its first pages. Lookups drop the
+    expired coverage they come across, and beyond MAX_COVERAGES filters the least recently
+    used coverage is dropped.
+
+    A read-only snapshot can be attached as the base of the index. Its rows are queried
+    together with the rows of the index, which take precedence over base rows of the
+    same ID, so the base never has to be copied into memory to be updated.
+    """
+
+    def __init__(self, model: type[Movie] | type[TVShow], ttl: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Parameters
+        ----------
+        model : type[Movie] | type[TVShow]
+            Model of the indexed results.
+        ttl : float
+            Seconds after which the coverage of an ingested pool expires.
+        clock : Callable[[], float]
+            Monotonic time source in seconds, replaceable for testing.
+        """
+        self.model = model
+        self.ttl = ttl
+        self._clock = clock
+        self._size = 0
+        self._ids = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._genres = np.zeros(INITIAL_CAPACITY, dtype=np.uint64)
+        self._years = np.zeros(INITIAL_CAPACITY, dtype=np.int16)
+        self._languages = np.zeros(INITIAL_CAPACITY, dtype=LANGUAGE_DTYPE)
+        self._vote_averages = np.zeros(INITIAL_CAPACITY, dtype=np.float32)
+        self._vote_counts = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self._popularities = np.zeros(INITIAL_CAPACITY, dtype=np.float32)
+        self._items: list[MediaRecord] = []
+        self._rows: dict[int, int] = {}
+        self._coverage: OrderedDict[CanonicalFilter, Coverage] = OrderedDict()
+        self._base: Optional[SnapshotIndex] = None
+        self._base_hidden = np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return self._size + int(len(self._base_hidden) - self._base_hidden.sum())
+
+    def attach_base(self, base: SnapshotIndex):
+        """
+        Use a snapshot as the base of the index, replacing a previous base.
+
+        Parameters
+        ----------
+        base : SnapshotIndex
+            The snapshot.
+        """
+        self._base = base
+        self._base_hidden = np.zeros(len(base), dtype=bool)
+        for media_id in self._rows:
+            self._hide_in_base(media_id)
+
+    def upsert(self, results: Iterable[Movie | TVShow | MediaRecord]):
+        """
+        Add results to the index, replacing the rows of results that are already present.
+
+        Parameters
+        ----------
+        results : Iterable[Movie | TVShow | MediaRecord]
+            The results to add, models are converted to records.
+        """
+        for media in results:
+            if not isinstance(media, MediaRecord):
+                media = MediaRecord.from_model(media)
+            self._hide_in_base(media.id)
+            row = self._rows.get(media.id)
+            if row is None:
+                row = self._size
+                self._ensure_capacity(row + 1)
+                self._rows[media.id] = row
+                self._items.append(media)
+                self._size += 1
+            else:
+                self._items[row] = media
+
+            self._ids[row] = media.id
+            self._genres[row] = media.genres
+            self._years[row] = media.year
+            self._languages[row] = media.original_language.encode()
+            self._vote_averages[row] = media.vote_average
+            self._vote_counts[row] = media.vote_count
+            self._popularities[row] = media.popularity
+
+    def remove(self, ids: Iterable[int]):
+        """
+        Remove results from the index. Their rows are kept for reuse, but no longer match any filter.
+
+        Parameters
+        ----------
+        ids : Iterable[int]
+            IDs of the results to remove.
+        """
+        for media_id in ids:
+            self._hide_in_base(media_id)
+            if (row := self._rows.get(media_id)) is not None:
+                self._genres[row] = 0
+
+    def add_pool(self, key: CanonicalFilter, min_vote_count: int, results: Iterable[Movie | TVShow | MediaRecord],
+                 complete: bool):
+        """
+        Ingest the discover pool of a filter and record that the filter is covered.
+        A disabled index, with a `ttl` of 0, ingests nothing.
+
+        Parameters
+        ----------
+        key : CanonicalFilter
+            The filter the pool was fetched with.
+        min_vote_count : int
+            MIN_VOTE_COUNT the pool was fetched with.
+        results : Iterable[Movie | TVShow | MediaRecord]
+            The results of the pool.
+        complete : bool
+            Whether the pool holds every result of the filter.
+        """
+        if self.ttl <= 0:
+            return
+        results = list(results)
+        self.upsert(results)
+        ids = None if complete else np.fromiter((media.id for media in results), dtype=np.int64, count=len(results))
+        self.mark_covered(key, min_vote_count, complete, ids)
+
+    def mark_covered(self, key: CanonicalFilter, min_vote_count: int, complete: bool,
+                     ids: Optional[np.ndarray] = None):
+        """
+        Record that the results of a filter have been ingested.
+
+        Parameters
+        ----------
+        key : CanonicalFilter
+            The covered filter.
+        min_vote_count : int
+            Minimum vote count of the ingested results.
+        complete : bool
+            Whether every result of the filter was ingested.
+        ids : Optional[np.ndarray]
+            IDs of the ingested results of an incomplete pool, all matching results answer the filter if None.
+        """
+        self._coverage[key] = Coverage(min_vote_count, complete, self._clock(), ids)
+        self._coverage.move_to_end(key)
+        while len(self._coverage) > MAX_COVERAGES:
+            self._coverage.popitem(last=False)
+
+    def covers(self, key: CanonicalFilter, min_vote_count: int) -> bool:
+        """
+        Check whether the index can answer a filter.
+
+        Parameters
+        ----------
+        key : CanonicalFilter
+            The filter to check.
+        min_vote_count : int
+            MIN_VOTE_COUNT of the query.
+
+        Returns
+        -------
+        bool
+            True if the filter's own pool or a complete pool of a broader filter is ingested and not expired.
+        """
+        return self._covering(key, min_vote_count) is not None
+
+    def query(self, key: CanonicalFilter, min_vote_count: int, limit: int) -> Optional[LazyResults]:
+        """
+        Answer a filter from the index.
+
+        Parameters
+        ----------
+        key : CanonicalFilter
+            The filter to answer.
+        min_vote_count : int
+            Minimum vote count of the results.
+        limit : int
+            Maximum number of results, the best rated are kept.
+
+        Returns
+        -------
+        Optional[LazyResults]
+            The matching results by descending vote average, like TMDB's discover orders them,
+            then by descending popularity, converted to models when accessed, or None if the
+            filter is not covered.
+        """
+        coverage = self._covering(key, min_vote_count)
+        if coverage is None:
+            return None
+
+        size = self._size
+        rows = np.flatnonzero(filter_mask(key, min_vote_count, self._genres[:size], self._years[:size],
+                                          self._languages[:size], self._vote_counts[:size]))
+        # Columns of the matching rows, handed to the results so they are read without validation
+        columns = {
+            "id": self._ids[rows],
+            "popularity": self._popularities[rows],
+            "vote_average": self._vote_averages[rows],
+            "vote_count": self._vote_counts[rows],
+            "genres": self._genres[rows],
+            "year": self._years[rows],
+            "language": self._languages[rows],
+        }
+        base = self._base
+        base_rows = np.zeros(0, dtype=np.intp)
+        if base is not None:
+            base_mask = filter_mask(key, min_vote_count, base.genres, base.years, base.languages, base.vote_counts)
+            base_rows = np.flatnonzero(base_mask & ~self._base_hidden)
+            base_columns = {
+                "id": base.ids, "popularity": base.popularities, "vote_average": base.vote_averages,
+                "vote_count": base.vote_counts, "genres": base.genres, "year": base.years, "language": base.languages,
+            }
+            for name, column in base_columns.items():
+                columns[name] = np.concatenate([columns[name], column[base_rows]])
+
+        # Positions below len(rows) refer to rows of the index, the others to rows of the base
+        order = np.lexsort((-columns["popularity"], -columns["vote_average"]))
+        if coverage.ids is not None:
+            order = order[np.isin(columns["id"][order], coverage.ids)]
+        order = order[:limit]
+        columns = {name: column[order] for name, column in columns.items()}
+        for name in ("popularity", "vote_average", "vote_count"):
+            columns[name] = columns[name].astype(np.float64)
+        return LazyResults(self.model, [
+            self._items[rows[position]] if position < len(rows) else int(base_rows[position - len(rows)])
+            for position in order
+        ], lambda item: item.to_model() if isinstance(item, MediaRecord) else base.item(item), columns)
+
+    def _covering(self, key: CanonicalFilter, min_vote_count: int) -> Optional[Coverage]:
+        """
+        The unexpired coverage answering a filter, preferring complete pools over the filter's own incomplete one.
+        Drops the expired coverage it comes across and marks the returned one as recently used.
+        """
+        if self.ttl <= 0:
+            return None
+
+        now = self._clock()
+        coverage = self._coverage.get(key)
+        if coverage is not None and now - coverage.ingested_at >= self.ttl:
+            del self._coverage[key]
+            coverage = None
+        if coverage is not None and coverage.complete and coverage.min_vote_count <= min_vote_count:
+            self._coverage.move_to_end(key)
+            return coverage
+
+        found = None
+        expired = []
+        for broader, broader_coverage in self._coverage.items():
+            if now - broader_coverage.ingested_at >= self.ttl:
+                expired.append(broader)
+            elif (found is None and broader_coverage.complete
+                    and broader_coverage.min_vote_count <= min_vote_count
+                    and _is_broader(broader, key)):
+                found = broader
+        for broader in expired:
+            del self._coverage[broader]
+
+        if found is not None:
+            self._coverage.move_to_end(found)
+            return self._coverage[found]
+        if coverage is not None and coverage.min_vote_count == min_vote_count:
+            self._coverage.move_to_end(key)
+            return coverage
+        return None
+
+    def _hide_in_base(self, media_id: int):
+        """
+        Hide the base row of a result that is replaced or removed.
+        """
+        if self._base is not None and (row := self._base.row_of(media_id)) is not None:
+            self._base_hidden[row] = True
+
+    def _ensure_capacity(self, size: int):
+        """
+        Grow all columns to hold at least `size` rows, doubling their capacity.
+        """
+        capacity = len(self._ids)
+        if size <= capacity:
+            return
+
+        while capacity < size:
+            capacity *= 2
+        for name in ("_ids", "_genres", "_years", "_languages", "_vote_averages", "_vote_counts",
+                     "_popularities"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+
+def _is_broader(broader: CanonicalFilter, key: CanonicalFilter) -> bool:
+    """
+    Check whether every result of `key` is also a result of `broader`.
+    """
+    return (
+        broader.media_type == key.media_type
+        and broader.genre == key.genre
+        and broader.language in (None, key.language)
+        and (broader.min_year is None or key.min_year is not None and broader.min_year <= key.min_year)
+        and (broader.max_year is None or key.max_year is not None and broader.max_year >= key.max_year)
+    )
@@ -0,0 +1,260 @@
+import asyncio
+import gzip
+import json
+import logging
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from ase_discord_bot.api_util.tmdb_client import TMDBClient
+from ase_discord_bot.catalog.store import CatalogStore
+
+logger = logging.getLogger("Ingest")
+
+# Prefix of the daily export file names of each media type, e.g. movie_ids_05_15_2025.json.gz
+EXPORT_PREFIXES = {"movie": "movie_ids", "tv": "tv_series_ids"}
+
+# Number of written batches between two progress log messages
+PROGRESS_LOG_INTERVAL = 50
+
+
+@dataclass
+class IngestStats:
+    """
+    Counters of an export ingestion.
+
+    Attributes
+    ----------
+    read : int
+        Records read from the export.
+    enriched : int
+        New titles whose details were requested and stored.
+    refreshed : int
+        Stored titles whose popularity was updated.
+    skipped : int
+        Records left out: adult, below the popularity threshold or no longer on TMDB.
+    """
+    read: int = 0
+    enriched: int = 0
+    refreshed: int = 0
+    skipped: int = 0
+
+
+def export_media_type(path: Path) -> str:
+    """
+    Media type of a daily export file, derived from its name.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the export file.
+
+    Returns
+    -------
+    str
+        Either "movie" or "tv".
+
+    Raises
+    ------
+    ValueError
+        If the file name does not start with a known export prefix.
+    """
+    for media_type, prefix in EXPORT_PREFIXES.items():
+        if path.name.startswith(prefix):
+            return media_type
+    raise ValueError(f"Cannot tell the media type of export file '{path.name}'")
+
+
+def read_export(path: Path, start_line: int = 0) -> Iterator[tuple[int, dict[str, Any]]]:
+    """
+    Stream the records of a daily export file one line at a time.
+
+    The file holds one JSON object per line and may be gzip-compressed. Malformed
+    lines are logged and skipped.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the export file, gzip-compressed if it ends with ".gz".
+    start_line : int
+        Number of lines to skip, e.g. the lines ingested before an interruption.
+
+    Returns
+    -------
+    Iterator[tuple[int, dict[str, Any]]]
+        The line number, starting at 1, and the record of every line.
+    """
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            if line_number <= start_line or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed line {line_number} of {path.name}")
+                continue
+            yield line_number, record
+
+
+def to_result(media_type: str, details: dict[str, Any]) -> dict[str, Any]:
+    """
+    Convert the details of a title to the shape of a discover result.
+
+    Parameters
+    ----------
+    media_type : str
+        Either "movie" or "tv".
+    details : dict[str, Any]
+        Response of the movie or TV series details endpoint.
+
+    Returns
+    -------
+    dict[str, Any]
+        The title as it would appear in the results of a discover request.
+    """
+    result = {
+        "adult": details.get("adult", False),
+        "backdrop_path": details.get("backdrop_path"),
+        "genre_ids": [genre["id"] for genre in details.get("genres", [])],
+        "id": details["id"],
+        "original_language": details.get("original_language") or "",
+        "overview": details.get("overview") or "",
+        "popularity": details.get("popularity") or 0.0,
+        "poster_path": details.get("poster_path"),
+        "vote_average": details.get("vote_average") or 0.0,
+        "vote_count": details.get("vote_count") or 0,
+    }
+    if media_type == "movie":
+        result.update({
+            "original_title": details.get("original_title") or "",
+            "release_date": details.get("release_date") or "",
+            "title": details.get("title") or "",
+            "video": details.get("video", False),
+        })
+    else:
+        result.update({
+            "origin_country": details.get("origin_country", []),
+            "original_name": details.get("original_name") or "",
+            "first_air_date": details.get("first_air_date") or "",
+            "name": details.get("name") or "",
+        })
+    return result
+
+
+async def fetch_result(client: TMDBClient, media_type: str, title_id: int) -> dict[str, Any] | None:
+    """
+    Request the details of a title as a discover result.
+
+    Parameters
+    ----------
+    client : TMDBClient
+        The client sending the request.
+    media_type : str
+        Either "movie" or "tv".
+    title_id : int
+        The title ID.
+
+    Returns
+    -------
+    dict[str, Any] | None
+        The discover result, or None if the title no longer exists.
+
+    Raises
+    ------
+    RuntimeError
+        If the request fails.
+    """
+    response = await client.get(f"{media_type}/{title_id}", {})
+    if response.status_code == 404:
+        return None
+    if response.status_code != 200:
+        raise RuntimeError(f"Requesting {media_type} {title_id} failed with status code {response.status_code}")
+    return to_result(media_type, response.json())
+
+
+async def ingest_export(path: Path, store: CatalogStore, client: TMDBClient, batch_size: int = 100,
+                        concurrency: int = 5, min_popularity: float = 0.0) -> IngestStats:
+    """
+    Ingest a daily export file into the catalog store.
+
+    The file is streamed in batches of `batch_size` records, so memory use does not
+    depend on its size. Adult titles and titles below `min_popularity` are skipped.
+    Titles already in the store only get their popularity refreshed from the export,
+    the details of new titles are requested from TMDB, with at most `concurrency`
+    requests in flight. Every batch is written together with a checkpoint, so after an
+    interruption the ingestion resumes with the first batch that was not written.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the export file.
+    store : CatalogStore
+        The store to write to.
+    client : TMDBClient
+        The client requesting the details of new titles.
+    batch_size : int
+        Number of records per batch.
+    concurrency : int
+        Maximum number of detail requests in flight.
+    min_popularity : float
+        Minimum popularity of ingested titles.
+
+    Returns
+    -------
+    IngestStats
+        The counters of this run.
+
+    Raises
+    ------
+    RuntimeError
+        If the details of a title cannot be requested. Written batches are kept.
+    """
+    media_type = export_media_type(path)
+    start_line = await asyncio.to_thread(store.checkpoint, path.name)
+    if start_line:
+        logger.info(f"Resuming {path.name} after line {start_line}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = IngestStats()
+    batch: list[dict[str, Any]] = []
+    batches_written = 0
+    last_line = start_line
+
+    async def enrich(title_id: int) -> dict[str, Any] | None:
+        async with semaphore:
+            return await fetch_result(client, media_type, title_id)
+
+    async def write_batch():
+        nonlocal batches_written
+        existing = await asyncio.to_thread(store.existing_ids, media_type, (record["id"] for record in batch))
+        new_ids = [record["id"] for record in batch if record["id"] not in existing]
+        results = [result for result in await asyncio.gather(*(enrich(i) for i in new_ids)) if result is not None]
+        popularities = [(record["id"], record.get("popularity", 0.0)) for record in batch if record["id"] in existing]
+
+        await asyncio.to_thread(store.write_batch, media_type, results, popularities, path.name, last_line)
+        stats.enriched += len(results)
+        stats.refreshed += len(popularities)
+        stats.skipped += len(new_ids) - len(results)
+        batch.clear()
+
+        batches_written += 1
+        if batches_written % PROGRESS_LOG_INTERVAL == 0:
+            logger.info(f"Ingested {path.name} up to line {last_line}: {stats}")
+
+    for line_number, record in read_export(path, start_line):
+        stats.read += 1
+        last_line = line_number
+        if record.get("adult") or record.get("popularity", 0.0) < min_popularity or "id" not in record:
+            stats.skipped += 1
+        else:
+            batch.append(record)
+
+        if len(batch) >= batch_size:
+            await write_batch()
+
+    # Also records the checkpoint of trailing skipped records
+    await write_batch()
+    logger.info(f"Finished ingesting {path.name}: {stats}")
+    return stats
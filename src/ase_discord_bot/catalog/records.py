@@ -0,0 +1,203 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Optional
+from ase_discord_bot.api_util.model.responses import Movie, TVShow
+from ase_discord_bot.catalog.columns import GENRE_BITS, UNKNOWN_YEAR, genre_mask
+
+# Genre ID of every bit of the genre bitmask
+GENRE_IDS_BY_BIT: dict[int, int] = {bit: genre_id for genre_id, bit in GENRE_BITS.items()}
+
+# Ordinal stored for results without a valid release or first air date
+UNKNOWN_DATE = 0
+
+
+@dataclass(frozen=True, slots=True)
+class MediaRecord:
+    """
+    Compact, immutable record of a movie or TV show result held in candidate pools.
+
+    Unlike a Movie or TVShow model, a record has no instance dict and no validator
+    state, its genre IDs are a single bitmask and its release or first air date is a
+    date ordinal. Records are converted to models only when they are displayed.
+
+    Attributes
+    ----------
+    is_movie : bool
+        Whether the record is a movie, otherwise it is a TV show.
+    id : int
+        Unique identifier for the media.
+    genres : int
+        Bitmask of the known genre IDs, see GENRE_BITS.
+    release_ordinal : int
+        Ordinal of the release or first air date, UNKNOWN_DATE if missing.
+    popularity : float
+        Popularity score.
+    vote_average : float
+        Average vote score.
+    vote_count : int
+        Total vote count.
+    original_language : str
+        ISO code of the original language.
+    title : str
+        The display title or name.
+    original_title : str
+        The original title or name.
+    overview : str
+        Summary of the media content.
+    poster_path : Optional[str]
+        Path to the poster image.
+    backdrop_path : Optional[str]
+        Path to the backdrop image.
+    adult : bool
+        Indicates if the media is adult content.
+    video : bool
+        Indicates if a video is available, always False for TV shows.
+    origin_country : tuple[str, ...]
+        Countries of origin, always empty for movies.
+    """
+    is_movie: bool
+    id: int
+    genres: int
+    release_ordinal: int
+    popularity: float
+    vote_average: float
+    vote_count: int
+    original_language: str
+    title: str
+    original_title: str
+    overview: str
+    poster_path: Optional[str]
+    backdrop_path: Optional[str]
+    adult: bool
+    video: bool
+    origin_country: tuple[str, ...]
+
+    @property
+    def year(self) -> int:
+        """
+        Year of the release or first air date, UNKNOWN_YEAR if missing.
+        """
+        return date.fromordinal(self.release_ordinal).year if self.release_ordinal != UNKNOWN_DATE else UNKNOWN_YEAR
+
+    @property
+    def genre_ids(self) -> list[int]:
+        """
+        The known genre IDs, in the order of their bits.
+        """
+        return [genre_id for bit, genre_id in GENRE_IDS_BY_BIT.items() if self.genres >> bit & 1]
+
+    @classmethod
+    def from_model(cls, media: Movie | TVShow) -> "MediaRecord":
+        """
+        Build a record from a validated model.
+
+        Parameters
+        ----------
+        media : Movie | TVShow
+            The result.
+
+        Returns
+        -------
+        MediaRecord
+            The record, without the genre IDs unknown to GENRE_BITS.
+        """
+        if isinstance(media, Movie):
+            return cls(True, media.id, genre_mask(media.genre_ids), date_ordinal(media.release_date),
+                       media.popularity, media.vote_average, media.vote_count, media.original_language,
+                       media.title, media.original_title, media.overview, media.poster_path, media.backdrop_path,
+                       media.adult, media.video, ())
+        return cls(False, media.id, genre_mask(media.genre_ids), date_ordinal(media.first_air_date),
+                   media.popularity, media.vote_average, media.vote_count, media.original_language,
+                   media.name, media.original_name, media.overview, media.poster_path, media.backdrop_path,
+                   media.adult, False, tuple(media.origin_country))
+
+    @classmethod
+    def from_result(cls, media_type: str, result: dict[str, Any]) -> "MediaRecord":
+        """
+        Build a record from a discover result without validating it into a model first.
+
+        Parameters
+        ----------
+        media_type : str
+            Either "movie" or "tv".
+        result : dict[str, Any]
+            The discover result, e.g. from the catalog store.
+
+        Returns
+        -------
+        MediaRecord
+            The record, without the genre IDs unknown to GENRE_BITS.
+
+        Raises
+        ------
+        KeyError
+            If the result lacks a field.
+        """
+        is_movie = media_type == "movie"
+        return cls(
+            is_movie,
+            int(result["id"]),
+            genre_mask(result["genre_ids"]),
+            date_ordinal(result["release_date"] if is_movie else result["first_air_date"]),
+            float(result["popularity"]),
+            float(result["vote_average"]),
+            int(result["vote_count"]),
+            result["original_language"],
+            result["title"] if is_movie else result["name"],
+            result["original_title"] if is_movie else result["original_name"],
+            result["overview"],
+            result["poster_path"],
+            result["backdrop_path"],
+            bool(result["adult"]),
+            bool(result["video"]) if is_movie else False,
+            () if is_movie else tuple(result["origin_country"]),
+        )
+
+    def to_model(self) -> Movie | TVShow:
+        """
+        Validate the record into the model of its media type.
+
+        Returns
+        -------
+        Movie | TVShow
+            The result.
+        """
+        fields = {
+            "adult": self.adult,
+            "backdrop_path": self.backdrop_path,
+            "genre_ids": self.genre_ids,
+            "id": self.id,
+            "original_language": self.original_language,
+            "overview": self.overview,
+            "popularity": self.popularity,
+            "poster_path": self.poster_path,
+            "vote_average": self.vote_average,
+            "vote_count": self.vote_count,
+        }
+        iso_date = date.fromordinal(self.release_ordinal).isoformat() if self.release_ordinal != UNKNOWN_DATE else ""
+        if self.is_movie:
+            return Movie.model_validate({**fields, "original_title": self.original_title, "release_date": iso_date,
+                                         "title": self.title, "video": self.video})
+        return TVShow.model_validate({**fields, "origin_country": list(self.origin_country),
+                                      "original_name": self.original_title, "first_air_date": iso_date,
+                                      "name": self.title})
+
+
+def date_ordinal(iso_date: str) -> int:
+    """
+    Convert an ISO date to its ordinal.
+
+    Parameters
+    ----------
+    iso_date : str
+        The date, e.g. "2000-01-31".
+
+    Returns
+    -------
+    int
+        The date ordinal, or UNKNOWN_DATE if the date is missing or invalid.
+    """
+    try:
+        return date.fromisoformat(iso_date).toordinal()
+    except (TypeError, ValueError):
+        return UNKNOWN_DATE
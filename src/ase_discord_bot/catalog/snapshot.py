@@ -0,0 +1,231 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import numpy as np
+
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+from ase_discord_bot.api_util.model.responses import Movie, TVShow
+from ase_discord_bot.catalog.columns import LANGUAGE_DTYPE, genre_mask, release_year
+from ase_discord_bot.catalog.store import CatalogStore
+
+# File signature and format version, followed by the media type and the number of rows
+HEADER = struct.Struct("<8sHHIQ")
+MAGIC = b"ASECATLG"
+VERSION = 1
+
+MEDIA_TYPE_CODES = {"movie": 0, "tv": 1}
+MODELS: dict[str, type[Movie] | type[TVShow]] = {"movie": Movie, "tv": TVShow}
+
+# Fixed-width columns in file order, each starting at a multiple of COLUMN_ALIGNMENT
+COLUMNS: list[tuple[str, np.dtype]] = [
+    ("ids", np.dtype("<i8")),
+    ("genres", np.dtype("<u8")),
+    ("popularities", np.dtype("<f4")),
+    ("vote_averages", np.dtype("<f4")),
+    ("vote_counts", np.dtype("<i4")),
+    ("years", np.dtype("<i2")),
+    ("languages", LANGUAGE_DTYPE),
+]
+COLUMN_ALIGNMENT = 8
+
+# Fields stored in the columns, the remaining ones are stored as JSON in the string heap
+COLUMN_FIELDS = ("id", "popularity", "vote_average", "vote_count", "original_language")
+
+
+def snapshot_path(catalog_file: Path, media_type: str) -> Path:
+    """
+    Path of the snapshot of a media type next to the catalog file.
+
+    Parameters
+    ----------
+    catalog_file : Path
+        Path of the catalog file.
+    media_type : str
+        Either "movie" or "tv".
+
+    Returns
+    -------
+    Path
+        The snapshot path, e.g. catalog.movie.snapshot.
+    """
+    return catalog_file.with_suffix(f".{media_type}.snapshot")
+
+
+def _layout(count: int) -> tuple[dict[str, int], int]:
+    """
+    Offsets of all columns of a snapshot with `count` rows, and the offset of the heap index.
+    """
+    offsets = {}
+    offset = HEADER.size
+    for name, dtype in COLUMNS:
+        offset = -(-offset // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+        offsets[name] = offset
+        offset += count * dtype.itemsize
+    return offsets, -(-offset // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+
+
+def write_snapshot(path: Path, media_type: str, results: Iterable[dict[str, Any]]):
+    """
+    Write discover results to a snapshot file.
+
+    The file starts with a header, followed by one fixed-width column per indexed field,
+    the heap offsets of every row and the string heap holding the remaining fields of
+    every row as JSON. Only the columns are held in memory while writing, the heap is
+    streamed to a temporary file. The snapshot replaces an existing file atomically, so
+    processes that have mapped the old one keep reading it undisturbed.
+
+    Parameters
+    ----------
+    path : Path
+        Path of the snapshot file.
+    media_type : str
+        Either "movie" or "tv".
+    results : Iterable[dict[str, Any]]
+        The discover results, ordered by ID.
+
+    Raises
+    ------
+    ValueError
+        If the results are not ordered by ID.
+    """
+    model = MODELS[media_type]
+    columns = {name: [] for name, _ in COLUMNS}
+    heap_offsets = array("Q", [0])
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryFile(dir=path.parent) as heap:
+        for result in results:
+            media = model(**result)
+            if columns["ids"] and media.id <= columns["ids"][-1]:
+                raise ValueError(f"Snapshot results are not ordered by ID at {media.id}")
+            columns["ids"].append(media.id)
+            columns["genres"].append(genre_mask(media.genre_ids))
+            columns["popularities"].append(media.popularity)
+            columns["vote_averages"].append(media.vote_average)
+            columns["vote_counts"].append(media.vote_count)
+            columns["years"].append(release_year(media))
+            columns["languages"].append(media.original_language.encode())
+
+            fields = {key: value for key, value in result.items() if key not in COLUMN_FIELDS}
+            heap.write(json.dumps(fields, separators=(",", ":")).encode())
+            heap_offsets.append(heap.tell())
+
+        count = len(heap_offsets) - 1
+        offsets, heap_index_offset = _layout(count)
+        temporary_path = path.with_name(path.name + ".tmp")
+        with open(temporary_path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, MEDIA_TYPE_CODES[media_type], 0, count))
+            for name, dtype in COLUMNS:
+                file.write(b"\0" * (offsets[name] - file.tell()))
+                file.write(np.asarray(columns[name], dtype=dtype).tobytes())
+            file.write(b"\0" * (heap_index_offset - file.tell()))
+            file.write(np.asarray(heap_offsets, dtype="<u8").tobytes())
+            heap.seek(0)
+            shutil.copyfileobj(heap, file)
+        os.replace(temporary_path, path)
+
+
+def write_store_snapshots(store: CatalogStore, catalog_file: Path):
+    """
+    Write the snapshots of all media types of a catalog store next to its catalog file.
+
+    Parameters
+    ----------
+    store : CatalogStore
+        The store to read.
+    catalog_file : Path
+        Path of the catalog file.
+    """
+    for media_type in MODELS:
+        write_snapshot(snapshot_path(catalog_file, media_type), media_type, store.iter_results(media_type))
+
+
+class SnapshotIndex:
+    """
+    Read-only catalog columns backed by a memory-mapped snapshot file.
+
+    The columns are NumPy views into the mapping, so opening a snapshot costs no parsing
+    and every process mapping the same file shares its pages in the OS page cache.
+    Results are only materialized into Movie or TVShow objects when they are requested.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Parameters
+        ----------
+        path : Path
+            Path of the snapshot file.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a snapshot of a supported version.
+        """
+        with open(path, "rb") as file:
+            self._mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, media_type_code, _, count = HEADER.unpack_from(self._mapping)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a catalog snapshot of version {VERSION}")
+
+        self.path = path
+        self.media_type = next(m for m, code in MEDIA_TYPE_CODES.items() if code == media_type_code)
+        self._model = MODELS[self.media_type]
+        offsets, heap_index_offset = _layout(count)
+        for name, dtype in COLUMNS:
+            setattr(self, name, np.frombuffer(self._mapping, dtype=dtype, count=count, offset=offsets[name]))
+        self._heap_offsets = np.frombuffer(self._mapping, dtype="<u8", count=count + 1, offset=heap_index_offset)
+        self._heap_start = heap_index_offset + (count + 1) * 8
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row_of(self, media_id: int) -> int | None:
+        """
+        Find the row of a result, using the ID order of the snapshot.
+
+        Parameters
+        ----------
+        media_id : int
+            The result ID.
+
+        Returns
+        -------
+        int | None
+            The row, or None if the snapshot does not hold the result.
+        """
+        row = int(np.searchsorted(self.ids, media_id))
+        return row if row < len(self.ids) and self.ids[row] == media_id else None
+
+    def item(self, row: int) -> Movie | TVShow:
+        """
+        Materialize the result of a row.
+
+        Parameters
+        ----------
+        row : int
+            The row.
+
+        Returns
+        -------
+        Movie | TVShow
+            The result.
+        """
+        start = self._heap_start + int(self._heap_offsets[row])
+        end = self._heap_start + int(self._heap_offsets[row + 1])
+        fields = json.loads(self._mapping[start:end])
+        return self._model(
+            **fields,
+            id=int(self.ids[row]),
+            # TMDB rounds both to 3 decimals, which drops the float32 noise
+            popularity=round(float(self.popularities[row]), 3),
+            vote_average=round(float(self.vote_averages[row]), 3),
+            vote_count=int(self.vote_counts[row]),
+            original_language=self.languages[row].decode(),
+        )
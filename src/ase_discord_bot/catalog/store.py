@@ -0,0 +1,258 @@
+import json
+import sqlite3
+import threading
+import zlib
+
+from collections.abc import Iterable, Iterator
+from datetime import date
+from pathlib import Path
+from typing import Any, Optional
+
+
+class CatalogStore:
+    """
+    Persistent catalog of titles stored in a SQLite database in WAL mode.
+
+    Every title is stored as its zlib-compressed discover result, keyed by media type
+    and ID, with its popularity in a column of its own so the daily export can refresh
+    it without rewriting the result. The store also keeps a checkpoint per ingested
+    export file, written in the same transaction as the titles, so an interrupted
+    ingestion resumes after the last written batch, and a watermark per media type
+    up to which the TMDB change feed has been applied.
+
+    The methods block on disk I/O and are meant to be run in a worker thread,
+    e.g. with asyncio.to_thread, so a lock serializes access to the shared connection.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Parameters
+        ----------
+        path : Path
+            Path of the SQLite database file, parent directories are created as needed.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS titles ("
+                "media_type TEXT NOT NULL, id INTEGER NOT NULL, popularity REAL NOT NULL, "
+                "result BLOB NOT NULL, PRIMARY KEY (media_type, id)) WITHOUT ROWID"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints (export TEXT PRIMARY KEY, line INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS watermarks (media_type TEXT PRIMARY KEY, until TEXT NOT NULL)"
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def count(self, media_type: str) -> int:
+        """
+        Number of stored titles of a media type.
+
+        Parameters
+        ----------
+        media_type : str
+            Either "movie" or "tv".
+
+        Returns
+        -------
+        int
+            The number of titles.
+        """
+        with self._lock:
+            query = "SELECT COUNT(*) FROM titles WHERE media_type = ?"
+            return self._connect().execute(query, (media_type,)).fetchone()[0]
+
+    def existing_ids(self, media_type: str, ids: Iterable[int]) -> set[int]:
+        """
+        Find which of the given titles are already stored.
+
+        Parameters
+        ----------
+        media_type : str
+            Either "movie" or "tv".
+        ids : Iterable[int]
+            The title IDs to look up.
+
+        Returns
+        -------
+        set[int]
+            The stored IDs among them.
+        """
+        ids = list(ids)
+        if not ids:
+            return set()
+        with self._lock:
+            placeholders = ", ".join("?" * len(ids))
+            rows = self._connect().execute(
+                f"SELECT id FROM titles WHERE media_type = ? AND id IN ({placeholders})", (media_type, *ids)
+            )
+            return {row[0] for row in rows}
+
+    def checkpoint(self, export: str) -> int:
+        """
+        Number of lines of an export file that have already been ingested.
+
+        Parameters
+        ----------
+        export : str
+            Name of the export file.
+
+        Returns
+        -------
+        int
+            The number of ingested lines, 0 if the export is new.
+        """
+        with self._lock:
+            row = self._connect().execute("SELECT line FROM checkpoints WHERE export = ?", (export,)).fetchone()
+            return row[0] if row else 0
+
+    def write_batch(self, media_type: str, results: Iterable[dict[str, Any]],
+                    popularities: Iterable[tuple[int, float]], export: str, line: int):
+        """
+        Store a batch of titles and advance the checkpoint of the export in one transaction.
+
+        Parameters
+        ----------
+        media_type : str
+            Either "movie" or "tv".
+        results : Iterable[dict[str, Any]]
+            Discover results of new or changed titles, replacing stored ones.
+        popularities : Iterable[tuple[int, float]]
+            IDs and current popularity of stored titles that are otherwise unchanged.
+        export : str
+            Name of the export file the batch was read from.
+        line : int
+            Number of lines of the export file ingested after this batch.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO titles (media_type, id, popularity, result) VALUES (?, ?, ?, ?)",
+                    [_title_row(media_type, result) for result in results],
+                )
+                connection.executemany(
+                    "UPDATE titles SET popularity = ? WHERE media_type = ? AND id = ?",
+                    [(popularity, media_type, title_id) for title_id, popularity in popularities],
+                )
+                connection.execute("INSERT OR REPLACE INTO checkpoints (export, line) VALUES (?, ?)", (export, line))
+
+    def apply_changes(self, media_type: str, results: Iterable[dict[str, Any]], removed_ids: Iterable[int]):
+        """
+        Replace changed titles and remove deleted ones in one transaction.
+
+        Parameters
+        ----------
+        media_type : str
+            Either "movie" or "tv".
+        results : Iterable[dict[str, Any]]
+            Current discover results of the changed titles.
+        removed_ids : Iterable[int]
+            IDs of titles that no longer belong in the catalog.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO titles (media_type, id, popularity, result) VALUES (?, ?, ?, ?)",
+                    [_title_row(media_type, result) for result in results],
+                )
+                connection.executemany(
+                    "DELETE FROM titles WHERE media_type = ? AND id = ?",
+                    [(media_type, title_id) for title_id in removed_ids],
+                )
+
+    def watermark(self, media_type: str) -> Optional[date]:
+        """
+        Date up to which the change feed of a media type has been applied.
+
+        Parameters
+        ----------
+        media_type : str
+            Either "movie" or "tv".
+
+        Returns
+        -------
+        Optional[date]
+            The watermark, or None if no changes have been applied yet.
+        """
+        with self._lock:
+            query = "SELECT until FROM watermarks WHERE media_type = ?"
+            row = self._connect().execute(query, (media_type,)).fetchone()
+            return date.fromisoformat(row[0]) if row else None
+
+    def set_watermark(self, media_type: str, until: date):
+        """
+        Record the date up to which the change feed of a media type has been applied.
+
+        Parameters
+        ----------
+        media_type : str
+            Either "movie" or "tv".
+        until : date
+            The new watermark.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO watermarks (media_type, until) VALUES (?, ?)",
+                    (media_type, until.isoformat()),
+                )
+
+    def iter_results(self, media_type: str) -> Iterator[dict[str, Any]]:
+        """
+        Stream all stored discover results of a media type, with their current popularity.
+
+        Parameters
+        ----------
+        media_type : str
+            Either "movie" or "tv".
+
+        Returns
+        -------
+        Iterator[dict[str, Any]]
+            The results in ID order.
+        """
+        last_id = -1
+        while True:
+            # Read in chunks, so the lock is not held while the caller processes the results
+            with self._lock:
+                rows = self._connect().execute(
+                    "SELECT id, popularity, result FROM titles WHERE media_type = ? AND id > ? ORDER BY id LIMIT 1000",
+                    (media_type, last_id),
+                ).fetchall()
+            if not rows:
+                return
+            for _, popularity, result in rows:
+                yield {**json.loads(zlib.decompress(result)), "popularity": popularity}
+            last_id = rows[-1][0]
+
+    def close(self):
+        """
+        Close the database connection, if it is open.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def _title_row(media_type: str, result: dict[str, Any]) -> tuple[str, int, float, bytes]:
+    """
+    Row of the titles table holding a discover result.
+    """
+    compressed = zlib.compress(json.dumps(result, separators=(",", ":")).encode())
+    return media_type, result["id"], result["popularity"], compressed
@@ -22,6 +22,28 @@ def setup_logger():
     coloredlogs.install(level='INFO', fmt=fmt)
 
 
+class FetchStrategy(str, Enum):
+    """
+    Enum of the ways recommendations are fetched from TMDB.
+
+    ALL fetches every page chosen by the page planner, SAMPLE only fetches the pages
+    containing the randomly picked results.
+    """
+    ALL = "all"
+    SAMPLE = "sample"
+
+
+class SelectionStrategy(str, Enum):
+    """
+    Enum of the ways recommendations are picked from the fetched results.
+
+    WEIGHTED samples by the selection weights, DIVERSE additionally avoids picks that share
+    genres, release decade and language.
+    """
+    WEIGHTED = "weighted"
+    DIVERSE = "diverse"
+
+
 class EnvVar(str, Enum):
     """
     Enum of all environment variable names.
@@ -35,7 +57,46 @@ class EnvVar(str, Enum):
     MODE = "MODE"
     OPEN_ROUTER_API_KEY = "OPEN_ROUTER_API_KEY"
     MAX_API_PAGES_COUNT = "MAX_API_PAGES_COUNT"
+    MAX_CONCURRENT_API_REQUESTS = "MAX_CONCURRENT_API_REQUESTS"
     MIN_VOTE_COUNT = "MIN_VOTE_COUNT"
+    FETCH_STRATEGY = "FETCH_STRATEGY"
+    API_CACHE_TTL = "API_CACHE_TTL"
+    API_CACHE_MAX_ENTRIES = "API_CACHE_MAX_ENTRIES"
+    API_CACHE_MAX_BYTES = "API_CACHE_MAX_BYTES"
+    DISK_CACHE_DIR = "DISK_CACHE_DIR"
+    DISK_CACHE_TTL = "DISK_CACHE_TTL"
+    DISK_CACHE_MAX_BYTES = "DISK_CACHE_MAX_BYTES"
+    TMDB_RATE_LIMIT = "TMDB_RATE_LIMIT"
+    TMDB_RATE_BURST = "TMDB_RATE_BURST"
+    TMDB_MAX_RETRIES = "TMDB_MAX_RETRIES"
+    TMDB_COMMAND_DEADLINE = "TMDB_COMMAND_DEADLINE"
+    TMDB_BREAKER_FAILURE_THRESHOLD = "TMDB_BREAKER_FAILURE_THRESHOLD"
+    TMDB_BREAKER_RESET_TIMEOUT = "TMDB_BREAKER_RESET_TIMEOUT"
+    TMDB_LATENCY_BUDGET_MS = "TMDB_LATENCY_BUDGET_MS"
+    WARMUP_LANGUAGES = "WARMUP_LANGUAGES"
+    WARMUP_INTERVAL = "WARMUP_INTERVAL"
+    WARMUP_REQUEST_BUDGET = "WARMUP_REQUEST_BUDGET"
+    CATALOG_TTL = "CATALOG_TTL"
+    CATALOG_FILE = "CATALOG_FILE"
+    CATALOG_REFRESH_INTERVAL = "CATALOG_REFRESH_INTERVAL"
+    SELECTION_VOTE_AVERAGE_EXPONENT = "SELECTION_VOTE_AVERAGE_EXPONENT"
+    SELECTION_VOTE_COUNT_EXPONENT = "SELECTION_VOTE_COUNT_EXPONENT"
+    SELECTION_POPULARITY_EXPONENT = "SELECTION_POPULARITY_EXPONENT"
+    SELECTION_STRATEGY = "SELECTION_STRATEGY"
+    SELECTION_DIVERSITY = "SELECTION_DIVERSITY"
+    HISTORY_SIZE = "HISTORY_SIZE"
+    HISTORY_TTL = "HISTORY_TTL"
+    HISTORY_MAX_USERS = "HISTORY_MAX_USERS"
+    HISTORY_FLUSH_INTERVAL = "HISTORY_FLUSH_INTERVAL"
+    CANDIDATE_POOL_TTL = "CANDIDATE_POOL_TTL"
+    CANDIDATE_POOL_MAX_ENTRIES = "CANDIDATE_POOL_MAX_ENTRIES"
+    TARGET_POOL_SIZE = "TARGET_POOL_SIZE"
+    PAGE_LATENCY_BUDGET_MS = "PAGE_LATENCY_BUDGET_MS"
+    MAX_CONCURRENT_SUMMARIES = "MAX_CONCURRENT_SUMMARIES"
+    SUMMARY_BATCH_SIZE = "SUMMARY_BATCH_SIZE"
+    SUMMARY_EDIT_INTERVAL_MS = "SUMMARY_EDIT_INTERVAL_MS"
+    SUMMARY_CACHE_TTL = "SUMMARY_CACHE_TTL"
+    SUMMARY_CACHE_MAX_BYTES = "SUMMARY_CACHE_MAX_BYTES"
 
 
 REQUIRED_ENV_VARS = [
@@ -63,25 +124,83 @@ def check_and_load_env_vars():
         logger.error("DISCORD_GUILD_ID must be a valid guild id")
         sys.exit(1)
 
-    if max_api := os.getenv(EnvVar.MAX_API_PAGES_COUNT):
-        if not max_api.isdigit():
-            logger.error(f"{EnvVar.MAX_API_PAGES_COUNT} must be an integer")
-            sys.exit(1)
-        if int(max_api) < 1:
-            logger.error(f"{EnvVar.MAX_API_PAGES_COUNT} must be a positive integer")
-            sys.exit(1)
+    _check_int_env_var(EnvVar.MAX_API_PAGES_COUNT, 1)
+    _check_int_env_var(EnvVar.MAX_CONCURRENT_API_REQUESTS, 1)
+    _check_int_env_var(EnvVar.MIN_VOTE_COUNT, 0)
+    _check_int_env_var(EnvVar.API_CACHE_TTL, 0)
+    _check_int_env_var(EnvVar.API_CACHE_MAX_ENTRIES, 1)
+    _check_int_env_var(EnvVar.API_CACHE_MAX_BYTES, 1)
+    _check_int_env_var(EnvVar.DISK_CACHE_TTL, 0)
+    _check_int_env_var(EnvVar.DISK_CACHE_MAX_BYTES, 1)
+    _check_int_env_var(EnvVar.TMDB_RATE_LIMIT, 1)
+    _check_int_env_var(EnvVar.TMDB_RATE_BURST, 1)
+    _check_int_env_var(EnvVar.TMDB_MAX_RETRIES, 0)
+    _check_int_env_var(EnvVar.TMDB_COMMAND_DEADLINE, 1)
+    _check_int_env_var(EnvVar.TMDB_BREAKER_FAILURE_THRESHOLD, 1)
+    _check_int_env_var(EnvVar.TMDB_BREAKER_RESET_TIMEOUT, 1)
+    _check_int_env_var(EnvVar.TMDB_LATENCY_BUDGET_MS, 1)
+    _check_int_env_var(EnvVar.WARMUP_INTERVAL, 0)
+    _check_int_env_var(EnvVar.WARMUP_REQUEST_BUDGET, 0)
+    _check_int_env_var(EnvVar.CATALOG_TTL, 0)
+    _check_int_env_var(EnvVar.CATALOG_REFRESH_INTERVAL, 0)
+    _check_int_env_var(EnvVar.SELECTION_VOTE_AVERAGE_EXPONENT, 0)
+    _check_int_env_var(EnvVar.SELECTION_VOTE_COUNT_EXPONENT, 0)
+    _check_int_env_var(EnvVar.SELECTION_POPULARITY_EXPONENT, 0)
+    _check_int_env_var(EnvVar.SELECTION_DIVERSITY, 0)
+    _check_int_env_var(EnvVar.HISTORY_SIZE, 0)
+    _check_int_env_var(EnvVar.HISTORY_TTL, 0)
+    _check_int_env_var(EnvVar.HISTORY_MAX_USERS, 1)
+    _check_int_env_var(EnvVar.HISTORY_FLUSH_INTERVAL, 1)
+    _check_int_env_var(EnvVar.CANDIDATE_POOL_TTL, 0)
+    _check_int_env_var(EnvVar.CANDIDATE_POOL_MAX_ENTRIES, 1)
+    _check_int_env_var(EnvVar.TARGET_POOL_SIZE, 1)
+    _check_int_env_var(EnvVar.PAGE_LATENCY_BUDGET_MS, 1)
+    _check_int_env_var(EnvVar.MAX_CONCURRENT_SUMMARIES, 1)
+    _check_int_env_var(EnvVar.SUMMARY_BATCH_SIZE, 1)
+    _check_int_env_var(EnvVar.SUMMARY_EDIT_INTERVAL_MS, 0)
+    _check_int_env_var(EnvVar.SUMMARY_CACHE_TTL, 0)
+    _check_int_env_var(EnvVar.SUMMARY_CACHE_MAX_BYTES, 1)
 
-    if min_votes := os.getenv(EnvVar.MIN_VOTE_COUNT):
-        if not min_votes.isdigit():
-            logger.error(f"{EnvVar.MIN_VOTE_COUNT} must be an integer")
+    if (diversity := os.getenv(EnvVar.SELECTION_DIVERSITY)) and int(diversity) >= 100:
+        logger.error(f"{EnvVar.SELECTION_DIVERSITY} must be a percentage below 100")
+        sys.exit(1)
+
+    if (pool_ttl := os.getenv(EnvVar.CANDIDATE_POOL_TTL)) and int(pool_ttl) > 15 * 60:
+        logger.error(f"{EnvVar.CANDIDATE_POOL_TTL} must be at most 900 seconds")
+        sys.exit(1)
+
+    if fetch_strategy := os.getenv(EnvVar.FETCH_STRATEGY):
+        if fetch_strategy.lower() not in [strategy.value for strategy in FetchStrategy]:
+            logger.error(f"{EnvVar.FETCH_STRATEGY} must be one of: {', '.join(s.value for s in FetchStrategy)}")
             sys.exit(1)
-        if int(min_votes) < 0:
-            logger.error(f"{EnvVar.MIN_VOTE_COUNT} must be a natural number")
+
+    if selection_strategy := os.getenv(EnvVar.SELECTION_STRATEGY):
+        if selection_strategy.lower() not in [strategy.value for strategy in SelectionStrategy]:
+            logger.error(f"{EnvVar.SELECTION_STRATEGY} must be one of: {', '.join(s.value for s in SelectionStrategy)}")
             sys.exit(1)
 
     logger.info("Environment validated successfully")
 
 
+def _check_int_env_var(var: EnvVar, minimum: int):
+    """
+    Validate an optional integer environment variable, if it is set.
+    Logs and exits the program if the value is not an integer of at least `minimum`.
+    """
+    if value := os.getenv(var):
+        if not value.isdigit():
+            logger.error(f"{var} must be an integer")
+            sys.exit(1)
+        if int(value) < minimum:
+            if minimum == 0:
+                logger.error(f"{var} must be a natural number")
+            elif minimum == 1:
+                logger.error(f"{var} must be a positive integer")
+            else:
+                logger.error(f"{var} must be at least {minimum}")
+            sys.exit(1)
+
+
 def load_env_file():
     """
     Load the appropriate environment file depending on the MODE('.env.dev' or '.env.prod').
@@ -108,12 +227,62 @@ class Config:
         self.DISCORD_BANNER = str(os.getenv(EnvVar.DISCORD_BANNER, ROOT_PATH / "assets/banner.jpg"))
         self.DISCORD_USERNAME = str(os.getenv(EnvVar.DISCORD_USERNAME, "DHBW-ASE"))
         self.MAX_API_PAGES_COUNT = int(os.getenv(EnvVar.MAX_API_PAGES_COUNT, 15))
+        self.MAX_CONCURRENT_API_REQUESTS = int(os.getenv(EnvVar.MAX_CONCURRENT_API_REQUESTS, 5))
         self.MIN_VOTE_COUNT = int(os.getenv(EnvVar.MIN_VOTE_COUNT, 100))
+        self.FETCH_STRATEGY = FetchStrategy(os.getenv(EnvVar.FETCH_STRATEGY, FetchStrategy.ALL).lower())
+        self.API_CACHE_TTL = int(os.getenv(EnvVar.API_CACHE_TTL, 3600))
+        self.API_CACHE_MAX_ENTRIES = int(os.getenv(EnvVar.API_CACHE_MAX_ENTRIES, 2000))
+        self.API_CACHE_MAX_BYTES = int(os.getenv(EnvVar.API_CACHE_MAX_BYTES, 64 * 1024 * 1024))
+        self.DISK_CACHE_DIR = str(os.getenv(EnvVar.DISK_CACHE_DIR, ROOT_PATH / ".cache"))
+        self.DISK_CACHE_TTL = int(os.getenv(EnvVar.DISK_CACHE_TTL, 24 * 60 * 60))
+        self.DISK_CACHE_MAX_BYTES = int(os.getenv(EnvVar.DISK_CACHE_MAX_BYTES, 256 * 1024 * 1024))
+        self.TMDB_RATE_LIMIT = int(os.getenv(EnvVar.TMDB_RATE_LIMIT, 40))
+        self.TMDB_RATE_BURST = int(os.getenv(EnvVar.TMDB_RATE_BURST, 20))
+        self.TMDB_MAX_RETRIES = int(os.getenv(EnvVar.TMDB_MAX_RETRIES, 3))
+        self.TMDB_COMMAND_DEADLINE = int(os.getenv(EnvVar.TMDB_COMMAND_DEADLINE, 10))
+        self.TMDB_BREAKER_FAILURE_THRESHOLD = int(os.getenv(EnvVar.TMDB_BREAKER_FAILURE_THRESHOLD, 5))
+        self.TMDB_BREAKER_RESET_TIMEOUT = int(os.getenv(EnvVar.TMDB_BREAKER_RESET_TIMEOUT, 30))
+        self.TMDB_LATENCY_BUDGET_MS = int(os.getenv(EnvVar.TMDB_LATENCY_BUDGET_MS, 3000))
+        self.WARMUP_LANGUAGES = [language.strip() for language in os.getenv(EnvVar.WARMUP_LANGUAGES, "en").split(",")
+                                 if language.strip()]
+        self.WARMUP_INTERVAL = int(os.getenv(EnvVar.WARMUP_INTERVAL, 6 * 60 * 60))
+        self.WARMUP_REQUEST_BUDGET = int(os.getenv(EnvVar.WARMUP_REQUEST_BUDGET, 600))
+        self.CATALOG_TTL = int(os.getenv(EnvVar.CATALOG_TTL, 24 * 60 * 60))
+        self.CATALOG_FILE = str(os.getenv(EnvVar.CATALOG_FILE, Path(self.DISK_CACHE_DIR) / "catalog.sqlite3"))
+        self.CATALOG_REFRESH_INTERVAL = int(os.getenv(EnvVar.CATALOG_REFRESH_INTERVAL, 60 * 60))
+        self.SELECTION_VOTE_AVERAGE_EXPONENT = int(os.getenv(EnvVar.SELECTION_VOTE_AVERAGE_EXPONENT, 2))
+        self.SELECTION_VOTE_COUNT_EXPONENT = int(os.getenv(EnvVar.SELECTION_VOTE_COUNT_EXPONENT, 1))
+        self.SELECTION_POPULARITY_EXPONENT = int(os.getenv(EnvVar.SELECTION_POPULARITY_EXPONENT, 1))
+        self.SELECTION_STRATEGY = SelectionStrategy(
+            os.getenv(EnvVar.SELECTION_STRATEGY, SelectionStrategy.WEIGHTED).lower())
+        self.SELECTION_DIVERSITY = int(os.getenv(EnvVar.SELECTION_DIVERSITY, 50))
+        self.HISTORY_SIZE = int(os.getenv(EnvVar.HISTORY_SIZE, 100))
+        self.HISTORY_TTL = int(os.getenv(EnvVar.HISTORY_TTL, 7 * 24 * 60 * 60))
+        self.HISTORY_MAX_USERS = int(os.getenv(EnvVar.HISTORY_MAX_USERS, 10000))
+        self.HISTORY_FLUSH_INTERVAL = int(os.getenv(EnvVar.HISTORY_FLUSH_INTERVAL, 30))
+        self.CANDIDATE_POOL_TTL = int(os.getenv(EnvVar.CANDIDATE_POOL_TTL, 15 * 60))
+        self.CANDIDATE_POOL_MAX_ENTRIES = int(os.getenv(EnvVar.CANDIDATE_POOL_MAX_ENTRIES, 1000))
+        self.TARGET_POOL_SIZE = int(os.getenv(EnvVar.TARGET_POOL_SIZE, 100))
+        self.PAGE_LATENCY_BUDGET_MS = int(os.getenv(EnvVar.PAGE_LATENCY_BUDGET_MS, 2000))
+        self.MAX_CONCURRENT_SUMMARIES = int(os.getenv(EnvVar.MAX_CONCURRENT_SUMMARIES, 3))
+        self.SUMMARY_BATCH_SIZE = int(os.getenv(EnvVar.SUMMARY_BATCH_SIZE, 3))
+        self.SUMMARY_EDIT_INTERVAL_MS = int(os.getenv(EnvVar.SUMMARY_EDIT_INTERVAL_MS, 0))
+        self.SUMMARY_CACHE_TTL = int(os.getenv(EnvVar.SUMMARY_CACHE_TTL, 30 * 24 * 60 * 60))
+        self.SUMMARY_CACHE_MAX_BYTES = int(os.getenv(EnvVar.SUMMARY_CACHE_MAX_BYTES, 16 * 1024 * 1024))
 
         self.TMDB_AUTH_HEADERS = {"Authorization": f"Bearer {self.TMDB_READ_ACCESS_TOKEN}"}
         self.TMDB_API_BASE_URL = URL("https://api.themoviedb.org/3")
         self.TMDB_IMAGES_BASE_URL = URL("https://image.tmdb.org/t/p/w500/")
+        self.TMDB_REQUEST_TIMEOUT = 10
+        self.TMDB_CONNECTION_POOL_SIZE = 10
+        self.TMDB_PAGE_SIZE = 20
+        self.TMDB_RETRY_BACKOFF = 0.5
+        self.WARMUP_REQUESTS_PER_SECOND = 2
         self.OPEN_ROUTER_BASE_URL = URL("https://openrouter.ai/api/v1")
+        self.OPEN_ROUTER_MODEL = "google/gemini-2.0-flash-thinking-exp:free"
+        self.OPEN_ROUTER_REQUEST_TIMEOUT = 15
+        self.OPEN_ROUTER_MAX_RETRIES = 1
         self.DISCORD_CHOICES_SIZE_LIMIT = 25
+        self.RECOMMENDATION_COUNT = 3
         self.ABSOLUTE_MIN_YEAR = 1874
         self.ABSOLUTE_MAX_YEAR = date.today().year
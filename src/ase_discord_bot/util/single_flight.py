@@ -0,0 +1,139 @@
+import asyncio
+
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesce concurrent calls with the same key into a single upstream call.
+
+    The first caller for a key starts the call as a task, every concurrent caller with
+    the same key awaits that task. Its result or exception is delivered to all of them.
+    Waiters are shielded from each other: cancelling one waiter never cancels the shared
+    task. Once the task finishes, the key is released and the next call starts a new one.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `call`, or join the call already in flight for `key`.
+
+        Parameters
+        ----------
+        key : Hashable
+            Identifies calls that produce the same result.
+        call : Callable[[], Awaitable[T]]
+            Starts the upstream call, only invoked if none is in flight for `key`.
+
+        Returns
+        -------
+        T
+            The result of the shared call.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+        return await asyncio.shield(task)
+
+    def _release(self, key: Hashable, task: asyncio.Task[T]):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+class _SharedStream(Generic[T]):
+    """
+    State of one upstream stream shared by the callers of a StreamFlight.
+    """
+
+    def __init__(self):
+        self.condition = asyncio.Condition()
+        self.version = 0
+        self.value: Optional[T] = None
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class StreamFlight(Generic[T]):
+    """
+    Coalesce concurrent streams with the same key into a single upstream stream.
+
+    Every value of a stream supersedes the ones before, like the text generated so far,
+    so callers only need the latest one. The first caller for a key starts the stream as
+    a task, every concurrent caller with the same key follows it: a caller joining late
+    starts at the latest value and a slow caller skips the values it missed. An exception
+    of the stream is raised to all of them. Cancelling a caller never cancels the stream.
+    Once the stream ends, the key is released and the next call starts a new one.
+    """
+
+    def __init__(self):
+        self._streams: dict[Hashable, _SharedStream[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    async def stream(self, key: Hashable, start: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        Follow the stream returned by `start`, or join the stream already in flight for `key`.
+
+        Parameters
+        ----------
+        key : Hashable
+            Identifies streams that produce the same values.
+        start : Callable[[], AsyncIterator[T]]
+            Starts the upstream stream, only invoked if none is in flight for `key`.
+
+        Yields
+        ------
+        T
+            The latest value of the shared stream, every value at most once.
+        """
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = self._streams[key] = _SharedStream()
+            shared.task = asyncio.ensure_future(self._produce(key, shared, start()))
+
+        seen = 0
+        while True:
+            async with shared.condition:
+                await shared.condition.wait_for(lambda: shared.version > seen or shared.done)
+                version, value = shared.version, shared.value
+            if version > seen:
+                seen = version
+                yield value
+            elif shared.error is not None:
+                raise shared.error
+            else:
+                return
+
+    async def _produce(self, key: Hashable, shared: _SharedStream[T], values: AsyncIterator[T]):
+        """
+        Publish the values of the upstream stream to the callers following it.
+        """
+        try:
+            async for value in values:
+                async with shared.condition:
+                    shared.value = value
+                    shared.version += 1
+                    shared.condition.notify_all()
+        except Exception as error:
+            shared.error = error
+        finally:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+            async with shared.condition:
+                shared.done = True
+                shared.condition.notify_all()
@@ -1,36 +1,45 @@
+from collections.abc import Sequence
 from typing import Any, TypeGuard
-from ase_discord_bot.api_util.model.responses import Movie, TVShow
+from ase_discord_bot.api_util.model.responses import LazyResults, Movie, TVShow
 
 
-def is_list_of_movies(lst: list[Any]) -> TypeGuard[list[Movie]]:
+def is_list_of_movies(lst: Sequence[Any]) -> TypeGuard[Sequence[Movie]]:
     """
     Check if the list contains only Movie instances.
 
+    Lazy results are checked by their model, so none of them is validated.
+
     Parameters
     ----------
-    lst : list[Any]
+    lst : Sequence[Any]
         The list to check.
 
     Returns
     -------
-    TypeGuard[list[Movie]]
+    TypeGuard[Sequence[Movie]]
         True if all elements in the list are instances of Movie, otherwise False.
     """
+    if isinstance(lst, LazyResults):
+        return bool(lst) and lst.model is Movie
     return bool(lst) and all(isinstance(x, Movie) for x in lst)
 
 
-def is_list_of_tvshows(lst: list[Any]) -> TypeGuard[list[TVShow]]:
+def is_list_of_tvshows(lst: Sequence[Any]) -> TypeGuard[Sequence[TVShow]]:
     """
     Check if the list contains only TVShow instances.
 
+    Lazy results are checked by their model, so none of them is validated.
+
     Parameters
     ----------
-    lst : list[Any]
+    lst : Sequence[Any]
         The list to check.
 
     Returns
     -------
-    TypeGuard[list[TVShow]]
+    TypeGuard[Sequence[TVShow]]
         True if all elements in the list are instances of TVShow, otherwise False.
     """
+    if isinstance(lst, LazyResults):
+        return bool(lst) and lst.model is TVShow
     return bool(lst) and all(isinstance(x, TVShow) for x in lst)
@@ -0,0 +1,29 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from ase_discord_bot.api_util import tmdb_client
+
+
+@pytest.fixture
+def tmdb_routes():
+    """
+    Handlers of the local TMDB stand-in by path, overridden by the test modules using `client`.
+    """
+    return {}
+
+
+@pytest_asyncio.fixture
+async def client(tmdb_routes):
+    """
+    TMDB client talking to a local server that serves `tmdb_routes`.
+    """
+    app = web.Application()
+    for path, handler in tmdb_routes.items():
+        app.router.add_get(path, handler)
+    server = TestServer(app)
+    await server.start_server()
+    client = tmdb_client.TMDBClient(server.make_url(""), {}, 5, 4)
+    yield client
+    await client.close()
+    await server.close()
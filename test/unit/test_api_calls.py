@@ -0,0 +1,527 @@
+import asyncio
+import json
+import time
+import pytest
+import pytest_asyncio
+from pydantic import ValidationError
+from aiohttp import web
+from ase_discord_bot import config_registry
+from ase_discord_bot.api_util import api_calls, cache, disk_cache, page_planner, rate_limit, tmdb_client
+from ase_discord_bot.api_util.circuit_breaker import CircuitBreaker
+from ase_discord_bot.api_util.rate_limit import TokenBucket
+from ase_discord_bot.api_util.model.filters import MovieFilter, TVShowFilter
+from ase_discord_bot.api_util.model.languages import Language
+from ase_discord_bot.api_util.model.responses import LazyResults, Movie, TVShow
+from ase_discord_bot.catalog import catalog
+from ase_discord_bot.config import Config
+
+TOTAL_PAGES = 4
+
+
+@pytest.fixture(autouse=True)
+def set_required_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("TMDB_READ_ACCESS_TOKEN", "dummy_tmdb")
+    monkeypatch.setenv("DISCORD_TOKEN", "dummy_discord")
+    monkeypatch.setenv("DISCORD_GUILD_ID", "1234")
+    monkeypatch.setenv("OPEN_ROUTER_API_KEY", "dummy_open")
+    monkeypatch.setenv("MAX_API_PAGES_COUNT", "3")
+    monkeypatch.setenv("MAX_CONCURRENT_API_REQUESTS", "2")
+    monkeypatch.setenv("MIN_VOTE_COUNT", "100")
+    monkeypatch.setenv("DISK_CACHE_DIR", str(tmp_path))
+    # Exercise the page caches, the catalog is enabled by the tests covering it
+    monkeypatch.setenv("CATALOG_TTL", "0")
+
+
+@pytest.fixture
+def config_instance():
+    conf = Config()
+    config_registry.set_config(conf)
+    cache.set_page_cache(None)
+    disk_cache.set_disk_cache(None)
+    catalog.set_catalog(None)
+    page_planner.set_page_planner(None)
+    yield conf
+    disk_cache.close_disk_cache()
+
+
+def movie_dict(movie_id):
+    return {
+        "adult": False,
+        "backdrop_path": None,
+        "genre_ids": [27],
+        "id": movie_id,
+        "original_language": "en",
+        "overview": f"Overview {movie_id}",
+        "popularity": 1.0,
+        "poster_path": None,
+        "vote_average": 7.0,
+        "vote_count": 200,
+        "original_title": f"Movie {movie_id}",
+        "release_date": "2000-01-01",
+        "title": f"Movie {movie_id}",
+        "video": False,
+    }
+
+
+def tvshow_dict(tvshow_id):
+    return {
+        "adult": False,
+        "backdrop_path": None,
+        "genre_ids": [18],
+        "id": tvshow_id,
+        "original_language": "en",
+        "overview": f"Overview {tvshow_id}",
+        "popularity": 1.0,
+        "poster_path": None,
+        "vote_average": 7.0,
+        "vote_count": 200,
+        "origin_country": ["US"],
+        "original_name": f"Show {tvshow_id}",
+        "first_air_date": "2000-01-01",
+        "name": f"Show {tvshow_id}",
+    }
+
+
+class FakeTMDB:
+    """
+    Local stand-in for the TMDB discover endpoints serving TOTAL_PAGES pages with 2 results each.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.failing_pages = set()
+        self.delay = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rate_limited = 0
+        self.retry_after = "0"
+
+    async def discover(self, request):
+        media_type = request.match_info["media_type"]
+        page = int(request.query.get("page", 1))
+        self.requests.append((media_type, dict(request.query)))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        if self.rate_limited > 0:
+            self.rate_limited -= 1
+            return web.json_response({"status_message": "rate limited"}, status=429,
+                                     headers={"Retry-After": self.retry_after})
+        if page in self.failing_pages:
+            return web.json_response({"status_message": "error"}, status=500)
+        to_dict = movie_dict if media_type == "movie" else tvshow_dict
+        return web.json_response({
+            "page": page,
+            "results": [to_dict(page * 10 + i) for i in range(2)],
+            "total_pages": TOTAL_PAGES,
+            "total_results": TOTAL_PAGES * 2,
+        })
+
+
+@pytest.fixture
+def fake_tmdb():
+    return FakeTMDB()
+
+
+@pytest.fixture
+def tmdb_routes(fake_tmdb):
+    return {"/discover/{media_type}": fake_tmdb.discover}
+
+
+@pytest_asyncio.fixture
+async def client(client, config_instance):
+    tmdb_client.set_client(client)
+    yield client
+    tmdb_client.set_client(None)
+
+
+def test_build_query_movie(config_instance):
+    path, query = api_calls._build_query(MovieFilter(27, min_year=1990, max_year=1999,
+                                                     original_language=Language.ENGLISH))
+    assert path == "discover/movie"
+    assert query["with_genres"] == 27
+    assert query["vote_count.gte"] == 100
+    assert query["primary_release_date.gte"] == "1990-01-01"
+    assert query["primary_release_date.lte"] == "1999-12-31"
+    assert query["with_original_language"] == "en"
+
+
+def test_build_query_tvshow(config_instance):
+    path, query = api_calls._build_query(TVShowFilter(18, year=2005))
+    assert path == "discover/tv"
+    assert query["first_air_date_year"] == 2005
+
+
+def test_build_query_equivalent_filters(config_instance):
+    assert api_calls._build_query(MovieFilter(27, min_year=2005, max_year=2005)) == \
+        api_calls._build_query(MovieFilter(27, year=2005))
+
+
+@pytest.mark.asyncio
+async def test_get_recommended_movie(client, fake_tmdb):
+    movies = await api_calls.get_recommended_movie(MovieFilter(27))
+    assert all(isinstance(movie, Movie) for movie in movies)
+    # MAX_API_PAGES_COUNT caps the 4 available pages at 3
+    assert [movie.id for movie in movies] == [10, 11, 20, 21, 30, 31]
+    assert len(fake_tmdb.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_page_planner_limits_pages_to_target_pool(client, fake_tmdb, config_instance):
+    config_instance.TARGET_POOL_SIZE = 30
+    movies = await api_calls.get_recommended_movie(MovieFilter(27))
+    assert [movie.id for movie in movies] == [10, 11, 20, 21]
+    assert len(fake_tmdb.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_known_filter_pages_requested_at_once(client, fake_tmdb, config_instance):
+    config_instance.MAX_CONCURRENT_API_REQUESTS = 3
+    fake_tmdb.delay = 0.05
+    await api_calls.get_recommended_movie(MovieFilter(27))
+    # Page 1 of an unknown filter is awaited before the others are requested
+    assert fake_tmdb.max_in_flight == 2
+
+    # The totals of a known filter let all its pages be requested at once
+    known_filter = MovieFilter(27, year=2000)
+    page_planner.get_page_planner().plan(api_calls._filter_key(known_filter), TOTAL_PAGES, TOTAL_PAGES * 2)
+    fake_tmdb.max_in_flight = 0
+    await api_calls.get_recommended_movie(known_filter)
+    assert fake_tmdb.max_in_flight == 3
+    assert len(fake_tmdb.requests) == 6
+
+    stats = page_planner.get_page_planner().stats()
+    assert len(stats) == 2
+    filter_stats = next(stats for key, stats in stats.items() if key[0].min_year == 2000)
+    assert filter_stats["plans"] == 2
+    assert filter_stats["total_pages"] == TOTAL_PAGES
+    assert filter_stats["planned_pages"] == 3
+    assert filter_stats["page_latency"] > 0
+
+
+@pytest.mark.asyncio
+async def test_get_recommended_tvshow(client):
+    tvshows = await api_calls.get_recommended_tvshow(TVShowFilter(18))
+    assert all(isinstance(tvshow, TVShow) for tvshow in tvshows)
+    assert len(tvshows) == 6
+
+
+@pytest.mark.asyncio
+async def test_results_validated_on_access(client, monkeypatch):
+    validated = []
+    model_validate = Movie.model_validate
+    monkeypatch.setattr(Movie, "model_validate", lambda raw: validated.append(raw["id"]) or model_validate(raw))
+
+    movies = await api_calls.get_recommended_movie(MovieFilter(27))
+    assert len(movies) == 6
+    assert validated == []
+    assert movies[4].id == 30
+    assert movies[4] is movies[4]
+    assert validated == [30]
+
+
+def test_lazy_results_validate_strictly():
+    results = LazyResults(Movie, [movie_dict(1), {**movie_dict(2), "vote_count": "many"}])
+    assert results[0].id == 1
+    with pytest.raises(ValidationError):
+        results[1]
+    assert results.get(0).id == 1
+    assert results.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_get_recommended_movie_partial_failure(client, fake_tmdb):
+    fake_tmdb.failing_pages = {2}
+    movies = await api_calls.get_recommended_movie(MovieFilter(27))
+    assert [movie.id for movie in movies] == [10, 11, 30, 31]
+
+
+@pytest.mark.asyncio
+async def test_get_recommended_movie_all_failed(client, fake_tmdb):
+    fake_tmdb.failing_pages = {1, 2, 3}
+    assert await api_calls.get_recommended_movie(MovieFilter(27)) == [500]
+
+
+@pytest.mark.asyncio
+async def test_request_pages_bounded_and_ordered(client, fake_tmdb):
+    fake_tmdb.delay = 0.05
+    responses = await api_calls._request_pages(MovieFilter(27), range(1, 6))
+    assert [response.json()["page"] for response in responses] == [1, 2, 3, 4, 5]
+    # MAX_CONCURRENT_API_REQUESTS limits the fan-out
+    assert fake_tmdb.max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_transport_error_status(config_instance):
+    # Nothing listens on this port, so the request fails before any response arrives.
+    client = tmdb_client.TMDBClient(tmdb_client.URL("http://127.0.0.1:1"), {}, 1, 1)
+    response = await client.get("discover/movie", {})
+    await client.close()
+    assert response.status_code == tmdb_client.TRANSPORT_ERROR_STATUS
+
+
+def test_get_client_not_started():
+    tmdb_client.set_client(None)
+    with pytest.raises(RuntimeError):
+        tmdb_client.get_client()
+
+
+@pytest.mark.asyncio
+async def test_sample_recommendation_fetches_only_picked_pages(client, fake_tmdb, monkeypatch):
+    monkeypatch.setenv("FETCH_STRATEGY", "sample")
+    config_registry.set_config(Config())
+    # 3 pages of 2 results are within MAX_API_PAGES_COUNT, so the indices 0..5 are valid
+    monkeypatch.setattr(api_calls.random, "sample", lambda population, k: [5, 0, 3])
+    movies = await api_calls.get_recommended_movie(MovieFilter(27))
+    # The pool holds every result of the fetched pages
+    assert [movie.id for movie in movies] == [10, 11, 20, 21, 30, 31]
+    assert sorted(int(query.get("page", 1)) for _, query in fake_tmdb.requests) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_sample_recommendation_single_page(client, fake_tmdb, monkeypatch):
+    monkeypatch.setenv("FETCH_STRATEGY", "sample")
+    config_registry.set_config(Config())
+    monkeypatch.setattr(api_calls.random, "sample", lambda population, k: [1, 0])
+    tvshows = await api_calls.get_recommended_tvshow(TVShowFilter(18))
+    assert [tvshow.id for tvshow in tvshows] == [10, 11]
+    assert len(fake_tmdb.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_sample_recommendation_cataloged(client, fake_tmdb, monkeypatch):
+    monkeypatch.setenv("FETCH_STRATEGY", "sample")
+    config_registry.set_config(Config())
+    catalog.set_catalog(catalog.Catalog(3600))
+
+    # Page 3 is not among the first pages, so its results are ingested without covering the filter
+    monkeypatch.setattr(api_calls.random, "sample", lambda population, k: [5])
+    await api_calls.get_recommended_movie(MovieFilter(27))
+    assert len(catalog.get_catalog().movies) == 4
+    assert catalog.get_catalog().query(MovieFilter(27), 100, 60) is None
+
+    # The first pages cover it
+    monkeypatch.setattr(api_calls.random, "sample", lambda population, k: [2])
+    await api_calls.get_recommended_movie(MovieFilter(27))
+    requests = len(fake_tmdb.requests)
+    assert len(await api_calls.get_recommended_movie(MovieFilter(27))) == 4
+    assert len(fake_tmdb.requests) == requests
+
+
+@pytest.mark.asyncio
+async def test_sample_recommendation_window(client, fake_tmdb, monkeypatch):
+    monkeypatch.setenv("FETCH_STRATEGY", "sample")
+    config_registry.set_config(Config())
+    populations = []
+
+    def fake_sample(population, k):
+        populations.append((population, k))
+        return list(population)[:k]
+    monkeypatch.setattr(api_calls.random, "sample", fake_sample)
+    await api_calls.get_recommended_movie(MovieFilter(27))
+    assert populations == [(range(6), 3)]
+
+
+@pytest.mark.asyncio
+async def test_get_recommended_movie_cached(client, fake_tmdb):
+    first = await api_calls.get_recommended_movie(MovieFilter(27, year=2000))
+    second = await api_calls.get_recommended_movie(MovieFilter(27, min_year=2000, max_year=2000))
+    assert first == second
+    # The second, equivalent query is served completely from the cache
+    assert len(fake_tmdb.requests) == 3
+    assert cache.get_page_cache().hits == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_pages_not_cached(client, fake_tmdb):
+    fake_tmdb.failing_pages = {2}
+    await api_calls.get_recommended_movie(MovieFilter(27))
+    fake_tmdb.failing_pages = set()
+    movies = await api_calls.get_recommended_movie(MovieFilter(27))
+    assert len(movies) == 6
+    assert len(fake_tmdb.requests) == 4
+
+
+@pytest.mark.asyncio
+async def test_get_recommended_movie_disk_cached(client, fake_tmdb):
+    first = await api_calls.get_recommended_movie(MovieFilter(27))
+    # A fresh memory cache, as after a restart, is filled from the disk cache
+    cache.set_page_cache(None)
+    second = await api_calls.get_recommended_movie(MovieFilter(27))
+    assert first == second
+    assert len(fake_tmdb.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_coalesced(client, fake_tmdb):
+    fake_tmdb.delay = 0.05
+    results = await asyncio.gather(
+        api_calls.get_recommended_movie(MovieFilter(27)),
+        api_calls.get_recommended_movie(MovieFilter(27, original_language=None)),
+    )
+    assert results[0] == results[1]
+    assert len(fake_tmdb.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_get_recommended_movie_from_catalog(client, fake_tmdb):
+    catalog.set_catalog(catalog.Catalog(3600))
+    first = await api_calls.get_recommended_movie(MovieFilter(27))
+    second = await api_calls.get_recommended_movie(MovieFilter(27))
+    assert sorted(movie.id for movie in first) == sorted(movie.id for movie in second)
+    # The second query is answered by the catalog without touching the page cache
+    assert len(fake_tmdb.requests) == 3
+    assert cache.get_page_cache().hits == 0
+
+    # Only the first pages were ingested, so a narrower filter is not covered
+    await api_calls.get_recommended_movie(MovieFilter(27, year=2000))
+    assert len(fake_tmdb.requests) == 6
+
+
+@pytest.mark.asyncio
+async def test_complete_pool_covers_narrower_filters(client, fake_tmdb, config_instance):
+    catalog.set_catalog(catalog.Catalog(3600))
+    config_instance.MAX_API_PAGES_COUNT = TOTAL_PAGES
+    await api_calls.get_recommended_movie(MovieFilter(27))
+    movies = await api_calls.get_recommended_movie(MovieFilter(27, year=2000, original_language=Language.ENGLISH))
+    assert len(movies) == TOTAL_PAGES * 2
+    assert await api_calls.get_recommended_movie(MovieFilter(27, year=2001)) == []
+    assert len(fake_tmdb.requests) == TOTAL_PAGES
+
+
+@pytest.mark.asyncio
+async def test_failed_pool_not_cataloged(client, fake_tmdb):
+    catalog.set_catalog(catalog.Catalog(3600))
+    fake_tmdb.failing_pages = {2}
+    await api_calls.get_recommended_movie(MovieFilter(27))
+    assert catalog.get_catalog().query(MovieFilter(27), 100, 60) is None
+
+
+def test_pool_cataloged_without_validating(monkeypatch, config_instance):
+    catalog.set_catalog(catalog.Catalog(3600))
+
+    def fail_validation(*args, **kwargs):
+        raise AssertionError("A result was validated")
+
+    body = {"page": 1, "results": [movie_dict(1), movie_dict(2), {"id": 3}], "total_pages": 1, "total_results": 3}
+    with monkeypatch.context() as patch:
+        patch.setattr(Movie, "model_validate", fail_validation)
+        api_calls.add_pages_to_catalog(MovieFilter(27), [tmdb_client.TMDBResponse(200, json.dumps(body).encode())])
+    # The malformed result is left out
+    assert len(catalog.get_catalog().movies) == 2
+    assert sorted(movie.id for movie in catalog.get_catalog().query(MovieFilter(27), 100, 60)) == [1, 2]
+
+
+@pytest_asyncio.fixture
+async def retrying_client(client):
+    retrying = tmdb_client.TMDBClient(client._base_url, {}, 5, 4, max_retries=2, retry_backoff=0.01)
+    tmdb_client.set_client(retrying)
+    yield retrying
+    await retrying.close()
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_request_retried(retrying_client, fake_tmdb):
+    fake_tmdb.rate_limited = 2
+    response = await retrying_client.get("discover/movie", {"with_genres": 27})
+    assert response.status_code == 200
+    assert len(fake_tmdb.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_exhausted(retrying_client, fake_tmdb):
+    fake_tmdb.rate_limited = 5
+    response = await retrying_client.get("discover/movie", {"with_genres": 27})
+    assert response.status_code == 429
+    assert len(fake_tmdb.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_client_errors_not_retried(retrying_client):
+    response = await retrying_client.get("unknown", {})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_no_retry_past_deadline(client, fake_tmdb):
+    slow = tmdb_client.TMDBClient(client._base_url, {}, 5, 4, max_retries=3, retry_backoff=0.01)
+    fake_tmdb.rate_limited = 1
+    fake_tmdb.retry_after = "30"
+    with rate_limit.deadline(0.5):
+        response = await slow.get("discover/movie", {})
+    await slow.close()
+    assert response.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pause_gives_up_at_deadline(client, fake_tmdb):
+    bucket = TokenBucket(1000, 10)
+    limited = tmdb_client.TMDBClient(client._base_url, {}, 5, 4, rate_limiter=bucket, max_retries=3)
+    fake_tmdb.rate_limited = 1
+    fake_tmdb.retry_after = "30"
+    start = time.monotonic()
+    with rate_limit.deadline(0.5):
+        first = await limited.get("discover/movie", {})
+        # A concurrent command does not wait out the pause either
+        second = await limited.get("discover/movie", {})
+    await limited.close()
+    assert first.status_code == second.status_code == tmdb_client.RATE_LIMITED_STATUS
+    assert len(fake_tmdb.requests) == 1
+    assert time.monotonic() - start < 0.5
+
+
+@pytest_asyncio.fixture
+async def breaker_client(client):
+    breaker = CircuitBreaker(1, 0.05)
+    guarded = tmdb_client.TMDBClient(client._base_url, {}, 5, 4, breaker=breaker)
+    tmdb_client.set_client(guarded)
+    yield guarded
+    await guarded.close()
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_rejects_without_request(breaker_client, fake_tmdb):
+    fake_tmdb.failing_pages = {1}
+    assert (await breaker_client.get("discover/movie", {})).status_code == 500
+    assert (await breaker_client.get("discover/movie", {})).status_code == tmdb_client.CIRCUIT_OPEN_STATUS
+    assert len(fake_tmdb.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_page_after_failure_flagged(client, fake_tmdb):
+    cache.get_page_cache().ttl = 0.01
+    disk_cache.get_disk_cache().ttl = 0.01
+    fresh = await api_calls.get_recommended_movie(MovieFilter(27))
+    assert not api_calls.served_stale(fresh)
+    await asyncio.sleep(0.02)
+
+    # No breaker is involved, the failed download alone falls back to the stale page
+    fake_tmdb.failing_pages = {2}
+    stale = await api_calls.get_recommended_movie(MovieFilter(27))
+    assert stale == fresh
+    assert api_calls.served_stale(stale)
+
+
+@pytest.mark.asyncio
+async def test_stale_pages_served_while_open(breaker_client, fake_tmdb, monkeypatch):
+    # Cache pages only briefly, then fail TMDB to open the breaker once they expire
+    cache.get_page_cache().ttl = 0.01
+    disk_cache.get_disk_cache().ttl = 0.01
+    fresh = await api_calls.get_recommended_movie(MovieFilter(27))
+    await asyncio.sleep(0.02)
+    fake_tmdb.failing_pages = {1, 2, 3}
+
+    stale = await api_calls.get_recommended_movie(MovieFilter(27))
+    assert stale == fresh
+    assert api_calls.served_stale(stale)
+    assert not api_calls.served_stale(fresh)
+    requests_while_open = len(fake_tmdb.requests)
+
+    # Once the breaker half-opens, serving stale pages refreshes them in the background
+    fake_tmdb.failing_pages = set()
+    await asyncio.sleep(0.06)
+    assert await api_calls.get_recommended_movie(MovieFilter(27)) == fresh
+    await asyncio.gather(*api_calls._background_tasks)
+    assert len(fake_tmdb.requests) > requests_while_open
+    assert not api_calls.served_stale(await api_calls.get_recommended_movie(MovieFilter(27)))
@@ -0,0 +1,104 @@
+import pytest
+from ase_discord_bot.api_util.cache import CanonicalFilter, TTLCache, canonical_filter
+from ase_discord_bot.api_util.model.filters import MovieFilter, TVShowFilter
+from ase_discord_bot.api_util.model.languages import Language
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_canonical_filter_year_range():
+    assert canonical_filter(MovieFilter(28, year=1999)) == \
+        canonical_filter(MovieFilter(28, min_year=1999, max_year=1999))
+
+
+def test_canonical_filter_language():
+    by_enum = canonical_filter(TVShowFilter(18, original_language=Language.GERMAN))
+    assert by_enum == canonical_filter(TVShowFilter(18, original_language="de"))
+    assert by_enum == canonical_filter(TVShowFilter(18, original_language="German"))
+    assert by_enum == CanonicalFilter("tv", 18, None, None, "de")
+
+
+def test_canonical_filter_media_type():
+    assert canonical_filter(MovieFilter(18)) != canonical_filter(TVShowFilter(18))
+
+
+def test_cache_hit_and_miss(clock):
+    cache = TTLCache(10, 10, 100, clock)
+    assert cache.get("a") is None
+    cache.set("a", "value", 5)
+    assert cache.get("a") == "value"
+    assert cache.stats() == {"entries": 1, "bytes": 5, "hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_cache_expiry(clock):
+    cache = TTLCache(10, 10, 100, clock)
+    cache.set("a", "value", 5)
+    clock.now = 4
+    assert cache.expires_in("a") == 6
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.expires_in("a") == 0
+    assert cache.expires_in("b") == 0
+    # The expired entry is kept as a stale copy
+    assert cache.get("a", allow_stale=True) == "value"
+    assert cache.size_bytes == 5
+
+
+def test_cache_lru_entry_eviction(clock):
+    cache = TTLCache(10, 2, 100, clock)
+    cache.set("a", 1, 1)
+    cache.set("b", 2, 1)
+    cache.get("a")
+    cache.set("c", 3, 1)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_cache_byte_eviction(clock):
+    cache = TTLCache(10, 10, 10, clock)
+    cache.set("a", 1, 6)
+    cache.set("b", 2, 6)
+    assert cache.get("a") is None
+    assert cache.size_bytes == 6
+    # Values larger than the whole budget are never stored
+    cache.set("c", 3, 11)
+    assert cache.get("c") is None
+    assert cache.get("b") == 2
+
+
+def test_cache_without_byte_budget(clock):
+    cache = TTLCache(10, 2, clock=clock)
+    cache.set("a", object(), 10**9)
+    cache.set("b", object())
+    assert len(cache) == 2
+    cache.set("c", object())
+    assert "a" not in cache
+    assert "b" in cache and "c" in cache
+
+
+def test_cache_disabled(clock):
+    cache = TTLCache(0, 10, 10, clock)
+    cache.set("a", 1, 1)
+    assert cache.get("a") is None
+
+
+def test_cache_replace_and_invalidate(clock):
+    cache = TTLCache(10, 10, 10, clock)
+    cache.set("a", 1, 4)
+    cache.set("a", 2, 3)
+    assert cache.size_bytes == 3
+    assert cache.get("a") == 2
+    cache.invalidate("a")
+    assert len(cache) == 0
@@ -0,0 +1,141 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from ase_discord_bot import config_registry
+from ase_discord_bot.api_util import api_calls, cache, cache_warmer, disk_cache, page_planner, tmdb_client
+from ase_discord_bot.api_util.circuit_breaker import CircuitBreaker
+from ase_discord_bot.api_util.model.filters import MovieFilter, TVShowFilter
+from ase_discord_bot.api_util.model.genres import MovieGenre, TVShowGenre
+from ase_discord_bot.api_util.model.languages import Language
+from ase_discord_bot.catalog import catalog
+from ase_discord_bot.config import Config
+
+TOTAL_PAGES = 4
+
+
+@pytest.fixture(autouse=True)
+def set_required_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("TMDB_READ_ACCESS_TOKEN", "dummy_tmdb")
+    monkeypatch.setenv("DISCORD_TOKEN", "dummy_discord")
+    monkeypatch.setenv("DISCORD_GUILD_ID", "1234")
+    monkeypatch.setenv("OPEN_ROUTER_API_KEY", "dummy_open")
+    monkeypatch.setenv("MAX_API_PAGES_COUNT", "3")
+    monkeypatch.setenv("DISK_CACHE_DIR", str(tmp_path))
+
+
+@pytest.fixture
+def config_instance():
+    conf = Config()
+    config_registry.set_config(conf)
+    cache.set_page_cache(None)
+    disk_cache.set_disk_cache(None)
+    catalog.set_catalog(None)
+    page_planner.set_page_planner(None)
+    yield conf
+    disk_cache.close_disk_cache()
+
+
+class FakeTMDB:
+    """
+    Local stand-in for the TMDB discover endpoints serving TOTAL_PAGES empty pages.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    async def discover(self, request):
+        page = int(request.query.get("page", 1))
+        self.requests.append((request.match_info["media_type"], page))
+        return web.json_response({
+            "page": page,
+            "results": [],
+            "total_pages": TOTAL_PAGES,
+            "total_results": 0,
+        })
+
+
+@pytest.fixture
+def fake_tmdb():
+    return FakeTMDB()
+
+
+@pytest.fixture
+def tmdb_routes(fake_tmdb):
+    return {"/discover/{media_type}": fake_tmdb.discover}
+
+
+@pytest_asyncio.fixture
+async def client(client, config_instance):
+    tmdb_client.set_client(client)
+    yield client
+    tmdb_client.set_client(None)
+
+
+def test_warmup_filters_cover_all_genres_per_language():
+    media_filters = cache_warmer.warmup_filters([Language.GERMAN])
+    genres_count = len(MovieGenre) + len(TVShowGenre)
+
+    assert len(media_filters) == 2 * genres_count
+    assert all(f.original_language is None for f in media_filters[:genres_count])
+    assert all(f.original_language == Language.GERMAN for f in media_filters[genres_count:])
+    assert sum(isinstance(f, TVShowFilter) for f in media_filters) == 2 * len(TVShowGenre)
+
+
+@pytest.mark.asyncio
+async def test_warm_fetches_all_pages_once(client, fake_tmdb):
+    media_filters = [MovieFilter(27), TVShowFilter(18)]
+    warmer = cache_warmer.CacheWarmer(media_filters, 0, 100, 1000)
+
+    assert await warmer.warm() == 6
+    assert sorted(fake_tmdb.requests) == [("movie", 1), ("movie", 2), ("movie", 3),
+                                          ("tv", 1), ("tv", 2), ("tv", 3)]
+    assert api_calls.is_page_cached(MovieFilter(27), 3)
+    assert catalog.get_catalog().query(TVShowFilter(18), 100, 60) == []
+
+    # A second run finds every page in the cache
+    assert await warmer.warm() == 0
+    assert len(fake_tmdb.requests) == 6
+
+
+@pytest.mark.asyncio
+async def test_warm_stops_at_request_budget(client, fake_tmdb):
+    warmer = cache_warmer.CacheWarmer([MovieFilter(27), MovieFilter(28)], 0, 2, 1000)
+
+    assert await warmer.warm() == 2
+    assert fake_tmdb.requests == [("movie", 1), ("movie", 2)]
+
+
+@pytest.mark.asyncio
+async def test_warm_skips_while_circuit_is_open(client, fake_tmdb):
+    client.breaker = CircuitBreaker(1, 60)
+    client.breaker.record(False, 0)
+    warmer = cache_warmer.CacheWarmer([MovieFilter(27)], 0, 100, 1000)
+
+    assert await warmer.warm() == 0
+    assert fake_tmdb.requests == []
+
+
+@pytest.mark.asyncio
+async def test_start_and_stop_cache_warmer(client, fake_tmdb, config_instance):
+    config_instance.WARMUP_LANGUAGES = ["de", "not a language"]
+    config_instance.WARMUP_INTERVAL = 0
+    config_instance.WARMUP_REQUEST_BUDGET = 3
+    config_instance.WARMUP_REQUESTS_PER_SECOND = 1000
+
+    cache_warmer.start_cache_warmer(config_instance)
+    task = cache_warmer._warmer_task
+    assert task is not None
+    await asyncio.wait_for(asyncio.shield(task), 5)
+    assert len(fake_tmdb.requests) == 3
+
+    await cache_warmer.stop_cache_warmer()
+    assert cache_warmer._warmer_task is None
+
+
+@pytest.mark.asyncio
+async def test_start_cache_warmer_disabled_without_budget(config_instance):
+    config_instance.WARMUP_REQUEST_BUDGET = 0
+
+    cache_warmer.start_cache_warmer(config_instance)
+    assert cache_warmer._warmer_task is None
@@ -0,0 +1,164 @@
+import pytest
+from ase_discord_bot.api_util.cache import CanonicalFilter
+from ase_discord_bot.api_util.model.responses import Movie, TVShow
+from ase_discord_bot.catalog.columns import GENRE_BITS, UNKNOWN_YEAR, genre_mask, release_year
+from ase_discord_bot.catalog import index as index_module
+from ase_discord_bot.catalog.index import INITIAL_CAPACITY, CatalogIndex
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_movie(movie_id, genre_ids=(27,), year="2000", language="en", vote_count=200, popularity=1.0,
+               vote_average=7.0):
+    return Movie(
+        adult=False,
+        backdrop_path=None,
+        genre_ids=list(genre_ids),
+        id=movie_id,
+        original_language=language,
+        overview=f"Overview {movie_id}",
+        popularity=popularity,
+        poster_path=None,
+        vote_average=vote_average,
+        vote_count=vote_count,
+        original_title=f"Movie {movie_id}",
+        release_date=f"{year}-01-01" if year else "",
+        title=f"Movie {movie_id}",
+        video=False,
+    )
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def index(clock):
+    return CatalogIndex(Movie, 60, clock)
+
+
+def test_genre_mask_ignores_unknown_genres():
+    assert genre_mask([27, 28]) == (1 << GENRE_BITS[27]) | (1 << GENRE_BITS[28])
+    assert genre_mask([123456]) == 0
+    assert len(GENRE_BITS) <= 64
+
+
+def test_release_year():
+    assert release_year(make_movie(1, year="1999")) == 1999
+    assert release_year(make_movie(1, year=None)) == UNKNOWN_YEAR
+    show = TVShow(adult=False, backdrop_path=None, genre_ids=[18], id=1, original_language="en", overview="",
+                  popularity=1.0, poster_path=None, vote_average=7.0, vote_count=200, origin_country=["US"],
+                  original_name="Show", first_air_date="2010-05-01", name="Show")
+    assert release_year(show) == 2010
+
+
+def test_uncovered_filter_not_answered(index):
+    index.upsert([make_movie(1)])
+    assert index.query(CanonicalFilter("movie", 27), 100, 10) is None
+
+
+def test_query_filters_and_orders_like_discover(index):
+    key = CanonicalFilter("movie", 27)
+    index.add_pool(key, 100, [
+        make_movie(1, vote_average=6.0, popularity=9.0),
+        make_movie(2, vote_average=8.0),
+        make_movie(3, vote_average=7.0, popularity=1.0),
+        make_movie(6, vote_average=7.0, popularity=2.0),
+        make_movie(4, genre_ids=(28,)),
+        make_movie(5, vote_count=50),
+    ], complete=True)
+    # By vote average like TMDB's discover, ties by popularity
+    assert [movie.id for movie in index.query(key, 100, 10)] == [2, 6, 3, 1]
+    assert [movie.id for movie in index.query(key, 100, 2)] == [2, 6]
+
+
+def test_incomplete_pool_answered_from_its_own_results(index):
+    key = CanonicalFilter("movie", 27)
+    index.add_pool(key, 100, [make_movie(1, vote_average=6.0), make_movie(2, vote_average=5.0)], complete=False)
+    # Better rated results of another pool match the filter, but were not part of its pool
+    index.add_pool(CanonicalFilter("movie", 27, language="en"), 100, [make_movie(3, vote_average=9.0)],
+                   complete=False)
+    assert [movie.id for movie in index.query(key, 100, 10)] == [1, 2]
+    # A complete pool of the filter answers with every matching result
+    index.add_pool(key, 100, [make_movie(1, vote_average=6.0)], complete=True)
+    assert [movie.id for movie in index.query(key, 100, 10)] == [3, 1, 2]
+
+
+def test_complete_pool_covers_narrower_filters(index):
+    index.add_pool(CanonicalFilter("movie", 27), 100, [
+        make_movie(1, year="1995", language="en"),
+        make_movie(2, year="2005", language="de"),
+        make_movie(3, year=None, language="de"),
+    ], complete=True)
+
+    assert [m.id for m in index.query(CanonicalFilter("movie", 27, 2000, 2010), 100, 10)] == [2]
+    assert [m.id for m in index.query(CanonicalFilter("movie", 27, None, 2000), 100, 10)] == [1]
+    assert {m.id for m in index.query(CanonicalFilter("movie", 27, language="de"), 100, 10)} == {2, 3}
+    assert index.query(CanonicalFilter("movie", 27, language="fr"), 100, 10) == []
+    # A higher vote count threshold is narrower as well, a lower one is not
+    assert index.query(CanonicalFilter("movie", 27), 500, 10) == []
+    assert index.query(CanonicalFilter("movie", 27), 50, 10) is None
+    assert index.query(CanonicalFilter("movie", 28), 100, 10) is None
+
+
+def test_incomplete_pool_only_covers_its_filter(index):
+    index.add_pool(CanonicalFilter("movie", 27), 100, [make_movie(1)], complete=False)
+    assert index.query(CanonicalFilter("movie", 27, language="en"), 100, 10) is None
+    assert index.query(CanonicalFilter("movie", 27), 500, 10) is None
+
+
+def test_coverage_expires(index, clock):
+    key = CanonicalFilter("movie", 27)
+    index.add_pool(key, 100, [make_movie(1)], complete=True)
+    clock.now = 61
+    assert index.query(key, 100, 10) is None
+
+
+def test_expired_coverage_dropped(index, clock):
+    index.add_pool(CanonicalFilter("movie", 27), 100, [make_movie(1)], complete=False)
+    index.add_pool(CanonicalFilter("movie", 28), 100, [make_movie(2, genre_ids=(28,))], complete=True)
+    clock.now = 61
+    # A miss scans all coverage and drops the expired ones
+    assert index.query(CanonicalFilter("movie", 35), 100, 10) is None
+    assert len(index._coverage) == 0
+
+
+def test_least_recently_used_coverage_dropped(index, monkeypatch):
+    monkeypatch.setattr(index_module, "MAX_COVERAGES", 2)
+    for genre in (27, 28):
+        index.add_pool(CanonicalFilter("movie", genre), 100, [make_movie(genre, genre_ids=(genre,))], complete=True)
+    assert index.covers(CanonicalFilter("movie", 27), 100)
+    index.add_pool(CanonicalFilter("movie", 35), 100, [make_movie(35, genre_ids=(35,))], complete=True)
+    assert len(index._coverage) == 2
+    assert index.covers(CanonicalFilter("movie", 27), 100)
+    assert not index.covers(CanonicalFilter("movie", 28), 100)
+
+
+def test_zero_ttl_disables_index(clock):
+    index = CatalogIndex(Movie, 0, clock)
+    key = CanonicalFilter("movie", 27)
+    index.add_pool(key, 100, [make_movie(1)], complete=True)
+    assert index.query(key, 100, 10) is None
+
+
+def test_upsert_replaces_rows(index):
+    key = CanonicalFilter("movie", 27)
+    index.add_pool(key, 100, [make_movie(1, popularity=1.0), make_movie(2, popularity=2.0)], complete=True)
+    index.upsert([make_movie(1, popularity=5.0), make_movie(2, genre_ids=(28,))])
+    assert len(index) == 2
+    assert [movie.id for movie in index.query(key, 100, 10)] == [1]
+
+
+def test_columns_grow(index):
+    key = CanonicalFilter("movie", 27)
+    count = INITIAL_CAPACITY * 2 + 1
+    index.add_pool(key, 100, [make_movie(i, popularity=float(i)) for i in range(count)], complete=True)
+    assert len(index) == count
+    assert [movie.id for movie in index.query(key, 100, 2)] == [count - 1, count - 2]
@@ -0,0 +1,158 @@
+import pytest
+from datetime import date
+from aiohttp import web
+from ase_discord_bot.api_util.model.filters import MovieFilter
+from ase_discord_bot.catalog.catalog import Catalog
+from ase_discord_bot.catalog.changes import refresh_changes
+from ase_discord_bot.catalog.store import CatalogStore
+
+TODAY = date(2025, 5, 31)
+
+
+def movie_result(movie_id, genre_id=27, adult=False):
+    return {
+        "adult": adult,
+        "backdrop_path": None,
+        "genre_ids": [genre_id],
+        "id": movie_id,
+        "original_language": "en",
+        "overview": f"Overview {movie_id}",
+        "popularity": 1.0,
+        "poster_path": None,
+        "vote_average": 7.0,
+        "vote_count": 200,
+        "original_title": f"Movie {movie_id}",
+        "release_date": "2000-01-01",
+        "title": f"Movie {movie_id}",
+        "video": False,
+    }
+
+
+class FakeTMDB:
+    """
+    Local stand-in for the TMDB movie change feed and details endpoints.
+
+    The change feed serves one changed ID per page.
+    """
+
+    def __init__(self):
+        self.changed_ids = []
+        self.details = {}
+        self.change_requests = []
+        self.detail_requests = []
+        self.failing_changes = False
+
+    async def changes(self, request):
+        self.change_requests.append((request.query["start_date"], request.query["end_date"]))
+        if self.failing_changes:
+            return web.json_response({"status_message": "error"}, status=400)
+        page = int(request.query.get("page", 1))
+        results = [{"id": self.changed_ids[page - 1], "adult": False}] if self.changed_ids else []
+        return web.json_response({
+            "results": results,
+            "page": page,
+            "total_pages": max(len(self.changed_ids), 1),
+            "total_results": len(self.changed_ids),
+        })
+
+    async def movie(self, request):
+        movie_id = int(request.match_info["movie_id"])
+        self.detail_requests.append(movie_id)
+        if movie_id not in self.details:
+            return web.json_response({"status_message": "not found"}, status=404)
+        details = self.details[movie_id]
+        return web.json_response({**details, "genres": [{"id": i, "name": ""} for i in details["genre_ids"]]})
+
+
+@pytest.fixture
+def fake_tmdb():
+    return FakeTMDB()
+
+
+@pytest.fixture
+def tmdb_routes(fake_tmdb):
+    return {"/movie/changes": fake_tmdb.changes, "/movie/{movie_id}": fake_tmdb.movie}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CatalogStore(tmp_path / "catalog.sqlite3")
+    store.write_batch("movie", [movie_result(1), movie_result(2), movie_result(3)], [], "export", 3)
+    yield store
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_patches_only_held_titles(store, client, fake_tmdb):
+    store.set_watermark("movie", date(2025, 5, 30))
+    catalog = Catalog(3600)
+    catalog.load_store(store)
+
+    # 1 changed genre, 2 was deleted, 4 is not held
+    fake_tmdb.changed_ids = [1, 2, 4]
+    fake_tmdb.details = {1: movie_result(1, genre_id=28), 4: movie_result(4)}
+    stats = await refresh_changes(store, client, "movie", TODAY, catalog, batch_size=2)
+
+    assert (stats.changed, stats.patched, stats.removed) == (3, 1, 1)
+    assert sorted(fake_tmdb.detail_requests) == [1, 2]
+    results = {result["id"]: result for result in store.iter_results("movie")}
+    assert sorted(results) == [1, 3]
+    assert results[1]["genre_ids"] == [28]
+    assert store.watermark("movie") == TODAY
+
+    # The catalog is patched in place
+    assert [movie.id for movie in catalog.query(MovieFilter(27), 100, 10)] == [3]
+    assert [movie.id for movie in catalog.query(MovieFilter(28), 100, 10)] == [1]
+
+
+@pytest.mark.asyncio
+async def test_refresh_renews_coverage(store, client, fake_tmdb):
+    now = [0.0]
+    catalog = Catalog(3600, lambda: now[0])
+    catalog.load_store(store)
+    assert catalog.query(MovieFilter(27), 100, 10) is not None
+
+    now[0] = 3600.0
+    assert catalog.query(MovieFilter(27), 100, 10) is None
+    # The refreshed store is complete again, so the catalog answers again
+    await refresh_changes(store, client, "movie", TODAY, catalog)
+    assert sorted(movie.id for movie in catalog.query(MovieFilter(27), 100, 10)) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_adult_titles_removed(store, client, fake_tmdb):
+    fake_tmdb.changed_ids = [3]
+    fake_tmdb.details = {3: movie_result(3, adult=True)}
+    stats = await refresh_changes(store, client, "movie", TODAY)
+    assert stats.removed == 1
+    assert store.count("movie") == 2
+
+
+@pytest.mark.asyncio
+async def test_refresh_starts_yesterday_without_watermark(store, client, fake_tmdb):
+    await refresh_changes(store, client, "movie", TODAY)
+    assert fake_tmdb.change_requests == [("2025-05-30", "2025-05-31")]
+
+
+@pytest.mark.asyncio
+async def test_old_watermark_is_caught_up_in_windows(store, client, fake_tmdb):
+    store.set_watermark("movie", date(2025, 5, 1))
+    await refresh_changes(store, client, "movie", TODAY)
+    assert fake_tmdb.change_requests == [
+        ("2025-05-01", "2025-05-15"),
+        ("2025-05-15", "2025-05-29"),
+        ("2025-05-29", "2025-05-31"),
+    ]
+    # Nothing is left to apply until the next day
+    fake_tmdb.change_requests.clear()
+    await refresh_changes(store, client, "movie", TODAY)
+    assert fake_tmdb.change_requests == []
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_watermark(store, client, fake_tmdb):
+    store.set_watermark("movie", date(2025, 5, 30))
+    fake_tmdb.failing_changes = True
+    with pytest.raises(RuntimeError):
+        await refresh_changes(store, client, "movie", TODAY)
+    assert store.watermark("movie") == date(2025, 5, 30)
@@ -0,0 +1,74 @@
+import pytest
+from ase_discord_bot.api_util.circuit_breaker import BreakerState, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(3, 30, clock=clock)
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == BreakerState.CLOSED
+    breaker.record(False, 0.1)
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(2, 30, clock=clock)
+    breaker.record(False, 0.1)
+    breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_latency_budget_breach_counts_as_failure(clock):
+    breaker = CircuitBreaker(1, 30, latency_budget=1, clock=clock)
+    breaker.record(True, 0.5)
+    assert breaker.state == BreakerState.CLOSED
+    breaker.record(True, 2)
+    assert breaker.state == BreakerState.OPEN
+
+
+def test_half_open_single_probe(clock):
+    breaker = CircuitBreaker(1, 30, clock=clock)
+    breaker.record(False, 0.1)
+    clock.now = 30
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert breaker.allow_request()
+    # Only one probe at a time
+    assert not breaker.allow_request()
+    breaker.record(True, 0.1)
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(1, 30, clock=clock)
+    breaker.record(False, 0.1)
+    clock.now = 30
+    assert breaker.allow_request()
+    breaker.record(False, 0.1)
+    assert breaker.state == BreakerState.OPEN
+    clock.now = 59
+    assert not breaker.allow_request()
+
+
+def test_lost_probe_replaced(clock):
+    breaker = CircuitBreaker(1, 30, clock=clock)
+    breaker.record(False, 0.1)
+    clock.now = 30
+    assert breaker.allow_request()
+    clock.now = 60
+    assert breaker.allow_request()
@@ -150,3 +150,38 @@ def test_config_initialization(monkeypatch):
     assert conf.MIN_VOTE_COUNT == 100
     # Also check that URLs are properly constructed.
     assert conf.TMDB_API_BASE_URL == URL("https://api.themoviedb.org/3")
+
+
+def test_check_and_load_env_vars_invalid_concurrency(monkeypatch):
+    monkeypatch.setenv("TMDB_READ_ACCESS_TOKEN", "dummy_tmdb")
+    monkeypatch.setenv("DISCORD_TOKEN", "dummy_discord")
+    monkeypatch.setenv("DISCORD_GUILD_ID", "1234")
+    monkeypatch.setenv("OPEN_ROUTER_API_KEY", "dummy_open")
+    monkeypatch.setenv("MAX_CONCURRENT_API_REQUESTS", "0")
+    with pytest.raises(SystemExit):
+        check_and_load_env_vars()
+
+
+def test_check_and_load_env_vars_invalid_fetch_strategy(monkeypatch):
+    monkeypatch.setenv("TMDB_READ_ACCESS_TOKEN", "dummy_tmdb")
+    monkeypatch.setenv("DISCORD_TOKEN", "dummy_discord")
+    monkeypatch.setenv("DISCORD_GUILD_ID", "1234")
+    monkeypatch.setenv("OPEN_ROUTER_API_KEY", "dummy_open")
+    monkeypatch.setenv("FETCH_STRATEGY", "everything")
+    with pytest.raises(SystemExit):
+        check_and_load_env_vars()
+
+
+def test_check_and_load_env_vars_invalid_selection(monkeypatch):
+    monkeypatch.setenv("TMDB_READ_ACCESS_TOKEN", "dummy_tmdb")
+    monkeypatch.setenv("DISCORD_TOKEN", "dummy_discord")
+    monkeypatch.setenv("DISCORD_GUILD_ID", "1234")
+    monkeypatch.setenv("OPEN_ROUTER_API_KEY", "dummy_open")
+    monkeypatch.setenv("SELECTION_STRATEGY", "best")
+    with pytest.raises(SystemExit):
+        check_and_load_env_vars()
+
+    monkeypatch.setenv("SELECTION_STRATEGY", "diverse")
+    monkeypatch.setenv("SELECTION_DIVERSITY", "100")
+    with pytest.raises(SystemExit):
+        check_and_load_env_vars()
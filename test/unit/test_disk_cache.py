@@ -0,0 +1,123 @@
+import os
+import pytest
+from ase_discord_bot.api_util.disk_cache import DiskCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def disk_cache(tmp_path, clock):
+    cache = DiskCache(tmp_path / "cache" / "test.sqlite3", 60, 10_000, clock)
+    yield cache
+    cache.close()
+
+
+def test_lazy_open(tmp_path, clock):
+    cache = DiskCache(tmp_path / "lazy.sqlite3", 60, 10_000, clock)
+    assert not (tmp_path / "lazy.sqlite3").exists()
+    cache.set("a", b"value")
+    assert (tmp_path / "lazy.sqlite3").exists()
+    cache.close()
+
+
+def test_get_set(disk_cache):
+    assert disk_cache.get("a") is None
+    disk_cache.set("a", b"value" * 100)
+    assert disk_cache.get("a") == b"value" * 100
+    # Values are stored compressed
+    assert disk_cache.size_bytes < 100
+
+
+def test_persistence(tmp_path, clock):
+    path = tmp_path / "persist.sqlite3"
+    first = DiskCache(path, 60, 10_000, clock)
+    first.set("a", b"value")
+    first.close()
+
+    second = DiskCache(path, 60, 10_000, clock)
+    assert second.get("a") == b"value"
+    assert second.size_bytes == first.size_bytes
+    second.close()
+
+
+def test_expiry(disk_cache, clock):
+    disk_cache.set("a", b"value")
+    clock.now += 60
+    assert disk_cache.get("a") is None
+    # The expired entry is kept as a stale copy
+    assert disk_cache.get("a", allow_stale=True) == b"value"
+
+
+def test_expired_evicted_first(tmp_path, clock):
+    payload = os.urandom(1024)
+    cache = DiskCache(tmp_path / "expired.sqlite3", 60, 2500, clock)
+    cache.set("old", payload + b"old")
+    clock.now += 30
+    cache.set("a", payload + b"a")
+    clock.now += 31
+    cache.get("old", allow_stale=True)
+    cache.set("b", payload + b"b")
+    assert cache.get("old", allow_stale=True) is None
+    assert cache.get("a") == payload + b"a"
+    cache.close()
+
+
+def test_replace(disk_cache):
+    disk_cache.set("a", b"first")
+    size = disk_cache.size_bytes
+    disk_cache.set("a", b"first")
+    assert disk_cache.size_bytes == size
+    disk_cache.delete("a")
+    assert disk_cache.get("a") is None
+    assert disk_cache.size_bytes == 0
+
+
+def test_lru_eviction(tmp_path, clock):
+    # Random bytes do not compress, so each entry takes about 1 KB
+    payload = os.urandom(1024)
+    cache = DiskCache(tmp_path / "lru.sqlite3", 60, 2500, clock)
+    cache.set("a", payload + b"a")
+    clock.now += 10
+    cache.set("b", payload + b"b")
+    clock.now += 10
+    cache.get("a")
+    clock.now += 10
+    cache.set("c", payload + b"c")
+    assert cache.get("b") is None
+    assert cache.get("a") == payload + b"a"
+    assert cache.get("c") == payload + b"c"
+    assert cache.size_bytes <= 2500
+    cache.close()
+
+
+def test_access_time_updates_throttled(disk_cache, clock):
+    disk_cache.set("a", b"value")
+
+    def accessed_at():
+        return disk_cache._connect().execute("SELECT accessed_at FROM entries WHERE key = 'a'").fetchone()[0]
+
+    # Within a tenth of the TTL a hit does not write
+    clock.now += 5
+    assert disk_cache.get("a") == b"value"
+    assert accessed_at() == 1000
+    clock.now += 1
+    assert disk_cache.get("a") == b"value"
+    assert accessed_at() == 1006
+
+
+def test_disabled(tmp_path, clock):
+    cache = DiskCache(tmp_path / "disabled.sqlite3", 0, 10_000, clock)
+    cache.set("a", b"value")
+    assert cache.get("a") is None
+    assert not (tmp_path / "disabled.sqlite3").exists()
@@ -0,0 +1,158 @@
+import asyncio
+import sqlite3
+import numpy as np
+import pytest
+from ase_discord_bot.bot.history import HistoryStore, SeenHistory
+
+KEY = (1, 2, "movie")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(tmp_path / "history.sqlite3")
+    yield store
+    store.close()
+
+
+def test_record_and_seen(clock):
+    history = SeenHistory(4, 60, 10, clock)
+    assert len(history.seen(KEY)) == 0
+    history.record(KEY, [1, 2, 3])
+    assert sorted(history.seen(KEY)) == [1, 2, 3]
+    assert len(history.seen((1, 2, "tv"))) == 0
+    # The ring buffer overwrites the oldest IDs
+    history.record(KEY, [4, 5])
+    assert sorted(history.seen(KEY)) == [2, 3, 4, 5]
+
+
+def test_seen_ids_expire(clock):
+    history = SeenHistory(4, 60, 10, clock)
+    history.record(KEY, [1])
+    clock.now += 30
+    history.record(KEY, [2])
+    clock.now += 31
+    assert list(history.seen(KEY)) == [2]
+
+
+def test_least_recently_used_history_evicted(clock):
+    history = SeenHistory(4, 60, 2, clock)
+    history.record((1, 1, "movie"), [1])
+    history.record((1, 2, "movie"), [2])
+    history.seen((1, 1, "movie"))
+    history.record((1, 3, "movie"), [3])
+    assert len(history) == 2
+    assert len(history.seen((1, 2, "movie"))) == 0
+    assert list(history.seen((1, 1, "movie"))) == [1]
+
+
+def test_zero_size_disables_history(clock):
+    history = SeenHistory(0, 60, 10, clock)
+    history.record(KEY, [1])
+    assert len(history) == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_and_load(clock, store):
+    history = SeenHistory(4, 60, 10, clock)
+    history.record(KEY, [1, 2])
+    history.record((1, 3, "tv"), [3])
+    assert await history.flush(store) == 2
+    # Nothing changed since the last flush
+    assert await history.flush(store) == 0
+
+    loaded = SeenHistory(4, 60, 10, clock)
+    loaded.load(store)
+    assert sorted(loaded.seen(KEY)) == [1, 2]
+    assert list(loaded.seen((1, 3, "tv"))) == [3]
+    # Recording continues after the loaded IDs
+    loaded.record(KEY, [4, 5, 6])
+    assert sorted(loaded.seen(KEY)) == [2, 4, 5, 6]
+
+
+@pytest.mark.asyncio
+async def test_load_skips_expired_and_resizes(clock, store):
+    history = SeenHistory(4, 60, 10, clock)
+    history.record((1, 1, "movie"), [1])
+    clock.now += 30
+    history.record(KEY, [2, 3, 4])
+    await history.flush(store)
+
+    clock.now += 40
+    loaded = SeenHistory(2, 60, 10, clock)
+    loaded.load(store)
+    assert len(loaded) == 1
+    assert sorted(loaded.seen(KEY)) == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_flush_deletes_evicted_histories(clock, store):
+    history = SeenHistory(4, 60, 1, clock)
+    history.record((1, 1, "movie"), [1])
+    await history.flush(store)
+    history.record(KEY, [2])
+    await history.flush(store)
+
+    loaded = SeenHistory(4, 60, 10, clock)
+    loaded.load(store)
+    assert len(loaded) == 1
+    assert list(loaded.seen(KEY)) == [2]
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_snapshot_taken_on_event_loop(clock, store):
+    history = SeenHistory(4, 60, 10, clock)
+    history.record(KEY, [1])
+    flush = asyncio.create_task(history.flush(store))
+    # The flush has taken its copy and is writing it, recording goes on meanwhile
+    await asyncio.sleep(0)
+    history.record(KEY, [2])
+    assert await flush == 1
+
+    loaded = SeenHistory(4, 60, 10, clock)
+    loaded.load(store)
+    assert list(loaded.seen(KEY)) == [1]
+    assert await history.flush(store) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_changes(clock, store, monkeypatch):
+    history = SeenHistory(4, 60, 1, clock)
+    history.record((1, 1, "movie"), [1])
+    await history.flush(store)
+    history.record(KEY, [2])
+
+    def fail(rows, deleted):
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(store, "write", fail)
+    with pytest.raises(sqlite3.Error):
+        await history.flush(store)
+    monkeypatch.undo()
+    assert await history.flush(store) == 2
+
+    loaded = SeenHistory(4, 60, 10, clock)
+    loaded.load(store)
+    assert list(loaded.seen(KEY)) == [2]
+    assert len(loaded) == 1
+
+
+def test_store_round_trips_arrays(store):
+    ids = np.array([1, 2**40, 0], dtype=np.int64)
+    shown_at = np.array([5, 7, 0], dtype=np.uint32)
+    store.write([(KEY, ids, shown_at)], [])
+    [(key, read_ids, read_shown_at)] = store.read(0, 10)
+    assert key == KEY
+    assert list(read_ids) == list(ids)
+    assert list(read_shown_at) == list(shown_at)
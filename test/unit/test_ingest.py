@@ -0,0 +1,157 @@
+import gzip
+import shutil
+import pytest
+from pathlib import Path
+from aiohttp import web
+from ase_discord_bot.api_util.model.filters import MovieFilter
+from ase_discord_bot.catalog.catalog import Catalog
+from ase_discord_bot.catalog.ingest import export_media_type, ingest_export, read_export, to_result
+from ase_discord_bot.catalog.store import CatalogStore
+
+FIXTURE = Path(__file__).parent / "fixtures" / "movie_ids_05_15_2025.json"
+
+# Title of the fixture that is no longer on TMDB
+DELETED_ID = 5
+
+
+class FakeTMDB:
+    """
+    Local stand-in for the TMDB movie details endpoint.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.failing_ids = set()
+
+    async def details(self, request):
+        movie_id = int(request.match_info["movie_id"])
+        self.requests.append(movie_id)
+        if movie_id == DELETED_ID:
+            return web.json_response({"status_message": "not found"}, status=404)
+        if movie_id in self.failing_ids:
+            return web.json_response({"status_message": "error"}, status=400)
+        return web.json_response({
+            "adult": False,
+            "backdrop_path": None,
+            "genres": [{"id": 27, "name": "Horror"}],
+            "id": movie_id,
+            "original_language": "en",
+            "original_title": f"Movie {movie_id}",
+            "overview": None,
+            "popularity": 1.0,
+            "poster_path": "/poster.jpg",
+            "release_date": "2000-01-01",
+            "title": f"Movie {movie_id}",
+            "video": False,
+            "vote_average": 7.0,
+            "vote_count": 200,
+            "runtime": 90,
+        })
+
+
+@pytest.fixture
+def fake_tmdb():
+    return FakeTMDB()
+
+
+@pytest.fixture
+def tmdb_routes(fake_tmdb):
+    return {"/movie/{movie_id}": fake_tmdb.details}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CatalogStore(tmp_path / "catalog.sqlite3")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def export(tmp_path):
+    path = tmp_path / (FIXTURE.name + ".gz")
+    with open(FIXTURE, "rb") as source, gzip.open(path, "wb") as target:
+        shutil.copyfileobj(source, target)
+    return path
+
+
+def test_export_media_type():
+    assert export_media_type(Path("movie_ids_05_15_2025.json.gz")) == "movie"
+    assert export_media_type(Path("tv_series_ids_05_15_2025.json.gz")) == "tv"
+    with pytest.raises(ValueError):
+        export_media_type(Path("collection_ids_05_15_2025.json.gz"))
+
+
+def test_read_export_streams_gzip_and_plain_files(export):
+    records = list(read_export(export))
+    assert records == list(read_export(FIXTURE))
+    # The malformed line 4 is skipped
+    assert [line for line, _ in records] == [1, 2, 3, 5, 6, 7]
+    assert [record["id"] for _, record in read_export(export, start_line=5)] == [5, 6]
+
+
+def test_to_result_matches_discover_shape():
+    result = to_result("tv", {"id": 1, "genres": [{"id": 18, "name": "Drama"}], "name": "Show",
+                              "first_air_date": None, "overview": None})
+    assert result["genre_ids"] == [18]
+    assert result["first_air_date"] == ""
+    assert result["overview"] == ""
+    assert "release_date" not in result
+
+
+@pytest.mark.asyncio
+async def test_ingest_export(export, store, client, fake_tmdb):
+    stats = await ingest_export(export, store, client, batch_size=2, min_popularity=1.0)
+
+    # Adult and unpopular titles are never requested, the deleted one is skipped
+    assert sorted(fake_tmdb.requests) == [1, 4, 5, 6]
+    assert (stats.read, stats.enriched, stats.refreshed, stats.skipped) == (6, 3, 0, 3)
+    assert store.count("movie") == 3
+    assert store.checkpoint(export.name) == 7
+
+    results = {result["id"]: result for result in store.iter_results("movie")}
+    assert sorted(results) == [1, 4, 6]
+    # New titles are stored with their details in the shape of discover results
+    assert results[1]["popularity"] == 1.0
+    assert results[1]["genre_ids"] == [27]
+
+
+@pytest.mark.asyncio
+async def test_interrupted_ingestion_resumes(export, store, client, fake_tmdb):
+    fake_tmdb.failing_ids = {6}
+    with pytest.raises(RuntimeError):
+        await ingest_export(export, store, client, batch_size=2, min_popularity=1.0)
+    # The batches before the failing title were written
+    assert store.checkpoint(export.name) == 5
+    assert store.count("movie") == 2
+
+    fake_tmdb.failing_ids = set()
+    fake_tmdb.requests.clear()
+    await ingest_export(export, store, client, batch_size=2, min_popularity=1.0)
+    assert sorted(fake_tmdb.requests) == [DELETED_ID, 6]
+    assert store.count("movie") == 3
+
+
+@pytest.mark.asyncio
+async def test_next_export_refreshes_popularity(export, store, client, fake_tmdb, tmp_path):
+    await ingest_export(export, store, client, min_popularity=1.0)
+    fake_tmdb.requests.clear()
+
+    next_export = tmp_path / "movie_ids_05_16_2025.json"
+    next_export.write_text('{"adult":false,"id":1,"popularity":50.0}\n{"adult":false,"id":7,"popularity":2.0}\n')
+    stats = await ingest_export(next_export, store, client, min_popularity=1.0)
+
+    assert fake_tmdb.requests == [7]
+    assert (stats.enriched, stats.refreshed) == (1, 1)
+    results = {result["id"]: result for result in store.iter_results("movie")}
+    assert results[1]["popularity"] == 50.0
+
+
+@pytest.mark.asyncio
+async def test_catalog_loads_store(export, store, client):
+    await ingest_export(export, store, client, min_popularity=1.0)
+
+    catalog = Catalog(3600)
+    catalog.load_store(store)
+    movies = catalog.query(MovieFilter(27, year=2000), 100, 10)
+    assert sorted(movie.id for movie in movies) == [1, 4, 6]
+    assert catalog.query(MovieFilter(28), 100, 10) == []
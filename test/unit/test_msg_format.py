@@ -1,7 +1,9 @@
 import pytest
 from datetime import date
+from ase_discord_bot import config_registry
 from ase_discord_bot.bot import msg_format
 from ase_discord_bot.api_util.model.responses import Movie
+from ase_discord_bot.config import Config
 
 # Create a dummy Movie instance
 
@@ -26,8 +28,16 @@ def dummy_movie():
     )
 
 
-def dummy_summarize(media):
-    return "Dummy summary"
+@pytest.fixture
+def config_instance(monkeypatch):
+    monkeypatch.setenv("DISCORD_GUILD_ID", "1234")
+    conf = Config()
+    config_registry.set_config(conf)
+    return conf
+
+
+async def dummy_summarize_batch(media_items):
+    return ["Dummy summary" for _ in media_items]
 
 
 def dummy_get_poster_url(poster_path):
@@ -41,13 +51,11 @@ def test_help_command():
 
 
 def test_format_recommendation_single(monkeypatch, dummy_movie):
-    # Override dependencies in _format_recommendation.
-    monkeypatch.setattr(msg_format, "summarize", dummy_summarize)
     # Replace api_calls.get_poster_url with our dummy function.
     dummy_api_calls = type("DummyApiCalls", (), {"get_poster_url": dummy_get_poster_url})
     monkeypatch.setattr(msg_format, "api_calls", dummy_api_calls)
 
-    formatted = msg_format._format_recommendation(dummy_movie)
+    formatted = msg_format._format_recommendation(dummy_movie, "Dummy summary")
     # Check that the formatted string contains expected pieces.
     assert "Dummy Movie" in formatted
     # The title and original title may be formatted differently if they're the same,
@@ -58,21 +66,63 @@ def test_format_recommendation_single(monkeypatch, dummy_movie):
     assert "Dummy summary" in formatted
 
 
-def test_format_recommendation_list(monkeypatch, dummy_movie):
+@pytest.mark.asyncio
+async def test_format_recommendation_list(monkeypatch, dummy_movie, config_instance):
     # Override dependencies as above.
-    monkeypatch.setattr(msg_format, "summarize", dummy_summarize)
+    monkeypatch.setattr(msg_format, "summarize_batch", dummy_summarize_batch)
     dummy_api_calls = type("DummyApiCalls", (), {"get_poster_url": dummy_get_poster_url})
     monkeypatch.setattr(msg_format, "api_calls", dummy_api_calls)
 
     # Test with a list that has fewer than 3 items.
     results = [dummy_movie]
-    formatted_list = msg_format.format_recommendation(results)
+    formatted_list = await msg_format.format_recommendation(results)
     assert len(formatted_list) == 1
 
     # Test with a list that has more than 3 items.
     movies = [dummy_movie for _ in range(5)]
-    # Patch random.sample to return the first 3 elements.
-    def monkeyatch_sample(x, k): return x[:k]
-    monkeypatch.setattr(msg_format.random, "sample", monkeyatch_sample)
-    formatted_list = msg_format.format_recommendation(movies)
+    formatted_list = await msg_format.format_recommendation(movies)
     assert len(formatted_list) == 3
+
+
+@pytest.mark.asyncio
+async def test_format_picks_falls_back_to_overviews(monkeypatch, dummy_movie, config_instance):
+    async def failing_summarize_batch(media_items):
+        raise RuntimeError("Simulated failure")
+
+    monkeypatch.setattr(msg_format, "summarize_batch", failing_summarize_batch)
+    formatted = await msg_format.format_picks([dummy_movie])
+    assert "A dummy overview" in formatted[0]
+
+
+def test_format_pending_picks(dummy_movie):
+    [formatted] = msg_format.format_pending_picks([dummy_movie])
+    assert "Dummy Movie" in formatted
+    assert msg_format.SUMMARY_PLACEHOLDER in formatted
+
+
+@pytest.mark.asyncio
+async def test_stream_picks(monkeypatch, dummy_movie, config_instance):
+    async def dummy_summarize_stream(media):
+        yield "Partial"
+        if media.id == 2:
+            raise RuntimeError("Simulated failure")
+        yield "Partial summary"
+
+    monkeypatch.setattr(msg_format, "summarize_stream", dummy_summarize_stream)
+    config_instance.SUMMARY_EDIT_INTERVAL_MS = 1000
+    movies = [dummy_movie.model_copy(update={"id": movie_id}) for movie_id in (1, 2)]
+    updates = [update async for update in msg_format.stream_picks(movies)]
+
+    latest = dict(updates)
+    assert len(updates) == 4
+    assert "Partial summary" in latest[0]
+    # The failed one falls back to its overview
+    assert "A dummy overview" in latest[1]
+
+
+@pytest.mark.asyncio
+async def test_stream_picks_batched_by_default(monkeypatch, dummy_movie, config_instance):
+    monkeypatch.setattr(msg_format, "summarize_batch", dummy_summarize_batch)
+    updates = [update async for update in msg_format.stream_picks([dummy_movie, dummy_movie])]
+    assert [position for position, _ in updates] == [0, 1]
+    assert all("Dummy summary" in formatted for _, formatted in updates)
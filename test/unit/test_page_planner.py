@@ -0,0 +1,58 @@
+from ase_discord_bot.api_util.cache import CanonicalFilter
+from ase_discord_bot.api_util.page_planner import MAX_TRACKED_FILTERS, PagePlanner
+
+KEY = (CanonicalFilter("movie", 27), 100)
+
+
+def make_planner(target_pool_size=100, max_pages=15, max_concurrency=5, latency_budget=2.0):
+    return PagePlanner(target_pool_size, 20, max_pages, max_concurrency, latency_budget)
+
+
+def test_plan_fills_target_pool():
+    planner = make_planner()
+    assert planner.target_pages == 5
+    assert planner.plan(KEY, 500, 10000) == 5
+    # A narrow filter is fetched completely
+    assert planner.plan(KEY, 2, 30) == 2
+    assert planner.plan(KEY, 0, 0) == 1
+
+
+def test_plan_limited_by_max_pages():
+    planner = make_planner(target_pool_size=1000, max_pages=15)
+    assert planner.plan(KEY, 500, 10000) == 15
+
+
+def test_slow_pages_cut_plan():
+    planner = make_planner(target_pool_size=300, max_concurrency=2, latency_budget=2.0)
+    planner.observe_latency(KEY, 1.0)
+    # Two waves of two pages fit into the budget
+    assert planner.plan(KEY, 500, 10000) == 4
+    planner.observe_latency(KEY, 10.0)
+    # At least one wave is always fetched
+    assert planner.plan(KEY, 500, 10000) == 2
+
+
+def test_latency_is_smoothed():
+    planner = make_planner()
+    planner.observe_latency(KEY, 1.0)
+    planner.observe_latency(KEY, 2.0)
+    assert planner.filter_stats(KEY).page_latency == 1.3
+
+
+def test_planned_pages_from_history():
+    planner = make_planner()
+    assert planner.planned_pages(KEY) == 1
+    planner.observe_latency(KEY, 0.1)
+    assert planner.planned_pages(KEY) == 1
+    planner.plan(KEY, 3, 50)
+    assert planner.planned_pages(KEY) == 3
+    assert planner.stats() == {KEY: {"plans": 1, "total_results": 50, "total_pages": 3, "page_latency": 0.1,
+                                     "planned_pages": 3}}
+
+
+def test_tracked_filters_bounded():
+    planner = make_planner()
+    for genre in range(MAX_TRACKED_FILTERS + 1):
+        planner.plan((CanonicalFilter("movie", genre), 100), 1, 1)
+    assert len(planner.stats()) == MAX_TRACKED_FILTERS
+    assert planner.filter_stats((CanonicalFilter("movie", 0), 100)) is None
@@ -0,0 +1,88 @@
+import asyncio
+import time
+import pytest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from ase_discord_bot.api_util import rate_limit
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_burst_then_rate():
+    bucket = rate_limit.TokenBucket(rate=50, capacity=2)
+    start = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    elapsed = time.monotonic() - start
+    # 2 tokens are available at once, the other 2 refill at 50 per second
+    assert 0.035 <= elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_pause():
+    bucket = rate_limit.TokenBucket(rate=1000, capacity=10)
+    bucket.pause(0.05)
+    start = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - start >= 0.045
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_gives_up_at_timeout():
+    bucket = rate_limit.TokenBucket(rate=1, capacity=1)
+    assert await bucket.acquire(timeout=0.5)
+    start = time.monotonic()
+    # The next token refills in 1 second
+    assert not await bucket.acquire(timeout=0.5)
+    bucket.pause(30)
+    assert not await bucket.acquire(timeout=0.5)
+    assert time.monotonic() - start < 0.1
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waiter_gives_up_while_lock_held():
+    bucket = rate_limit.TokenBucket(rate=5, capacity=1)
+    await bucket.acquire()
+    # The first waiter holds the lock while it waits for the refill
+    first = asyncio.create_task(bucket.acquire())
+    await asyncio.sleep(0)
+    start = time.monotonic()
+    assert not await bucket.acquire(timeout=0.05)
+    assert time.monotonic() - start < 0.15
+    assert await first
+
+
+def test_parse_retry_after_seconds():
+    assert rate_limit.parse_retry_after("3") == 3.0
+    assert rate_limit.parse_retry_after(None) is None
+    assert rate_limit.parse_retry_after("soon") is None
+
+
+def test_parse_retry_after_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < rate_limit.parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+
+
+def test_backoff_delay_bounds():
+    for attempt in range(4):
+        assert 0 <= rate_limit.backoff_delay(0.5, attempt) <= 0.5 * 2 ** attempt
+
+
+def test_deadline_nesting():
+    assert rate_limit.remaining_time() is None
+    with rate_limit.deadline(10):
+        assert 9 < rate_limit.remaining_time() <= 10
+        with rate_limit.deadline(60):
+            # An inner deadline never extends the outer one
+            assert rate_limit.remaining_time() <= 10
+        with rate_limit.deadline(1):
+            assert rate_limit.remaining_time() <= 1
+    assert rate_limit.remaining_time() is None
+
+
+@pytest.mark.asyncio
+async def test_deadline_propagates_to_tasks():
+    async def remaining():
+        return rate_limit.remaining_time()
+
+    with rate_limit.deadline(5):
+        assert await asyncio.create_task(remaining()) <= 5
@@ -0,0 +1,74 @@
+import dataclasses
+import pytest
+from ase_discord_bot.api_util.model.responses import Movie, TVShow
+from ase_discord_bot.catalog.columns import UNKNOWN_YEAR
+from ase_discord_bot.catalog.records import UNKNOWN_DATE, MediaRecord, date_ordinal
+
+
+def movie_result(release_date="2001-02-03"):
+    return {
+        "adult": False,
+        "backdrop_path": "/backdrop.jpg",
+        "genre_ids": [27, 18],
+        "id": 1,
+        "original_language": "en",
+        "overview": "Overview",
+        "popularity": 12.5,
+        "poster_path": "/poster.jpg",
+        "vote_average": 7.5,
+        "vote_count": 200,
+        "original_title": "Original",
+        "release_date": release_date,
+        "title": "Title",
+        "video": True,
+    }
+
+
+def tvshow_result():
+    return {
+        "adult": False,
+        "backdrop_path": None,
+        "genre_ids": [18],
+        "id": 2,
+        "original_language": "ja",
+        "overview": "Overview",
+        "popularity": 3.0,
+        "poster_path": None,
+        "vote_average": 8.0,
+        "vote_count": 300,
+        "origin_country": ["JP"],
+        "original_name": "Original",
+        "first_air_date": "2010-05-01",
+        "name": "Name",
+    }
+
+
+def test_movie_round_trip():
+    movie = Movie(**movie_result())
+    record = MediaRecord.from_model(movie)
+    assert record == MediaRecord.from_result("movie", movie_result())
+    assert record.year == 2001
+    # Genre IDs come back in the order of their bits
+    assert record.to_model() == movie.model_copy(update={"genre_ids": [18, 27]})
+
+
+def test_tvshow_round_trip():
+    show = TVShow(**tvshow_result())
+    record = MediaRecord.from_result("tv", tvshow_result())
+    assert record == MediaRecord.from_model(show)
+    assert record.to_model() == show
+
+
+def test_missing_date():
+    record = MediaRecord.from_result("movie", movie_result(release_date=""))
+    assert record.release_ordinal == UNKNOWN_DATE
+    assert record.year == UNKNOWN_YEAR
+    assert record.to_model().release_date == ""
+    assert date_ordinal("2001-13-01") == UNKNOWN_DATE
+
+
+def test_record_is_compact_and_immutable():
+    record = MediaRecord.from_result("movie", movie_result())
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        record.id = 2
@@ -0,0 +1,173 @@
+import numpy as np
+import pytest
+from ase_discord_bot import config_registry
+from ase_discord_bot.api_util.model.responses import LazyResults, Movie
+from ase_discord_bot.bot.selection import diverse_sample, result_column, result_features, select_recommendations, \
+    selection_weights, similarity, weighted_sample
+from ase_discord_bot.config import Config, SelectionStrategy
+
+
+@pytest.fixture
+def config_instance(monkeypatch):
+    monkeypatch.setenv("DISCORD_GUILD_ID", "1234")
+    monkeypatch.setenv("SELECTION_VOTE_AVERAGE_EXPONENT", "1")
+    monkeypatch.setenv("SELECTION_VOTE_COUNT_EXPONENT", "0")
+    monkeypatch.setenv("SELECTION_POPULARITY_EXPONENT", "0")
+    conf = Config()
+    config_registry.set_config(conf)
+    return conf
+
+
+def movie_dict(movie_id, vote_average=7.0, genre_ids=(27,), release_date="2000-01-01", language="en"):
+    return {
+        "adult": False,
+        "backdrop_path": None,
+        "genre_ids": list(genre_ids),
+        "id": movie_id,
+        "original_language": language,
+        "overview": "",
+        "popularity": 1.0,
+        "poster_path": None,
+        "vote_average": vote_average,
+        "vote_count": 200,
+        "original_title": f"Movie {movie_id}",
+        "release_date": release_date,
+        "title": f"Movie {movie_id}",
+        "video": False,
+    }
+
+
+def test_weights():
+    weights = selection_weights(np.array([5.0, 10.0]), np.array([0.0, np.e - 1]), np.array([1.0, 1.0]), 2, 1, 0)
+    assert weights == pytest.approx([(6 / 11) ** 2, 2.0])
+    # All exponents 0 weigh uniformly
+    assert list(selection_weights(np.array([1.0, 9.0]), np.array([1.0, 2.0]), np.array([3.0, 4.0]), 0, 0, 0)) \
+        == [1.0, 1.0]
+
+
+def test_zero_fields_keep_positive_weight():
+    weights = selection_weights(np.array([0.0, 7.0]), np.array([0.0, 0.0]), np.array([0.0, 0.0]), 2, 1, 1)
+    assert (weights > 0).all()
+    # New titles nobody voted on are drawn among the others, not only once the pool runs out
+    rng = np.random.default_rng(0)
+    first_draws = [weighted_sample(weights, 1, rng)[0] for _ in range(200)]
+    assert 0 in first_draws
+
+
+def test_sample_without_replacement():
+    rng = np.random.default_rng(0)
+    drawn = weighted_sample(np.ones(100), 10, rng)
+    assert len(set(drawn.tolist())) == 10
+
+
+def test_sample_follows_weights():
+    rng = np.random.default_rng(0)
+    weights = np.array([1.0, 3.0])
+    first = [int(weighted_sample(weights, 1, rng)[0]) for _ in range(4000)]
+    assert first.count(1) / len(first) == pytest.approx(0.75, abs=0.03)
+
+
+def test_zero_weights_drawn_last():
+    rng = np.random.default_rng(0)
+    weights = np.array([0.0, 2.0, 0.0, 1.0])
+    drawn = weighted_sample(weights, 3, rng)
+    assert set(drawn[:2].tolist()) == {1, 3}
+    assert drawn[2] in (0, 2)
+    assert sorted(weighted_sample(np.zeros(3), 5, rng).tolist()) == [0, 1, 2]
+
+
+def test_select_reads_lazy_results_without_validating(config_instance):
+    # The invalid results were seen and are never picked, so they are never validated
+    invalid = {**movie_dict(0, vote_average=0.0), "title": None}
+    results = LazyResults(Movie, [invalid, movie_dict(1), invalid, movie_dict(2), movie_dict(3)])
+    assert list(result_column(results, "vote_average")) == [0.0, 7.0, 0.0, 7.0, 7.0]
+
+    picked = select_recommendations(results, 3, np.random.default_rng(0), seen_ids=np.array([0]))
+    assert sorted(movie.id for movie in picked) == [1, 2, 3]
+
+
+def test_select_skips_malformed_lazy_results(config_instance):
+    # The malformed result has the highest weight, so it is picked first and replaced
+    malformed = {**movie_dict(0, vote_average=10.0), "title": None}
+    results = LazyResults(Movie, [malformed] + [movie_dict(i) for i in range(1, 5)])
+    picked = select_recommendations(results, 3, np.random.default_rng(0))
+    assert len(picked) == 3
+    assert 0 not in [movie.id for movie in picked]
+
+    small = LazyResults(Movie, [malformed, movie_dict(1), movie_dict(2)])
+    assert [movie.id for movie in select_recommendations(small, 3)] == [1, 2]
+
+
+def test_select_small_pool(config_instance):
+    movies = [Movie(**movie_dict(1)), Movie(**movie_dict(2))]
+    assert select_recommendations(movies, 3) == movies
+
+
+def test_features_of_lazy_and_validated_results():
+    raw = [movie_dict(1, genre_ids=(27, 28), release_date="1995-05-05"), movie_dict(2, release_date="", language="de")]
+    lazy = result_features(LazyResults(Movie, raw))
+    validated = result_features([Movie(**result) for result in raw])
+    for lazy_column, validated_column in zip(lazy, validated):
+        assert list(lazy_column) == list(validated_column)
+    assert list(lazy[1]) == [1995, 0]
+    assert list(lazy[2]) == [b"en", b"de"]
+
+
+def test_similarity():
+    genres, years, languages = result_features([
+        Movie(**movie_dict(1, genre_ids=(27, 28), release_date="1995-01-01")),
+        Movie(**movie_dict(2, genre_ids=(27,), release_date="1999-01-01")),
+        Movie(**movie_dict(3, genre_ids=(35,), release_date="2005-01-01", language="de")),
+    ])
+    assert similarity(0, genres, years, languages) == pytest.approx([1.0, (0.5 + 1 + 1) / 3, 0.0])
+
+
+def test_diverse_sample_avoids_similar_results():
+    # Ten equally weighted copies of one kind of result and one of another
+    results = [Movie(**movie_dict(i)) for i in range(10)]
+    results.append(Movie(**movie_dict(10, genre_ids=(35,), release_date="1970-01-01", language="fr")))
+    genres, years, languages = result_features(results)
+    weights = np.ones(len(results))
+    for seed in range(20):
+        drawn = diverse_sample(weights, genres, years, languages, 2, 0.9, np.random.default_rng(seed))
+        assert 10 in drawn.tolist()
+
+
+def test_diverse_sample_draws_zero_weights_last():
+    # Nine unseen results of one kind and a seen one of another
+    results = [Movie(**movie_dict(i)) for i in range(9)]
+    results.append(Movie(**movie_dict(9, genre_ids=(35,), release_date="1970-01-01", language="fr")))
+    genres, years, languages = result_features(results)
+    weights = np.ones(len(results))
+    weights[9] = 0
+    for seed in range(100):
+        drawn = diverse_sample(weights, genres, years, languages, 3, 0.5, np.random.default_rng(seed))
+        assert 9 not in drawn.tolist()
+    # Once the others run out, it is drawn
+    drawn = diverse_sample(weights[7:], genres[7:], years[7:], languages[7:], 3, 0.5, np.random.default_rng(0))
+    assert drawn.tolist()[-1] == 2
+
+
+def test_full_diversity_stays_random():
+    results = [Movie(**movie_dict(i)) for i in range(10)]
+    genres, years, languages = result_features(results)
+    weights = np.ones(len(results))
+    draws = {tuple(diverse_sample(weights, genres, years, languages, 3, 1.0, np.random.default_rng(seed)))
+             for seed in range(20)}
+    assert len(draws) > 1
+
+
+def test_select_diverse(config_instance):
+    config_instance.SELECTION_STRATEGY = SelectionStrategy.DIVERSE
+    results = LazyResults(Movie, [movie_dict(i) for i in range(10)])
+    picked = select_recommendations(results, 3, np.random.default_rng(0))
+    assert len({movie.id for movie in picked}) == 3
+
+
+def test_select_avoids_seen_results(config_instance):
+    results = LazyResults(Movie, [movie_dict(i) for i in range(10)])
+    picked = select_recommendations(results, 3, seen_ids=np.arange(7))
+    assert sorted(movie.id for movie in picked) == [7, 8, 9]
+    # Seen results fill up the picks once the unseen ones run out
+    picked = select_recommendations(results, 3, seen_ids=np.arange(9))
+    assert 9 in {movie.id for movie in picked}
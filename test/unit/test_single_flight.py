@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+from ase_discord_bot.util.single_flight import SingleFlight, StreamFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_coalesced():
+    flights = SingleFlight()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flights.do("key", call) for _ in range(5)))
+    assert results == [1] * 5
+    assert calls == 1
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_different_keys_not_coalesced():
+    flights = SingleFlight()
+
+    async def call(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(flights.do("a", lambda: call(1)), flights.do("b", lambda: call(2)))
+    assert results == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_sequential_calls_not_coalesced():
+    flights = SingleFlight()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flights.do("key", call) == 1
+    assert await flights.do("key", call) == 2
+
+
+@pytest.mark.asyncio
+async def test_error_propagates_to_all_waiters():
+    flights = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(*(flights.do("key", call) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    flights = SingleFlight()
+    started = asyncio.Event()
+
+    async def call():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.ensure_future(flights.do("key", call))
+    second = asyncio.ensure_future(flights.do("key", call))
+    await started.wait()
+    first.cancel()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def counting_stream(calls, values, error=None):
+    calls.append(1)
+    for value in values:
+        await asyncio.sleep(0.01)
+        yield value
+    if error is not None:
+        raise error
+
+
+async def follow(flights, key, start):
+    return [value async for value in flights.stream(key, start)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_streams_coalesced():
+    flights = StreamFlight()
+    calls = []
+    start = lambda: counting_stream(calls, ["a", "ab", "abc"])  # noqa: E731
+
+    results = await asyncio.gather(*(follow(flights, "key", start) for _ in range(3)))
+    assert results == [["a", "ab", "abc"]] * 3
+    assert len(calls) == 1
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_late_stream_caller_starts_at_latest_value():
+    flights = StreamFlight()
+    release = asyncio.Event()
+
+    async def gated_stream():
+        yield "a"
+        yield "ab"
+        await release.wait()
+        yield "abc"
+
+    first = asyncio.ensure_future(follow(flights, "key", gated_stream))
+    await asyncio.sleep(0.01)
+    late = asyncio.ensure_future(follow(flights, "key", gated_stream))
+    await asyncio.sleep(0.01)
+    release.set()
+    assert (await first)[-1] == "abc"
+    assert await late == ["ab", "abc"]
+
+
+@pytest.mark.asyncio
+async def test_stream_error_raised_to_all_callers():
+    flights = StreamFlight()
+    calls = []
+    start = lambda: counting_stream(calls, ["a"], RuntimeError("boom"))  # noqa: E731
+
+    results = await asyncio.gather(*(follow(flights, "key", start) for _ in range(2)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flights) == 0
@@ -0,0 +1,145 @@
+import pytest
+from ase_discord_bot.api_util.cache import CanonicalFilter
+from ase_discord_bot.api_util.model.filters import MovieFilter, TVShowFilter
+from ase_discord_bot.api_util.model.responses import Movie, TVShow
+from ase_discord_bot.catalog import catalog as catalog_module
+from ase_discord_bot.catalog.catalog import load_catalog_store
+from ase_discord_bot.catalog.index import CatalogIndex
+from ase_discord_bot.catalog.snapshot import SnapshotIndex, snapshot_path, write_snapshot, write_store_snapshots
+from ase_discord_bot.catalog.store import CatalogStore
+
+
+def movie_result(movie_id, genre_id=27, language="en", popularity=1.0):
+    return {
+        "adult": False,
+        "backdrop_path": None,
+        "genre_ids": [genre_id],
+        "id": movie_id,
+        "original_language": language,
+        "overview": f"Overview {movie_id} – ✓",
+        "popularity": popularity,
+        "poster_path": f"/{movie_id}.jpg",
+        "vote_average": 7.123,
+        "vote_count": 200,
+        "original_title": f"Movie {movie_id}",
+        "release_date": "2000-01-01",
+        "title": f"Movie {movie_id}",
+        "video": False,
+    }
+
+
+def show_result(show_id):
+    return {
+        "adult": False,
+        "backdrop_path": None,
+        "genre_ids": [18],
+        "id": show_id,
+        "original_language": "ja",
+        "overview": "",
+        "popularity": 2.5,
+        "poster_path": None,
+        "vote_average": 8.0,
+        "vote_count": 300,
+        "origin_country": ["JP"],
+        "original_name": "Show",
+        "first_air_date": "2010-05-01",
+        "name": "Show",
+    }
+
+
+@pytest.fixture
+def movie_snapshot(tmp_path):
+    path = tmp_path / "catalog.movie.snapshot"
+    write_snapshot(path, "movie", [
+        movie_result(1, popularity=1.0),
+        movie_result(2, popularity=3.0, language="de"),
+        movie_result(3, genre_id=28, popularity=2.0),
+    ])
+    return SnapshotIndex(path)
+
+
+def test_snapshot_round_trip(movie_snapshot):
+    assert movie_snapshot.media_type == "movie"
+    assert len(movie_snapshot) == 3
+    assert list(movie_snapshot.ids) == [1, 2, 3]
+    assert list(movie_snapshot.years) == [2000, 2000, 2000]
+    assert movie_snapshot.row_of(2) == 1
+    assert movie_snapshot.row_of(4) is None
+    assert movie_snapshot.item(1) == Movie(**movie_result(2, popularity=3.0, language="de"))
+
+
+def test_empty_snapshot(tmp_path):
+    path = tmp_path / "catalog.tv.snapshot"
+    write_snapshot(path, "tv", [])
+    snapshot = SnapshotIndex(path)
+    assert len(snapshot) == 0
+    assert snapshot.row_of(1) is None
+
+
+def test_unordered_results_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_snapshot(tmp_path / "catalog.movie.snapshot", "movie", [movie_result(2), movie_result(1)])
+
+
+def test_foreign_file_rejected(tmp_path):
+    path = tmp_path / "catalog.movie.snapshot"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        SnapshotIndex(path)
+
+
+def test_index_queries_base(movie_snapshot):
+    index = CatalogIndex(Movie, 60)
+    index.attach_base(movie_snapshot)
+    key = CanonicalFilter("movie", 27)
+    index.mark_covered(key, 0, complete=True)
+
+    assert len(index) == 3
+    assert [movie.id for movie in index.query(key, 100, 10)] == [2, 1]
+    assert [movie.id for movie in index.query(CanonicalFilter("movie", 27, language="de"), 100, 10)] == [2]
+
+
+def test_index_rows_shadow_base(movie_snapshot):
+    index = CatalogIndex(Movie, 60)
+    index.upsert([Movie(**movie_result(1, popularity=5.0))])
+    index.attach_base(movie_snapshot)
+    key = CanonicalFilter("movie", 27)
+    index.mark_covered(key, 0, complete=True)
+
+    assert len(index) == 3
+    assert [movie.id for movie in index.query(key, 100, 10)] == [1, 2]
+    assert index.query(key, 100, 10)[0].popularity == 5.0
+
+    # Moving a base result to another genre and removing one both hide their base rows
+    index.upsert([Movie(**movie_result(2, genre_id=28))])
+    index.remove([3])
+    index.mark_covered(CanonicalFilter("movie", 28), 0, complete=True)
+    assert [movie.id for movie in index.query(key, 100, 10)] == [1]
+    assert [movie.id for movie in index.query(CanonicalFilter("movie", 28), 100, 10)] == [2]
+
+
+@pytest.mark.asyncio
+async def test_store_snapshots_loaded_as_catalog(tmp_path, monkeypatch):
+    catalog_file = tmp_path / "catalog.sqlite3"
+    store = CatalogStore(catalog_file)
+    store.write_batch("movie", [movie_result(2, popularity=3.0), movie_result(1)], [], "export", 2)
+    store.write_batch("tv", [show_result(7)], [], "export", 1)
+    write_store_snapshots(store, catalog_file)
+    store.close()
+    # The snapshots are loaded without the catalog file
+    for path in tmp_path.glob("catalog.sqlite3*"):
+        path.unlink()
+    assert snapshot_path(catalog_file, "movie").exists()
+
+    class FakeConfig:
+        CATALOG_FILE = str(catalog_file)
+        CATALOG_TTL = 3600
+
+    monkeypatch.setattr(catalog_module, "_store_loaded", False)
+    monkeypatch.setattr(catalog_module, "_catalog", None)
+    await load_catalog_store(FakeConfig())
+
+    catalog = catalog_module.get_catalog()
+    assert [movie.id for movie in catalog.query(MovieFilter(27), 100, 10)] == [2, 1]
+    assert [show.id for show in catalog.query(TVShowFilter(18), 100, 10)] == [7]
+    assert isinstance(catalog.query(TVShowFilter(18), 100, 10)[0], TVShow)
@@ -1,6 +1,10 @@
+import asyncio
 import pytest
 from ase_discord_bot import config_registry
-from ase_discord_bot.ai import summary
+from openai import APITimeoutError
+from ase_discord_bot.ai import llm_client, summary, summary_cache
+from ase_discord_bot.api_util.cache import TTLCache
+from ase_discord_bot.api_util.disk_cache import DiskCache
 from ase_discord_bot.api_util.model.responses import Movie, TVShow
 from ase_discord_bot.config import Config
 
@@ -15,6 +19,15 @@ def set_required_env(monkeypatch):
     monkeypatch.setenv("MIN_VOTE_COUNT", "100")
 
 
+@pytest.fixture(autouse=True)
+def cache_instance(tmp_path):
+    cache = summary_cache.SummaryCache(DiskCache(tmp_path / "summaries.sqlite3", 60, 10_000), TTLCache(60, 10, 10_000))
+    summary_cache.set_summary_cache(cache)
+    yield cache
+    cache.disk.close()
+    summary_cache.set_summary_cache(None)
+
+
 @pytest.fixture
 def config_instance():
     conf = Config()
@@ -93,30 +106,44 @@ class DummyCompletion:
 
 
 class DummyCompletions:
-    def create(self, **kwargs):
-        return DummyCompletion()
+    def __init__(self, completion=None, error=None):
+        self.completion = completion or DummyCompletion()
+        self.error = error
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return self.completion
 
 
 class DummyChat:
-    @property
-    def completions(self):
-        return DummyCompletions()
+    def __init__(self, completions):
+        self.completions = completions
 
 
 class DummyOpenAI:
-    def __init__(self, **kwargs):
-        pass
+    def __init__(self, completion=None, error=None):
+        self.chat = DummyChat(DummyCompletions(completion, error))
 
-    @property
-    def chat(self):
-        return DummyChat()
+
+@pytest.fixture
+def dummy_client():
+    client = DummyOpenAI()
+    llm_client.set_llm_client(client)
+    yield client
+    llm_client.set_llm_client(None)
 
 
-def test_summarize_success(monkeypatch, dummy_movie, config_instance):
-    # Replace OpenAI with DummyOpenAI so that the API call returns a fake summary.
-    monkeypatch.setattr(summary, "OpenAI", lambda **kwargs: DummyOpenAI())
-    result = summary.summarize(dummy_movie)
+@pytest.mark.asyncio
+async def test_summarize_success(dummy_movie, config_instance, dummy_client):
+    result = await summary.summarize(dummy_movie)
     assert result == "Fake summary."
+    [call] = dummy_client.chat.completions.calls
+    assert call["model"] == config_instance.OPEN_ROUTER_MODEL
+    assert call["timeout"] == config_instance.OPEN_ROUTER_REQUEST_TIMEOUT
 
 # Dummy classes to simulate a failed API call that triggers the fallback
 
@@ -135,29 +162,208 @@ class DummyFailureCompletion:
     choices = [DummyFailureChoice()]
 
 
-class DummyFailureCompletions:
-    def create(self, **kwargs):
-        return DummyFailureCompletion()
+@pytest.mark.asyncio
+async def test_summarize_failure(dummy_movie, config_instance):
+    # Replace the client with one returning a broken completion to simulate an API failure.
+    llm_client.set_llm_client(DummyOpenAI(DummyFailureCompletion()))
+    result = await summary.summarize(dummy_movie)
+    # On failure, the original overview should be returned.
+    assert result == dummy_movie.overview
+    llm_client.set_llm_client(None)
+
+
+@pytest.mark.asyncio
+async def test_summarize_request_error(dummy_movie, config_instance):
+    llm_client.set_llm_client(DummyOpenAI(error=APITimeoutError(request=None)))
+    assert await summary.summarize(dummy_movie) == dummy_movie.overview
+    llm_client.set_llm_client(None)
 
 
-class DummyFailureChat:
-    @property
-    def completions(self):
-        return DummyFailureCompletions()
+@pytest.mark.asyncio
+async def test_summarize_coalesced(dummy_movie, config_instance, dummy_client):
+    results = await asyncio.gather(*(summary.summarize(dummy_movie) for _ in range(3)))
+    assert results == ["Fake summary."] * 3
+    assert len(dummy_client.chat.completions.calls) == 1
 
 
-class DummyFailureOpenAI:
-    def __init__(self, **kwargs):
-        pass
+@pytest.mark.asyncio
+async def test_summarize_cached(dummy_movie, config_instance, dummy_client, cache_instance):
+    assert await summary.summarize(dummy_movie) == "Fake summary."
+    assert await summary.summarize(dummy_movie) == "Fake summary."
+    assert len(dummy_client.chat.completions.calls) == 1
+    assert cache_instance.hits == 1
 
-    @property
-    def chat(self):
-        return DummyFailureChat()
+    # A changed overview is summarized again
+    dummy_movie.overview = "Changed overview"
+    await summary.summarize(dummy_movie)
+    assert len(dummy_client.chat.completions.calls) == 2
 
 
-def test_summarize_failure(monkeypatch, dummy_movie, config_instance):
-    # Replace OpenAI with DummyFailureOpenAI to simulate an API failure.
-    monkeypatch.setattr(summary, "OpenAI", lambda **kwargs: DummyFailureOpenAI())
-    result = summary.summarize(dummy_movie)
-    # On failure, the original overview should be returned.
-    assert result == dummy_movie.overview
+@pytest.mark.asyncio
+async def test_fallback_not_cached(dummy_movie, config_instance, cache_instance):
+    llm_client.set_llm_client(DummyOpenAI(error=APITimeoutError(request=None)))
+    await summary.summarize(dummy_movie)
+    assert cache_instance.stats()["pending_writes"] == 0
+    assert len(cache_instance.memory) == 0
+    llm_client.set_llm_client(None)
+
+
+class DummyContentCompletion:
+    def __init__(self, content):
+        self.choices = [DummyChoice(DummyMessage(content))]
+
+
+def make_movies(count):
+    return [Movie(adult=False, backdrop_path=None, genre_ids=[1], id=movie_id, original_language="en",
+                  overview=f"Overview {movie_id}", popularity=1.0, poster_path=None, vote_average=8.0,
+                  vote_count=100, original_title=f"Movie {movie_id}", release_date="2020-01-01",
+                  title=f"Movie {movie_id}", video=False)
+            for movie_id in range(1, count + 1)]
+
+
+def test_get_batch_text():
+    text = summary._get_batch_text(make_movies(2))
+    assert "JSON array" in text
+    assert '"id": 2, "type": "movie", "title": "Movie 2", "summary": "Overview 2"' in text
+
+
+@pytest.mark.asyncio
+async def test_summarize_batch_single_call(config_instance, cache_instance):
+    content = '```json\n[{"id": 1, "summary": "Summary 1"}, {"id": 2, "summary": "Summary 2"}]\n```'
+    client = DummyOpenAI(DummyContentCompletion(content))
+    llm_client.set_llm_client(client)
+    assert await summary.summarize_batch(make_movies(2)) == ["Summary 1", "Summary 2"]
+    assert len(client.chat.completions.calls) == 1
+
+    # Both summaries are cached under their individual keys
+    assert await summary.summarize(make_movies(1)[0]) == "Summary 1"
+    assert len(client.chat.completions.calls) == 1
+    llm_client.set_llm_client(None)
+
+
+@pytest.mark.asyncio
+async def test_summarize_batch_falls_back_per_item(config_instance):
+    # Item 2 is malformed and item 3 is missing, both are summarized individually
+    content = '[{"id": 1, "summary": "Summary 1"}, {"id": 2, "summary": null}, {"id": 99, "summary": "Other"}]'
+    client = DummyOpenAI(DummyContentCompletion(content))
+    llm_client.set_llm_client(client)
+    assert await summary.summarize_batch(make_movies(3)) == ["Summary 1", content, content]
+    assert len(client.chat.completions.calls) == 3
+    assert "Title: Movie 3" in client.chat.completions.calls[2]["messages"][0]["content"][0]["text"]
+    llm_client.set_llm_client(None)
+
+
+@pytest.mark.asyncio
+async def test_summarize_batch_invalid_json(config_instance):
+    client = DummyOpenAI(DummyContentCompletion("Not JSON"))
+    llm_client.set_llm_client(client)
+    assert await summary.summarize_batch(make_movies(2)) == ["Not JSON", "Not JSON"]
+    assert len(client.chat.completions.calls) == 3
+    llm_client.set_llm_client(None)
+
+
+@pytest.mark.asyncio
+async def test_summarize_batch_request_error(config_instance):
+    llm_client.set_llm_client(DummyOpenAI(error=APITimeoutError(request=None)))
+    assert await summary.summarize_batch(make_movies(2)) == ["Overview 1", "Overview 2"]
+    llm_client.set_llm_client(None)
+
+
+@pytest.mark.asyncio
+async def test_summarize_batch_size_and_concurrency(monkeypatch, config_instance):
+    in_flight = []
+    max_in_flight = []
+
+    async def slow_summarize(media):
+        in_flight.append(media)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0.05)
+        in_flight.remove(media)
+        if media.id == 2:
+            raise RuntimeError("Simulated failure")
+        return f"Summary {media.id}"
+
+    monkeypatch.setattr(summary, "summarize", slow_summarize)
+    config_instance.SUMMARY_BATCH_SIZE = 1
+    config_instance.MAX_CONCURRENT_SUMMARIES = 2
+
+    summaries = await summary.summarize_batch(make_movies(3))
+    assert max(max_in_flight) == 2
+    # Every item keeps its position, the failed one falls back to its overview
+    assert summaries == ["Summary 1", "Overview 2", "Summary 3"]
+
+
+class DummyDelta:
+    def __init__(self, content):
+        self.content = content
+
+
+class DummyStreamChoice:
+    def __init__(self, content):
+        self.delta = DummyDelta(content)
+
+
+class DummyChunk:
+    def __init__(self, content, has_choices=True):
+        self.choices = [DummyStreamChoice(content)] if has_choices else []
+
+
+class DummyStream:
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.mark.asyncio
+async def test_summarize_stream(dummy_movie, config_instance, cache_instance):
+    # Chunks without content or choices are skipped
+    chunks = [DummyChunk("Fake"), DummyChunk(None), DummyChunk(None, has_choices=False), DummyChunk(" summary.")]
+    client = DummyOpenAI(DummyStream(chunks))
+    llm_client.set_llm_client(client)
+    assert [part async for part in summary.summarize_stream(dummy_movie)] == ["Fake", "Fake summary."]
+    assert client.chat.completions.calls[0]["stream"]
+
+    # The complete summary is cached and yielded at once
+    assert [part async for part in summary.summarize_stream(dummy_movie)] == ["Fake summary."]
+    assert len(client.chat.completions.calls) == 1
+    llm_client.set_llm_client(None)
+
+
+@pytest.mark.asyncio
+async def test_summarize_stream_error_replaces_partial_summary(dummy_movie, config_instance, cache_instance):
+    llm_client.set_llm_client(DummyOpenAI(DummyStream([DummyChunk("Fake")], APITimeoutError(request=None))))
+    parts = [part async for part in summary.summarize_stream(dummy_movie)]
+    assert parts[-1] == dummy_movie.overview
+    assert len(cache_instance.memory) == 0
+    llm_client.set_llm_client(None)
+
+
+@pytest.mark.asyncio
+async def test_summarize_stream_coalesced(dummy_movie, config_instance):
+    chunks = [DummyChunk("Fake"), DummyChunk(" summary.")]
+    client = DummyOpenAI(DummyStream(chunks))
+    llm_client.set_llm_client(client)
+
+    async def collect():
+        return [part async for part in summary.summarize_stream(dummy_movie)]
+
+    results = await asyncio.gather(collect(), collect(), collect())
+    assert all(parts[-1] == "Fake summary." for parts in results)
+    assert len(client.chat.completions.calls) == 1
+    llm_client.set_llm_client(None)
+
+
+def test_client_started_once(config_instance):
+    client = llm_client.start_llm_client(config_instance)
+    assert llm_client.start_llm_client(config_instance) is client
+    assert llm_client.get_llm_client() is client
+    llm_client.set_llm_client(None)
+    with pytest.raises(RuntimeError):
+        llm_client.get_llm_client()
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from ase_discord_bot.ai import summary_cache as summary_cache_module
+from ase_discord_bot.ai.summary_cache import SummaryCache, summary_key
+from ase_discord_bot.api_util.cache import TTLCache
+from ase_discord_bot.api_util.disk_cache import DiskCache
+
+
+def make_cache(path, max_bytes=10_000):
+    return SummaryCache(DiskCache(path, 60, max_bytes), TTLCache(60, 10, 10_000))
+
+
+@pytest.fixture
+def summary_cache(tmp_path):
+    cache = make_cache(tmp_path / "summaries.sqlite3")
+    yield cache
+    cache.disk.close()
+
+
+def test_key_changes_with_prompt_and_model():
+    key = summary_key("movie", 1, "model", "prompt")
+    assert key == summary_key("movie", 1, "model", "prompt")
+    assert key != summary_key("movie", 1, "model", "changed prompt")
+    assert key != summary_key("movie", 1, "other model", "prompt")
+    assert key != summary_key("tv", 1, "model", "prompt")
+
+
+@pytest.mark.asyncio
+async def test_get_set_counts_hits(summary_cache):
+    assert await summary_cache.get("a") is None
+    summary_cache.set("a", "summary")
+    assert await summary_cache.get("a") == "summary"
+    assert summary_cache.stats()["hits"] == 1
+    assert summary_cache.hit_ratio == 0.5
+
+
+@pytest.mark.asyncio
+async def test_writes_behind_and_persists(tmp_path, summary_cache):
+    summary_cache.set("a", "summary")
+    # The write is only scheduled, the database is untouched until the task runs
+    assert summary_cache.stats()["pending_writes"] == 1
+    await summary_cache.flush()
+    assert summary_cache.stats()["pending_writes"] == 0
+    summary_cache.disk.close()
+
+    reopened = make_cache(tmp_path / "summaries.sqlite3")
+    assert await reopened.get("a") == "summary"
+    # The disk hit is kept in memory
+    assert "a" in reopened.memory
+    reopened.disk.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_budget_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path / "summaries.sqlite3", max_bytes=50)
+    for key in "abcdefgh":
+        cache.set(key, key * 1000)
+        await cache.flush()
+    assert cache.disk.size_bytes <= 50
+    assert cache.disk.get("a") is None
+    assert cache.disk.get("h") == b"h" * 1000
+    cache.disk.close()
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_running_write(tmp_path):
+    cache = make_cache(tmp_path / "summaries.sqlite3")
+    summary_cache_module.set_summary_cache(cache)
+    cache.set("a", "summary")
+    # Let the background write take the pending summary into its worker thread
+    await asyncio.sleep(0)
+    assert cache.stats()["pending_writes"] == 0
+
+    await summary_cache_module.close_summary_cache()
+    assert summary_cache_module._summary_cache is None
+    assert cache._write_task.done()
+
+    reopened = make_cache(tmp_path / "summaries.sqlite3")
+    assert reopened.disk.get("a") == b"summary"
+    reopened.disk.close()
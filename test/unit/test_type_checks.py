@@ -1,5 +1,5 @@
 import pytest
-from ase_discord_bot.api_util.model.responses import Movie, TVShow
+from ase_discord_bot.api_util.model.responses import LazyResults, Movie, TVShow
 from ase_discord_bot.util.type_checks import is_list_of_movies, is_list_of_tvshows
 
 
@@ -75,3 +75,11 @@ def test_is_list_of_tvshows_invalid(dummy_tvshow_data, dummy_movie_data):
     movie = Movie(**dummy_movie_data)
     # Mixed list should return False.
     assert is_list_of_tvshows([tvshow, movie]) is False
+
+
+def test_lazy_results_checked_by_model():
+    # The raw result is not a movie, but lazy results are not validated by the check
+    results = LazyResults(Movie, [{"id": 1}])
+    assert is_list_of_movies(results) is True
+    assert is_list_of_tvshows(results) is False
+    assert is_list_of_movies(LazyResults(Movie, [])) is False
@@ -0,0 +1,254 @@
+import pytest
+from ase_discord_bot import config_registry
+from ase_discord_bot.api_util.cache import TTLCache
+from ase_discord_bot.api_util.model.responses import LazyResults, Movie
+from ase_discord_bot.bot import msg_format, views
+from ase_discord_bot.bot.history import SeenHistory, set_history
+from ase_discord_bot.config import Config
+
+KEY = (1, 2, "movie")
+
+
+class FakeMessage:
+    def __init__(self, content, view=None):
+        self.content = content
+        self.view = view
+        self.deleted = False
+        self.edits = []
+
+    async def delete(self):
+        self.deleted = True
+
+    async def edit(self, **fields):
+        self.edits.append(fields)
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+
+class FakeWebhook:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content, view=None):
+        message = FakeMessage(content, view)
+        self.messages.append(message)
+        return message
+
+
+class FakeResponse:
+    def __init__(self):
+        self.sent = []
+        self.deferred = False
+
+    async def send_message(self, content, ephemeral=False):
+        self.sent.append(content)
+
+    async def defer(self):
+        self.deferred = True
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakeInteraction:
+    def __init__(self, user_id=2, interaction_id=100):
+        self.id = interaction_id
+        self.user = FakeUser(user_id)
+        self.response = FakeResponse()
+        self.followup = FakeWebhook()
+
+
+class FakeContext:
+    def __init__(self):
+        self.interaction = FakeInteraction()
+        self.followup = self.interaction.followup
+        self.responses = []
+
+    async def respond(self, content):
+        self.responses.append(content)
+
+
+def make_movie(movie_id):
+    return Movie(adult=False, backdrop_path=None, genre_ids=[27], id=movie_id, original_language="en", overview="",
+                 popularity=1.0, poster_path=None, vote_average=7.0, vote_count=200,
+                 original_title=f"Movie {movie_id}", release_date="2000-01-01", title=f"Movie {movie_id}",
+                 video=False)
+
+
+def fake_format_pending_picks(picks):
+    return [str(media.id) for media in picks]
+
+
+async def fake_stream_picks(picks):
+    for position, media in enumerate(picks):
+        yield position, str(media.id)
+
+
+@pytest.fixture(autouse=True)
+def config_instance(monkeypatch):
+    monkeypatch.setenv("DISCORD_GUILD_ID", "1234")
+    monkeypatch.setenv("HISTORY_SIZE", "0")
+    conf = Config()
+    config_registry.set_config(conf)
+    set_history(SeenHistory(0, 60, 10))
+    views.set_pool_store(None)
+    monkeypatch.setattr(views, "format_pending_picks", fake_format_pending_picks)
+    monkeypatch.setattr(views, "stream_picks", fake_stream_picks)
+    yield conf
+    set_history(None)
+    views.set_pool_store(None)
+
+
+def shown(webhook):
+    return [int(message.content) for message in webhook.messages]
+
+
+@pytest.mark.asyncio
+async def test_send_recommendations_attaches_buttons_to_last_message():
+    context = FakeContext()
+    await views.send_recommendations(context, [make_movie(i) for i in range(10)], KEY)
+
+    messages = context.followup.messages
+    assert len(messages) == 3
+    assert [message.view is None for message in messages] == [True, True, False]
+    assert messages[-1].view.pool_key == 100
+    assert views.get_pool_store().get(100).shown_ids == set(shown(context.followup))
+
+
+@pytest.mark.asyncio
+async def test_malformed_results_are_not_sent():
+    context = FakeContext()
+    malformed = {**make_movie(1).model_dump(), "title": None}
+    await views.send_recommendations(context, LazyResults(Movie, [malformed]), KEY)
+    assert context.responses == ["🚫 **No Matches found.**"]
+    assert not context.followup.messages
+
+    await views.send_recommendations(context, LazyResults(Movie, [malformed, make_movie(2).model_dump()]), KEY)
+    assert shown(context.followup) == [2]
+
+
+@pytest.mark.asyncio
+async def test_next_shows_new_results_and_moves_buttons():
+    context = FakeContext()
+    await views.send_recommendations(context, [make_movie(i) for i in range(10)], KEY)
+    first = context.followup.messages
+
+    interaction = FakeInteraction()
+    await first[-1].view._show_more(interaction, replace=False)
+
+    assert interaction.response.deferred
+    assert len(interaction.followup.messages) == 3
+    assert not set(shown(interaction.followup)) & set(shown(context.followup))
+    assert first[-1].view is None
+    assert not any(message.deleted for message in first)
+
+
+@pytest.mark.asyncio
+async def test_reroll_replaces_results_until_pool_runs_out():
+    context = FakeContext()
+    await views.send_recommendations(context, [make_movie(i) for i in range(4)], KEY)
+    first = context.followup.messages
+
+    interaction = FakeInteraction()
+    await first[-1].view._show_more(interaction, replace=True)
+    assert all(message.deleted for message in first)
+    assert shown(interaction.followup) == sorted(set(range(4)) - set(shown(context.followup)))
+
+    exhausted = FakeInteraction()
+    await interaction.followup.messages[-1].view._show_more(exhausted, replace=True)
+    assert exhausted.response.sent == ["🚫 **No more recommendations for this request.**"]
+    assert not exhausted.followup.messages
+
+
+@pytest.mark.asyncio
+async def test_expired_pool():
+    context = FakeContext()
+    await views.send_recommendations(context, [make_movie(i) for i in range(10)], KEY)
+    views.get_pool_store().invalidate(100)
+
+    interaction = FakeInteraction()
+    await context.followup.messages[-1].view._show_more(interaction, replace=False)
+    assert "expired" in interaction.response.sent[0]
+
+
+@pytest.mark.asyncio
+async def test_buttons_time_out_with_pool():
+    now = [0.0]
+    views.set_pool_store(TTLCache(600, 10, clock=lambda: now[0]))
+    context = FakeContext()
+    await views.send_recommendations(context, [make_movie(i) for i in range(10)], KEY)
+    assert context.followup.messages[-1].view.timeout == 600
+
+    now[0] = 450
+    interaction = FakeInteraction()
+    await context.followup.messages[-1].view._show_more(interaction, replace=False)
+    assert interaction.followup.messages[-1].view.timeout == 150
+
+
+@pytest.mark.asyncio
+async def test_pool_unlocked_while_summaries_stream(monkeypatch):
+    context = FakeContext()
+    await views.send_recommendations(context, [make_movie(i) for i in range(10)], KEY)
+    pool = views.get_pool_store().get(100)
+    locked = []
+
+    async def stream_picks(picks):
+        locked.append(pool.lock.locked())
+        yield 0, "summary"
+
+    monkeypatch.setattr(views, "stream_picks", stream_picks)
+    await context.followup.messages[-1].view._show_more(FakeInteraction(), replace=False)
+    assert locked == [False]
+
+
+@pytest.mark.asyncio
+async def test_only_requesting_user_can_click():
+    view = views.RecommendationView(100, 2, 60)
+    assert await view.interaction_check(FakeInteraction(user_id=2))
+    other = FakeInteraction(user_id=3)
+    assert not await view.interaction_check(other)
+    assert other.response.sent
+
+
+def test_pick_never_repeats_shown_results():
+    movies = [make_movie(i) for i in range(4)]
+    assert [movie.id for movie in msg_format.pick_recommendations(movies, shown_ids={0, 1, 2})] == [3]
+
+
+@pytest.mark.asyncio
+async def test_summaries_replace_placeholders(monkeypatch):
+    async def stream_picks(picks):
+        for position, media in enumerate(picks):
+            yield position, f"{media.id} summary"
+
+    monkeypatch.setattr(views, "format_pending_picks", lambda picks: [f"{media.id} ⏳" for media in picks])
+    monkeypatch.setattr(views, "stream_picks", stream_picks)
+    context = FakeContext()
+    await views.send_recommendations(context, [make_movie(i) for i in range(3)], KEY)
+
+    for message in context.followup.messages:
+        assert message.content.endswith(" summary")
+        assert len(message.edits) == 1
+    # The buttons are kept when the last message is edited
+    assert context.followup.messages[-1].view is not None
+
+
+@pytest.mark.asyncio
+async def test_render_summaries_coalesces_edits(config_instance):
+    async def updates():
+        for part in range(1, 6):
+            yield 0, "word " * part
+            yield 1, "other " * part
+
+    config_instance.SUMMARY_EDIT_INTERVAL_MS = 60_000
+    messages = [FakeMessage(""), FakeMessage("")]
+    await views._render_summaries(messages, updates())
+    # Within the interval only the latest content of each message is applied
+    assert [message.edits for message in messages] == [[{"content": "word " * 5}], [{"content": "other " * 5}]]
+
+    config_instance.SUMMARY_EDIT_INTERVAL_MS = 0
+    messages = [FakeMessage(""), FakeMessage("")]
+    await views._render_summaries(messages, updates())
+    assert [len(message.edits) for message in messages] == [5, 5]